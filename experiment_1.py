@@ -1,7 +1,11 @@
-import random
-random.seed(1994)
-from pysrc.experiment import BanditExperiment
-from pysrc.learning import BanditSampleAverage, SimpleBandit
+from collections import OrderedDict
+from pysrc.cache import ResultCache
+from pysrc.experiment import BanditExperiment, BatchedBanditExperiment, WalkTrajectory
+from pysrc.learning import BanditSampleAverage, SimpleBandit, BatchedBanditSampleAverage, BatchedSimpleBandit
+from pysrc.noise import NoiseBuffer
+from pysrc.runner import BatchedRun
+from pysrc.streams import trial_random_state, trial_streams
+from pysrc.trajectories import TrajectoryRecorder, TrajectoryStore
 import matplotlib.pyplot as plt
 import numpy as np
 
@@ -10,19 +14,21 @@ __author__ = 'kongaloosh'
 
 class bandit_example(object):
 
-    def __init__(self):
+    def __init__(self, random_state=None):
         """Initializes the Experiment with a sample-average and exponential average"""
-        self.simple_average = BanditSampleAverage(number_of_arms=10, epsilon=0.1)           # sample average
-        self.simple_bandit = SimpleBandit(number_of_arms=10, epsilon=0.1, step_size=0.1)   # action-value learner
-        self.problem = BanditExperiment(number_of_arms=10)                                  # source of data
-
-        self.simple_average_rewards = list()
-        self.simple_average_optimal = list()
+        self.simple_average = BanditSampleAverage(number_of_arms=10, epsilon=0.1,          # sample average
+                                                  random_state=random_state)
+        self.simple_bandit = SimpleBandit(number_of_arms=10, epsilon=0.1, step_size=0.1,   # action-value learner
+                                          random_state=random_state)
+        self.problem = BanditExperiment(number_of_arms=10, random_state=random_state)      # source of data
+
+        self.simple_average_rewards = np.zeros(10000)                                      # one entry per step
+        self.simple_average_optimal = np.zeros(10000)
         self.simple_average_optimal_count = 0.
         self.simple_average_reward_count = 0.
 
-        self.simple_bandit_rewards = list()
-        self.simple_bandit_optimal = list()
+        self.simple_bandit_rewards = np.zeros(10000)
+        self.simple_bandit_optimal = np.zeros(10000)
         self.simple_bandit_optimal_count = 0.
         self.simple_bandit_reward_count = 0.
 
@@ -38,10 +44,8 @@ class bandit_example(object):
         # if the chosen action was optimal, or has the same value as the optimal action...
         if optimal_action == bandit_action or \
                 self.problem.bandit_means[optimal_action] == self.problem.bandit_means[bandit_action]:
-            self.simple_bandit_optimal.append(1)                                            # add % optimal
-        else:
-            self.simple_bandit_optimal.append(0)                                            # add % optimal
-        self.simple_bandit_rewards.append(reward)                                           # add avg reward
+            self.simple_bandit_optimal[episode_number - 1] = 1                              # add % optimal
+        self.simple_bandit_rewards[episode_number - 1] = reward                             # add avg reward
 
     def average_update(self, episode_number):
         episode_number += 1                                                                 # move to next episode
@@ -54,15 +58,15 @@ class bandit_example(object):
         # if the chosen action was optimal, or has the same value as the optimal action...
         if optimal_action == average_action or \
                 self.problem.bandit_means[optimal_action] == self.problem.bandit_means[average_action]:
-            self.simple_average_optimal.append(1)
-        else:
-            self.simple_average_optimal.append(0)
-        self.simple_average_rewards.append(reward)
+            self.simple_average_optimal[episode_number - 1] = 1
+        self.simple_average_rewards[episode_number - 1] = reward
 
     def run_experiment(self, walk=False, initial_means=None):
         """ initializes a new problem"""
         if initial_means is not None:
             self.problem.bandit_means = np.copy(initial_means)
+        if walk:                                       # generate the walk a block of steps at a time
+            WalkTrajectory(self.problem)
         for step in range(10000):                      # for X many pulls
             self.average_update(step)                  # take a step with the sample average
             self.bandit_update(step)                   # take a step with the action-value
@@ -70,30 +74,71 @@ class bandit_example(object):
                 self.problem.random_walk()
 
 
+def run_batched_example(number_of_runs, walk=False, initial_means=None, block_size=2**20, seed=None,
+                        trajectory_directory=None):
+    """Runs bandit_example for number_of_runs runs at once, keeping per-step statistics over the runs.
+
+    With a seed, run i draws from its own streams spawned from (seed, i). With a trajectory_directory every run's
+    steps are also kept in a TrajectoryStore there, for plot_trajectories.py.
+    """
+    if seed is None:
+        noise = NoiseBuffer(block_size=block_size)                  # every draw comes from pre-generated blocks
+        streams = {'random_state': noise, 'walk_random_state': noise, 'exploration_random_state': noise}
+    else:
+        streams = trial_streams(seed, range(number_of_runs))
+    problem = BatchedBanditExperiment(number_of_runs=number_of_runs, number_of_arms=10,
+                                      random_state=streams['random_state'],
+                                      walk_random_state=streams['walk_random_state'])
+    if initial_means is not None:
+        problem.bandit_means[:] = initial_means
+    exploration = streams['exploration_random_state']
+    learners = OrderedDict([
+        ('simple_average', BatchedBanditSampleAverage(number_of_runs, 10, epsilon=0.1, random_state=exploration)),
+        ('simple_bandit', BatchedSimpleBandit(number_of_runs, 10, epsilon=0.1, step_size=0.1,
+                                              random_state=exploration)),
+    ])
+    recorder = None
+    if trajectory_directory is not None:
+        store = TrajectoryStore.create(trajectory_directory, list(learners), (number_of_runs,), 10000, 10)
+        recorder = TrajectoryRecorder(store)
+    experiment = BatchedRun(learners, problem, recorder=recorder)
+    experiment.run_experiment(10000, walk=walk, record_curves=True, optimal_baseline=False)
+    return experiment
+
+
+def cached_example(cache, number_of_runs, walk=False, initial_means=None, seed=None):
+    """The per-step reward and % optimal curves of run_batched_example, computed once per configuration"""
+    configuration = {
+        'learners': {
+            'simple_average': [BatchedBanditSampleAverage, {'epsilon': 0.1}],
+            'simple_bandit': [BatchedSimpleBandit, {'epsilon': 0.1, 'step_size': 0.1}],
+        },
+        'number_of_arms': 10,
+        'timesteps': 10000,
+        'walk': walk,
+        'initial_means': initial_means,
+        'number_of_runs': number_of_runs,
+        'seed': seed,
+    }
+
+    def compute():
+        experiment = run_batched_example(number_of_runs, walk=walk, initial_means=initial_means, seed=seed)
+        return {'rewards': experiment.rewards, 'optimal': experiment.optimal}
+    return cache.memoize(configuration, compute)
+
+
 if __name__ == "__main__":
-    initial_bandit_means = np.random.normal(loc=0, scale=1, size=10)    # our sample means
+    root_seed = 1994                                                    # every draw of the experiment derives from it
+    initial_bandit_means = trial_random_state(root_seed).normal(loc=0, scale=1, size=10)    # our sample means
     print(initial_bandit_means)
-    simple_average_reward = np.zeros(10000)
-    simple_average_optimal = np.zeros(10000)
-    simple_bandit_reward = np.zeros(10000)
-    simple_bandit_optimal = np.zeros(10000)
-
     number_of_runs = 6000
+    cache = ResultCache('.experiment_cache')                            # unchanged configurations are not re-run
 
-    for i in range(number_of_runs):
-        if i % 100 == 0:
-            print(i)
-        experiment = bandit_example()
-        experiment.run_experiment(initial_means=initial_bandit_means)
-        simple_average_optimal += experiment.simple_average_optimal
-        simple_bandit_optimal += experiment.simple_bandit_optimal
-        simple_average_reward += experiment.simple_average_rewards
-        simple_bandit_reward += experiment.simple_bandit_rewards
-
-    simple_average_optimal /= number_of_runs                             # avg the outcomes by the number runs
-    simple_bandit_optimal /= number_of_runs
-    simple_average_reward /= number_of_runs
-    simple_bandit_reward /= number_of_runs
+    experiment = cached_example(cache, number_of_runs, initial_means=initial_bandit_means, seed=root_seed)
+    simple_average_optimal = experiment['optimal']['simple_average'].mean    # avg the outcomes by the runs
+    simple_bandit_optimal = experiment['optimal']['simple_bandit'].mean
+    simple_average_reward = experiment['rewards']['simple_average'].mean
+    simple_bandit_reward = experiment['rewards']['simple_bandit'].mean
 
 
     plt.figure(0, figsize=(15,10))
@@ -116,25 +161,11 @@ if __name__ == "__main__":
     plt.plot(simple_bandit_reward, label='Action Value')
     plt.legend()
 
-    simple_average_reward = np.zeros(10000)
-    simple_average_optimal = np.zeros(10000)
-    simple_bandit_reward = np.zeros(10000)
-    simple_bandit_optimal = np.zeros(10000)
-
-    for i in range(number_of_runs):
-        if i % 100 == 0:
-            print(i)
-        experiment = bandit_example()
-        experiment.run_experiment(walk=True)
-        simple_average_optimal += experiment.simple_average_optimal
-        simple_bandit_optimal += experiment.simple_bandit_optimal
-        simple_average_reward += experiment.simple_average_rewards
-        simple_bandit_reward += experiment.simple_bandit_rewards
-
-    simple_average_optimal /= number_of_runs
-    simple_bandit_optimal /= number_of_runs
-    simple_average_reward /= number_of_runs
-    simple_bandit_reward /= number_of_runs
+    experiment = cached_example(cache, number_of_runs, walk=True, seed=root_seed + 1)
+    simple_average_optimal = experiment['optimal']['simple_average'].mean
+    simple_bandit_optimal = experiment['optimal']['simple_bandit'].mean
+    simple_average_reward = experiment['rewards']['simple_average'].mean
+    simple_bandit_reward = experiment['rewards']['simple_bandit'].mean
 
     plt.subplot(2, 2, 3)
     plt.xlim([-100, 10100])
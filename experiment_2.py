@@ -1,27 +1,32 @@
-import random
-random.seed(1994)
-from pysrc.experiment import BanditExperiment
+from pysrc.cache import ResultCache
+from pysrc.cluster import Coordinator
+from pysrc.experiment import BanditExperiment, WalkTrajectory
 from pysrc.learning import BanditSampleAverage, SimpleBandit, UCB
+from pysrc.runner import variance_reduction
+from pysrc.scheduler import SweepProblem, SweepScheduler
+from pysrc.store import ResultStore
+from pysrc.telemetry import Telemetry
+from pysrc.streams import trial_random_state
 import matplotlib
 matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import numpy as np
-from multiprocessing import Pool
 import pickle as pkl
 
 __author__ = 'kongaloosh'
 
-initial_bandit_means = np.random.normal(loc=0, scale=1, size=10)    # our sample means
+root_seed = 1994                                                    # every draw of the sweep derives from it
+initial_bandit_means = trial_random_state(root_seed).normal(loc=0, scale=1, size=10)    # our sample means
 
 
 class bandit_example(object):
 
-    def __init__(self, epsilon, bandit_experiment_means=None):
-        self.simple_average = BanditSampleAverage(number_of_arms=10, epsilon=epsilon)
-        self.simple_bandit = SimpleBandit(number_of_arms=10, epsilon=epsilon, step_size=0.01)
+    def __init__(self, epsilon, bandit_experiment_means=None, random_state=None):
+        self.simple_average = BanditSampleAverage(number_of_arms=10, epsilon=epsilon, random_state=random_state)
+        self.simple_bandit = SimpleBandit(number_of_arms=10, epsilon=epsilon, step_size=0.01, random_state=random_state)
         self.ucb = UCB(step_size=0.01, number_of_arms=10, c=epsilon)
 
-        self.problem = BanditExperiment(number_of_arms=10)
+        self.problem = BanditExperiment(number_of_arms=10, random_state=random_state)
         if bandit_experiment_means is not None:                 # if we provided a specific bandit, use it
             self.problem.bandit_means = \
                 np.copy(bandit_experiment_means)                # make a copy of provided means
@@ -76,6 +81,8 @@ class bandit_example(object):
             self.optimal_action += self.problem.action(self.problem.optimal_action())
 
     def run_experiment(self, timesteps, walk=False):
+        if walk:                                                        # generate the walk a block at a time
+            WalkTrajectory(self.problem)
         for step in range(timesteps):
             self.average_update(step)                                   # update the sample average
             self.bandit_update(step)                                    # update the step-size action-value
@@ -85,42 +92,18 @@ class bandit_example(object):
                 self.problem.random_walk()
 
 
-def run_trial(epsilon):
-    """Runs an experiment as outlined in the non-stationary example"""
-    bandit_wrapper = np.zeros(len(epsilons))
-    sample_average_wrapper = np.zeros(len(epsilons))
-    ucb_wrapper = np.zeros(len(epsilons))
-    optimal_wrapper = np.zeros(len(epsilons))
-
-    bandit_sample = []                                      # the reward for each trial
-    sample_average_sample = []                              # the sample avg for each trial
-    ucb_sample = []                                         # the UCB avg for each trial
-    optimal_sample = []                                     # the reward for optimal choices
-    print(epsilon)
-    for i in range(2000):                                   # averaged over this many trials
-        experiment = bandit_example(
-            epsilon=epsilon,
-            bandit_experiment_means=initial_bandit_means)       # create a new experiment to run
-        experiment.run_experiment(timesteps, walk=random_walk)  # run experiment
-
-        # add the averaged reward for each method to the avg performance list
-        bandit_sample.append(experiment.simple_bandit_reward_count/(timesteps/2))
-        sample_average_sample.append(experiment.simple_average_reward_count/(timesteps/2))
-        optimal_sample.append(experiment.optimal_action/(timesteps/2))
-        ucb_sample.append(experiment.ucb_reward_count / (timesteps/2))
-
-    # find the mean performance for the given epsilon and record it
-    index = epsilons.index(epsilon)                                                 # where we should store the results
-    bandit_wrapper[index] = np.mean(bandit_sample)                                  # record the results
-    sample_average_wrapper[index] = np.mean(sample_average_sample)
-    ucb_wrapper[index] = np.mean(ucb_sample)
-    optimal_wrapper[index] = np.mean(optimal_sample)
-    return bandit_wrapper, sample_average_wrapper, ucb_wrapper, optimal_wrapper     # return the performance
-
-
 epsilons = [1/128., 1/64., 1/32., 1/16., 1/8., 1/4., 1/2., 1, 2, 4]     # the epsilons we sweep over
 timesteps = 200000                                                      # the number of timesteps per trial
 random_walk = True
+expected_rewards = False                                                # score pulls by true means, with shared noise
+shared_draws = False                                                    # every epsilon faces the same runs
+precision = 'double'                                                    # or 'single': float32 estimates and means
+target_half_width = None                                                # e.g. 0.01: stop a cell once its 95% CI is
+                                                                        # this narrow (None: all 2000 trials)
+coordinator_address = None                                              # e.g. ('127.0.0.1', 50000); see the readme
+profile_steps = False                                                   # time the phases of every learner's steps
+status_path = 'sweep_status.json'                                       # progress, ETA and running means, kept current
+status_address = None                                                   # e.g. ('127.0.0.1', 8765) to also serve it as JSON
 bandit = np.zeros(len(epsilons))                                        # where the avg performance is stored
 sample_average = np.zeros(len(epsilons))
 ucb = np.zeros(len(epsilons))
@@ -128,11 +111,27 @@ optimal = np.zeros(len(epsilons))
 
 
 if __name__ == "__main__":
-    p = Pool(3)                                 # create 3 threads which run the sweep
-    results = p.map(run_trial, epsilons)        # each thread runs function run_trial() with an epsilon from epsilons
-    p.close()                                   # ends the sweep
-
-    bandit, sample_average, ucb, optimal = np.sum(results, axis=0)                      # collect the sweep results
+    problem = SweepProblem(epsilons, initial_means=initial_bandit_means, timesteps=timesteps, walk=random_walk,
+                           burn_in=100000, seed=root_seed, expected_rewards=expected_rewards,
+                           common_noise=expected_rewards, profile=profile_steps,
+                           precision=precision, shared_draws=shared_draws)     # sent to each worker once
+    store = ResultStore('statpools_sweep_long_cells')      # finished units survive a crash; a re-run resumes
+    cache = ResultCache('.sweep_cache')                     # units already run under this configuration are reused
+    scheduler = SweepScheduler(problem, number_of_trials=2000, batch_size=100, store=store, cache=cache,
+                               target_half_width=target_half_width,  # with a target, at most 2000 per epsilon
+                               telemetry=Telemetry(status_path=status_path, address=status_address))
+    if coordinator_address is None:
+        statistics = scheduler.run()
+    else:                                                   # workers: python -m pysrc.cluster HOST PORT
+        statistics = Coordinator(scheduler, address=coordinator_address).run()
+    for name, (mean, half_width, count) in sorted(scheduler.summary().items()):
+        print(name, "95% CI half-widths:", half_width, "trials:", count)
+    bandit, sample_average, ucb, optimal = [statistics[name].mean for name in ['bandit', 'sample_average', 'ucb',
+                                                                                'optimal']]
+    for name, reduction in variance_reduction(statistics).items():     # how many times fewer trials are needed
+        print(name, "variance reduction:", reduction)
+    if profile_steps:
+        print(scheduler.profile_report())
     pkl.dump((bandit,sample_average,ucb,optimal), open('statpools_sweep_long', "wb"))   # save results to file
 
     # Figure Plotting
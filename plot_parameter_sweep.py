@@ -1,8 +1,22 @@
 import matplotlib.pyplot as plt
+import numpy as np
+import os
 import pickle as pkl
+from pysrc.store import ResultStore
 __author__ = 'kongaloosh'
+
+
+def load_sweep(name):
+    """Loads a finished sweep, or whatever units of it are done so far if its unit store is there"""
+    if os.path.isdir(name + '_cells'):
+        statistics = ResultStore(name + '_cells').statistics(['bandit', 'sample_average', 'ucb', 'optimal'])
+        return [np.where(statistics[learner].count > 0, statistics[learner].mean, np.nan)     # nan is not plotted
+                for learner in ['bandit', 'sample_average', 'ucb', 'optimal']]
+    return pkl.load(open(name, "rb"))
+
+
 epsilons = [1/128., 1/64., 1/32., 1/16., 1/8., 1/4., 1/2., 1, 2, 4]
-(bandit, sample_average, ucb, optimal) = pkl.load(open('statpools_sweep_long', "r"))
+(bandit, sample_average, ucb, optimal) = load_sweep('statpools_sweep_long')
 plt.figure(figsize=(20, 8))
 
 plt.suptitle("The Average Reward From a 10-armed bandit over 2000 trials")
@@ -19,7 +33,7 @@ plt.plot(epsilons[3:], ucb[3:], label="UCB")
 plt.plot(epsilons, optimal, label="optimal")
 plt.legend(bbox_to_anchor=(0, 0), loc=3, borderaxespad=0.)
 
-(bandit, sample_average, ucb, optimal) = pkl.load(open('pools_sweep_long', "r"))
+(bandit, sample_average, ucb, optimal) = load_sweep('pools_sweep_long')
 plt.subplot(122)
 plt.title("The Average Reward From a 10-armed bandit over 2000 trials")
 plt.ylabel("With Random Walk")
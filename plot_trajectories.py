@@ -0,0 +1,31 @@
+import matplotlib.pyplot as plt
+import sys
+from pysrc.trajectories import TrajectoryStore
+__author__ = 'kongaloosh'
+
+
+def plot_store(directory, index=Ellipsis):
+    """Plots the mean and 5-95% band over the runs of every learner's reward, % optimal and cumulative regret.
+
+    index picks the runs, e.g. (p,) for parameter p of a sweep's (params x trials x steps) store.
+    """
+    store = TrajectoryStore(directory)
+    panels = [('rewards', "Average Reward", False), ('optimal', "% optimal actions", False),
+              ('regret', "Cumulative Regret", True)]
+    plt.figure(figsize=(20, 6))
+    plt.suptitle("Every run of {0}".format(directory))
+    for panel, (field, label, cumulative) in enumerate(panels):
+        plt.subplot(1, len(panels), panel + 1)
+        plt.ylabel(label)
+        plt.xlabel("Steps")
+        for name in store.learners:
+            mean, (low, median, high) = store.summary(name, field, index=index, cumulative=cumulative)
+            plt.plot(mean, label=name)
+            plt.fill_between(range(len(mean)), low, high, alpha=0.2)
+        plt.legend()
+
+
+if __name__ == "__main__":
+    plot_store(sys.argv[1], tuple(int(i) for i in sys.argv[2:]) or Ellipsis)
+    plt.savefig('trajectories.png')
+    plt.show()
@@ -0,0 +1,263 @@
+from collections import OrderedDict
+import argparse
+from multiprocessing import cpu_count
+import json
+import platform
+import sys
+import time
+from pysrc.experiment import BanditExperiment, BatchedBanditExperiment
+from pysrc.learning import BanditSampleAverage, SimpleBandit, UCB, BatchedBanditSampleAverage, BatchedSimpleBandit
+from pysrc.runner import BatchedRun
+from pysrc.scheduler import SweepProblem, SweepScheduler
+from pysrc.streams import trial_random_state, trial_streams
+import numpy as np
+
+__author__ = 'kongaloosh'
+
+LEARNERS = OrderedDict([                                            # the per-run learners, for a number of arms
+    ('sample_average', lambda arms: BanditSampleAverage(arms, 0.1, random_state=np.random.RandomState(0))),
+    ('bandit', lambda arms: SimpleBandit(arms, 0.1, 0.1, random_state=np.random.RandomState(0))),
+    ('ucb', lambda arms: UCB(0.1, arms, 2.)),
+])
+
+
+def best_time(function, repeat=3):
+    """The fastest of repeat calls of function, in seconds"""
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def learner_rate(name, number_of_arms, steps=10000, repeat=3):
+    """Steps per second of a per-run learner: picking an arm and updating its estimate"""
+    rewards = np.random.RandomState(0).normal(size=steps)
+
+    def run():
+        learner = LEARNERS[name](number_of_arms)
+        with np.errstate(divide='ignore', invalid='ignore'):     # UCB divides by unvisited counts
+            for t in range(1, steps + 1):
+                arm = learner.get_action(t) if name == 'ucb' else learner.get_action()
+                learner.update_average(arm, rewards[t - 1])
+    return steps / best_time(run, repeat)
+
+
+def problem_rate(method, number_of_arms, steps=10000, repeat=3):
+    """Calls per second of BanditExperiment.action (on a random arm) or BanditExperiment.random_walk"""
+    arms = np.random.RandomState(0).randint(number_of_arms, size=steps)
+
+    def run():
+        problem = BanditExperiment(number_of_arms, random_state=np.random.RandomState(1))
+        if method == 'action':
+            for arm in arms:
+                problem.action(arm)
+        else:
+            for _ in range(steps):
+                problem.random_walk()
+    return steps / best_time(run, repeat)
+
+
+def experiment_1_rate(number_of_runs, timesteps, number_of_arms, repeat=3):
+    """Trials per second of experiment_1's workload: the two stationary learners, with per-step curves"""
+    def run():
+        streams = trial_streams(0, range(number_of_runs))
+        problem = BatchedBanditExperiment(number_of_runs, number_of_arms, random_state=streams['random_state'],
+                                          walk_random_state=streams['walk_random_state'])
+        exploration = streams['exploration_random_state']
+        learners = OrderedDict([
+            ('simple_average', BatchedBanditSampleAverage(number_of_runs, number_of_arms, 0.1,
+                                                          random_state=exploration)),
+            ('simple_bandit', BatchedSimpleBandit(number_of_runs, number_of_arms, 0.1, 0.1,
+                                                  random_state=exploration)),
+        ])
+        BatchedRun(learners, problem).run_experiment(timesteps, record_curves=True, optimal_baseline=False)
+    return number_of_runs / best_time(run, repeat)
+
+
+def experiment_2_rate(number_of_trials, timesteps, number_of_arms, processes, repeat=3):
+    """Trials per second of experiment_2's workload: a two-parameter random-walk sweep on a pool of processes"""
+    problem = SweepProblem([1/8., 1/2.], timesteps=timesteps, walk=True, burn_in=timesteps // 2,
+                           number_of_arms=number_of_arms, seed=0)
+    batch_size = max(1, number_of_trials // (2 * processes))          # a unit or more for every worker
+
+    def run():
+        SweepScheduler(problem, number_of_trials=number_of_trials, batch_size=batch_size, processes=processes).run()
+    return len(problem.parameters) * number_of_trials / best_time(run, repeat)
+
+
+def state_bytes(experiment):
+    """Bytes of learner estimates, visit counts and arm means held per run of every parameter, for a BatchedRun"""
+    arrays = [experiment.problem.bandit_means]
+    for learner in experiment.learners.values():
+        arrays.append(learner.bandit_estimates)
+        if hasattr(learner, 'bandit_visits'):
+            arrays.append(learner.bandit_visits)
+    return sum(array.nbytes for array in arrays) / float(experiment.learners['ucb'].bandit_estimates[..., 0].size)
+
+
+def precision_comparison(parameters, timesteps, burn_in, number_of_trials, initial_means=None, walk=True,
+                         number_of_arms=10, seed=0, batch_size=100, processes=None, precisions=('double', 'single')):
+    """Runs the same seeded sweep at each precision and compares every learner's results with the first's.
+
+    Every precision draws the same noise, walks and coin flips, so differences come from rounding alone (which may
+    flip a greedy choice and send a run down another path). Returns precision -> (seconds, bytes of state per run,
+    statistics), and learner -> precision -> (largest absolute difference in mean reward over the parameters, and
+    that difference over the reference's confidence half-width).
+    """
+    results = OrderedDict()
+    for precision in precisions:
+        problem = SweepProblem(parameters, initial_means=initial_means, timesteps=timesteps, walk=walk,
+                               burn_in=burn_in, number_of_arms=number_of_arms, seed=seed, precision=precision)
+        start = time.perf_counter()
+        statistics = SweepScheduler(problem, number_of_trials=number_of_trials, batch_size=batch_size,
+                                    processes=processes).run()
+        seconds = time.perf_counter() - start
+        results[precision] = (seconds, state_bytes(problem.start_unit((0, 0, 0, 1))), statistics)
+    reference = results[precisions[0]][2]
+    differences = OrderedDict()
+    for name in reference:
+        differences[name] = OrderedDict()
+        for precision in precisions[1:]:
+            difference = np.abs(results[precision][2][name].mean - reference[name].mean)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                relative = difference / reference[name].half_width()
+            differences[name][precision] = (np.max(difference), np.max(relative))
+    return results, differences
+
+
+def environment():
+    """What the numbers were measured on"""
+    return {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpus': cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+    }
+
+
+def run_suite(arm_counts=(10, 100, 1000), horizons=(1000, 10000), worker_counts=None, steps=10000,
+              number_of_runs=100, number_of_trials=64, repeat=3, log=None):
+    """Runs every benchmark and returns the environment and a list of results.
+
+    The per-run learners and BanditExperiment.action / random_walk run for steps steps at each number of arms; the
+    experiment_1 workload runs number_of_runs trials and the experiment_2 workload number_of_trials trials per
+    parameter, at each horizon and (for experiment_2) each number of workers, with 10 arms. worker_counts defaults to
+    one and every core. Every result is the best of repeat; rates are per second, so higher is better.
+    """
+    if worker_counts is None:
+        worker_counts = sorted({1, cpu_count()})
+    cases = []
+    for arms in arm_counts:
+        for name in LEARNERS:
+            cases.append(('learner/' + name, arms, None, None, 'steps/s',
+                          lambda name=name, arms=arms: learner_rate(name, arms, steps, repeat)))
+        for method in 'action', 'random_walk':
+            cases.append(('problem/' + method, arms, None, None, 'calls/s',
+                          lambda method=method, arms=arms: problem_rate(method, arms, steps, repeat)))
+    for horizon in horizons:
+        cases.append(('experiment_1', 10, horizon, None, 'trials/s',
+                      lambda horizon=horizon: experiment_1_rate(number_of_runs, horizon, 10, repeat)))
+        for workers in worker_counts:
+            cases.append(('experiment_2', 10, horizon, workers, 'trials/s',
+                          lambda horizon=horizon, workers=workers: experiment_2_rate(number_of_trials, horizon, 10,
+                                                                                     workers, repeat)))
+    results = []
+    for benchmark, arms, horizon, workers, unit, measure in cases:
+        result = {'benchmark': benchmark, 'arms': arms, 'horizon': horizon, 'workers': workers, 'unit': unit,
+                  'rate': measure()}
+        if log is not None:
+            log(describe(result))
+        results.append(result)
+    return {'environment': environment(), 'results': results}
+
+
+def key(result):
+    return result['benchmark'], result['arms'], result['horizon'], result['workers']
+
+
+def describe(result):
+    settings = ', '.join('{0}={1}'.format(name, result[name]) for name in ('arms', 'horizon', 'workers')
+                         if result[name] is not None)
+    return '{0:<24} {1:<34} {2:>14.1f} {3}'.format(result['benchmark'], settings, result['rate'], result['unit'])
+
+
+def save(suite, path):
+    with open(path, 'w') as f:
+        json.dump(suite, f, indent=1)
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline, current, tolerance=0.1):
+    """The results of current that are more than tolerance (a fraction) slower than the same benchmark in baseline.
+
+    Returns (result, baseline rate, relative change) for each regression; benchmarks that only one suite ran are
+    left out.
+    """
+    baseline_rates = dict((key(result), result['rate']) for result in baseline['results'])
+    regressions = []
+    for result in current['results']:
+        if key(result) not in baseline_rates:
+            continue
+        change = result['rate'] / baseline_rates[key(result)] - 1.
+        if change < -tolerance:
+            regressions.append((result, baseline_rates[key(result)], change))
+    return regressions
+
+
+def main(argv=None):
+    """python -m pysrc.benchmark run OUTPUT [--quick], compare BASELINE CURRENT [--tolerance 0.1], or precision
+
+    compare exits with status 1 if anything regressed, so it can gate a change. precision runs a shortened
+    experiment_2 sweep in double and single precision and prints how far apart the results are.
+    """
+    parser = argparse.ArgumentParser(prog='python -m pysrc.benchmark')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run = commands.add_parser('run', help='run the suite and write the results as JSON')
+    run.add_argument('output')
+    run.add_argument('--quick', action='store_true', help='fewer, shorter cases, as a smoke test')
+    check = commands.add_parser('compare', help='flag benchmarks that got slower than a baseline')
+    check.add_argument('baseline')
+    check.add_argument('current')
+    check.add_argument('--tolerance', type=float, default=0.1, help='the fraction of a rate that may be lost')
+    accuracy = commands.add_parser('precision', help='compare single- with double-precision sweep results')
+    accuracy.add_argument('--timesteps', type=int, default=20000)
+    accuracy.add_argument('--trials', type=int, default=200)
+    arguments = parser.parse_args(argv)
+
+    if arguments.command == 'run':
+        if arguments.quick:
+            suite = run_suite(arm_counts=(10,), horizons=(1000,), worker_counts=(1,), steps=2000, repeat=1, log=print)
+        else:
+            suite = run_suite(log=print)
+        save(suite, arguments.output)
+        return 0
+    if arguments.command == 'precision':
+        epsilons = [1/128., 1/64., 1/32., 1/16., 1/8., 1/4., 1/2., 1, 2, 4]   # experiment_2's sweep
+        initial_means = trial_random_state(1994).normal(size=10)
+        results, differences = precision_comparison(epsilons, arguments.timesteps, arguments.timesteps // 2,
+                                                    arguments.trials, initial_means=initial_means, seed=1994)
+        for precision, (seconds, state, _) in results.items():
+            print('{0:<8} {1:>8.1f} s {2:>8.0f} bytes of state per run'.format(precision, seconds, state))
+        for name, compared in differences.items():
+            for precision, (difference, relative) in compared.items():
+                print('{0:<16} {1:<8} largest difference {2:.5f} ({3:.3f} half-widths)'.format(
+                    name, precision, difference, relative))
+        return 0
+    regressions = compare(load(arguments.baseline), load(arguments.current), arguments.tolerance)
+    for result, baseline_rate, change in regressions:
+        print('REGRESSION {0} (was {1:.1f}, {2:+.1%})'.format(describe(result), baseline_rate, change))
+    if not regressions:
+        print('no regressions beyond {0:.0%}'.format(arguments.tolerance))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
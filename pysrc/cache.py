@@ -0,0 +1,89 @@
+import hashlib
+import json
+import os
+import pickle as pkl
+import tempfile
+import numpy as np
+
+__author__ = 'kongaloosh'
+
+
+def canonical(value):
+    """Turns a configuration into plain JSON values: arrays become lists and classes become their qualified names"""
+    if isinstance(value, dict):
+        return dict((str(key), canonical(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return [canonical(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return canonical(value.tolist())
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, type):
+        return value.__module__ + '.' + value.__name__
+    if isinstance(value, float):
+        return repr(value)                                          # keep every bit of the float
+    return value
+
+
+def configuration_key(configuration):
+    """Hashes a full experiment configuration into the key its results are stored under"""
+    text = json.dumps(canonical(configuration), sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class ResultCache(object):
+
+    def __init__(self, directory, max_bytes=2**30):
+        """Stores results under the hash of the configuration that produced them.
+
+        Reads refresh an entry's modification time; once the cache holds more than max_bytes the least recently
+        used entries are evicted.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def path(self, key):
+        return os.path.join(self.directory, key + '.pkl')
+
+    def get(self, configuration):
+        """Returns the stored result for configuration, or None if it has not been computed"""
+        path = self.path(configuration_key(configuration))
+        try:
+            with open(path, 'rb') as f:
+                result = pkl.load(f)
+            os.utime(path, None)                                    # mark it recently used
+        except (IOError, OSError, EOFError, pkl.UnpicklingError):  # missing, or evicted by another process
+            return None
+        return result
+
+    def put(self, configuration, result):
+        """Atomically stores result under configuration's key, then evicts down to the size cap"""
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(handle, 'wb') as f:
+            pkl.dump(result, f, protocol=pkl.HIGHEST_PROTOCOL)
+        os.replace(temporary, self.path(configuration_key(configuration)))
+        self.evict()
+
+    def memoize(self, configuration, compute):
+        """Returns the stored result for configuration, calling compute() and storing its result on a miss"""
+        result = self.get(configuration)
+        if result is None:
+            result = compute()
+            self.put(configuration, result)
+        return result
+
+    def evict(self):
+        """Removes the least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.pkl'):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.directory, name))
+            total -= size
@@ -0,0 +1,115 @@
+import argparse
+import os
+import pickle as pkl
+import sys
+from pysrc.cache import ResultCache
+from pysrc.cluster import Coordinator
+from pysrc.noise import NoiseBuffer
+from pysrc.runner import build_grid
+from pysrc.scheduler import SweepProblem, SweepScheduler
+from pysrc.spec import initial_means, load_spec
+from pysrc.store import ResultStore
+from pysrc.streams import trial_streams
+from pysrc.telemetry import Telemetry
+
+__author__ = 'kongaloosh'
+
+
+def sweep_problem(spec):
+    return SweepProblem(spec['parameters'], initial_means=initial_means(spec), timesteps=spec['timesteps'],
+                        walk=spec['problem'] == 'random_walk', burn_in=spec['burn_in'], step_size=spec['step_size'],
+                        number_of_arms=spec['arms'], seed=spec['seed'], expected_rewards=spec['expected_rewards'],
+                        common_noise=spec['expected_rewards'], precision=spec['precision'],
+                        learners=spec['learners'], shared_draws=spec['shared_draws'])
+
+
+def run_sweep(spec):
+    """Runs a sweep spec into its output directory, resuming from whatever units are already there.
+
+    Units are committed to <output>/units (a ResultStore) as they finish, and the live status is kept in
+    <output>/status.json. Returns the per-parameter statistics of each learner.
+    """
+    store = ResultStore(os.path.join(spec['output'], 'units'))
+    cache = ResultCache(spec['cache']) if spec['cache'] is not None else None
+    telemetry = Telemetry(status_path=os.path.join(spec['output'], 'status.json'), address=spec['status_address'])
+    scheduler = SweepScheduler(sweep_problem(spec), number_of_trials=spec['trials'], batch_size=spec['batch_size'],
+                               processes=spec['processes'], store=store, cache=cache,
+                               target_half_width=spec['target_half_width'], minimum_trials=spec['minimum_trials'],
+                               telemetry=telemetry)
+    if spec['coordinator_address'] is not None:                     # workers: python -m pysrc.cluster HOST PORT
+        return Coordinator(scheduler, address=tuple(spec['coordinator_address'])).run()
+    return scheduler.run()
+
+
+def run_curves(spec):
+    """Runs a curves spec: every run of every parameter at once, keeping the per-step statistics over the runs.
+
+    Saves {'parameters', 'rewards', 'optimal', 'statistics'} to <output>/curves.pkl, where rewards and optimal map
+    each learner to (steps x parameters) RunningStatistics of its reward and % optimal action, and statistics are
+    the reward statistics after the burn-in. Returns the same dict.
+    """
+    if spec['seed'] is None:
+        streams = {'random_state': NoiseBuffer(block_size=2**20)}
+    else:
+        streams = trial_streams(spec['seed'], range(spec['trials']))
+    experiment = build_grid(spec['parameters'], spec['trials'], initial_means=initial_means(spec),
+                            burn_in=spec['burn_in'], step_size=spec['step_size'], number_of_arms=spec['arms'],
+                            expected_rewards=spec['expected_rewards'], common_noise=spec['expected_rewards'],
+                            precision=spec['precision'], learners=spec['learners'], **streams)
+    experiment.run_experiment(spec['timesteps'], walk=spec['problem'] == 'random_walk', record_curves=True)
+    curves = {
+        'parameters': spec['parameters'],
+        'rewards': experiment.rewards,
+        'optimal': experiment.optimal,
+        'statistics': experiment.reward_statistics(),
+    }
+    if not os.path.isdir(spec['output']):
+        os.makedirs(spec['output'])
+    with open(os.path.join(spec['output'], 'curves.pkl'), 'wb') as f:
+        pkl.dump(curves, f)
+    return curves
+
+
+def load_results(spec):
+    """The stored results of a spec: a curves dict, or a sweep's statistics, which may still be partial"""
+    if spec['kind'] == 'curves':
+        with open(os.path.join(spec['output'], 'curves.pkl'), 'rb') as f:
+            return pkl.load(f)
+    return ResultStore(os.path.join(spec['output'], 'units')).statistics(spec['learners'] + ['optimal'])
+
+
+def main(argv=None):
+    """python -m pysrc.cli run SPEC, or plot SPEC [--show].
+
+    run only imports the numeric core, so the pool's workers start quickly; plot is a separate stage that reads
+    the stored results and is the only one that imports matplotlib.
+    """
+    parser = argparse.ArgumentParser(prog='python -m pysrc.cli')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run = commands.add_parser('run', help='run the experiment a spec describes')
+    run.add_argument('spec')
+    run.add_argument('--processes', type=int, help='overrides the spec')
+    plot = commands.add_parser('plot', help="plot a spec's stored results")
+    plot.add_argument('spec')
+    plot.add_argument('--show', action='store_true', help='also open the figure in a window')
+    arguments = parser.parse_args(argv)
+    spec = load_spec(arguments.spec)
+
+    if arguments.command == 'plot':
+        from pysrc import plotting                                  # only the plotting stage needs matplotlib
+        for path in plotting.plot(spec, load_results(spec), show=arguments.show):
+            print(path)
+        return 0
+    if arguments.processes is not None:
+        spec['processes'] = arguments.processes
+    if spec['kind'] == 'curves':
+        statistics = run_curves(spec)['statistics']
+    else:
+        statistics = run_sweep(spec)
+    for name, result in sorted(statistics.items()):
+        print(name, "mean reward:", result.mean, "95% CI half-width:", result.half_width())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
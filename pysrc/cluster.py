@@ -0,0 +1,267 @@
+from multiprocessing.managers import BaseManager
+import os
+import secrets
+import socket
+import sys
+import threading
+import time
+from pysrc import scheduler as local
+from pysrc.profiling import worker_name
+import numpy as np
+
+__author__ = 'kongaloosh'
+
+WAIT = 'wait'                                                       # no unit free yet, but the sweep is not done
+AUTHKEY_VARIABLE = 'BANDITS_AUTHKEY'                                # where workers (and coordinators) find the key
+
+
+def environment_authkey():
+    """The authkey in the BANDITS_AUTHKEY environment variable, as bytes, or None if it is not set"""
+    authkey = os.environ.get(AUTHKEY_VARIABLE)
+    return authkey.encode() if authkey else None
+
+
+class WorkQueue(object):
+
+    def __init__(self, scheduler, lease_timeout=60.):
+        """The coordinator's side of a distributed sweep: hands out a SweepScheduler's units and takes them back.
+
+        A unit is leased to the worker that takes it. Workers renew their leases with heartbeats while they run;
+        a lease that is not renewed within lease_timeout seconds (the worker died, hung or lost its connection)
+        goes back to the front of the queue. The first result to come back for a unit is kept.
+        """
+        self.scheduler = scheduler
+        self.lease_timeout = lease_timeout
+        self.leases = {}                                            # unit -> [worker, deadline]
+        self.finished = set()
+        self.in_flight = np.zeros(len(scheduler.problem.parameters))   # trials leased out, for sequential sweeps
+        self.lost = 0                                               # leases that expired and were re-queued
+        self.lock = threading.Lock()                                # each connection is served by its own thread
+
+    def problem(self):
+        return self.scheduler.problem
+
+    def timeout(self):
+        return self.lease_timeout
+
+    def reporting(self):
+        """Whether workers should report their progress, i.e. whether the scheduler has telemetry"""
+        return self.scheduler.telemetry is not None
+
+    def put(self, report):
+        """Takes a worker's progress report, as the telemetry's queue would"""
+        self.scheduler.telemetry.put(report)
+
+    def take(self):
+        """The scheduler's next unit, or None once it has none to give"""
+        if self.scheduler.target_half_width is None:
+            return self.scheduler.units.pop(0) if self.scheduler.units else None
+        return self.scheduler.next_unit(self.in_flight)
+
+    def expire(self):
+        """Puts the units of workers that have gone quiet back on the queue"""
+        now = time.time()
+        for unit, (worker, deadline) in list(self.leases.items()):
+            if deadline < now:
+                del self.leases[unit]
+                self.in_flight[unit[0]] -= unit[3]
+                self.scheduler.units.insert(0, unit)
+                self.lost += 1
+
+    def lease(self, worker):
+        """Gives worker a unit to run, WAIT if the rest are all leased out, or None once the sweep is done"""
+        with self.lock:
+            self.expire()
+            unit = self.take()
+            if unit is None:
+                return WAIT if self.leases else None
+            self.leases[unit] = [worker, time.time() + self.lease_timeout]
+            self.in_flight[unit[0]] += unit[3]
+            return unit
+
+    def heartbeat(self, worker):
+        """Renews every lease worker holds"""
+        with self.lock:
+            for lease in self.leases.values():
+                if lease[0] == worker:
+                    lease[1] = time.time() + self.lease_timeout
+
+    def complete(self, worker, unit, statistics, profile=None):
+        """Takes a unit's result, unless the unit was already finished by another worker"""
+        unit = tuple(unit)
+        with self.lock:
+            if unit in self.finished:
+                return
+            if unit in self.leases:
+                del self.leases[unit]
+                self.in_flight[unit[0]] -= unit[3]
+            elif unit in self.scheduler.units:                      # re-queued, and not handed out again yet
+                self.scheduler.units.remove(unit)
+            self.finished.add(unit)
+            self.scheduler.finish(unit, statistics, profile)
+
+    def done(self):
+        """Whether every unit has come back and the scheduler has none left to give"""
+        with self.lock:
+            self.expire()
+            if self.leases:
+                return False
+            unit = self.take()
+            if unit is None:
+                return True
+            self.scheduler.units.insert(0, unit)
+            return False
+
+
+class Coordinator(object):
+
+    def __init__(self, scheduler, address=('127.0.0.1', 50000), authkey=None, lease_timeout=60.,
+                 poll_interval=0.1):
+        """Serves a SweepScheduler's units to workers over TCP, with multiprocessing.managers.
+
+        Results are merged (and saved to the scheduler's store and cache) as they come back, exactly as a local
+        run merges them. Start workers with run_worker(address, authkey), or python -m pysrc.cluster HOST PORT with
+        the key in BANDITS_AUTHKEY.
+
+        Workers send pickles, so whoever holds the authkey can run code on the coordinator. The key is authkey, or
+        BANDITS_AUTHKEY, or else a random one that start prints. The address is local by default; to serve other
+        machines bind to an interface they can reach on purpose, e.g. ('0.0.0.0', 50000), and only on a network
+        you trust.
+        """
+        self.work = WorkQueue(scheduler, lease_timeout)
+        self.address = address
+        self.generated = False                                      # whether the key has to be handed out
+        if authkey is None:
+            authkey = environment_authkey()
+        if authkey is None:
+            authkey = secrets.token_hex(16).encode()
+            self.generated = True
+        self.authkey = authkey
+        self.poll_interval = poll_interval
+        self.server = None
+        self.serving = None                                         # the thread accepting connections
+        self.stopping = threading.Event()
+
+    def start(self):
+        """Starts serving on threads of this process; address then holds the port actually bound.
+
+        The server answers until stop, so workers that ask for a unit after the sweep is done are told so, and exit.
+        """
+        class Manager(BaseManager):
+            pass
+        Manager.register('work_queue', callable=lambda: self.work,
+                         exposed=('problem', 'timeout', 'reporting', 'put', 'lease', 'heartbeat', 'complete'))
+        self.server = Manager(address=self.address, authkey=self.authkey).get_server()
+        self.address = self.server.address
+        self.server.stop_event = self.stopping                      # each connection is served until it is set
+        self.serving = threading.Thread(target=self.serve, daemon=True)
+        self.serving.start()
+        if self.generated:
+            print("workers: {0}={1} python -m pysrc.cluster {2} {3}".format(
+                AUTHKEY_VARIABLE, self.authkey.decode(), self.address[0], self.address[1]))
+
+    def serve(self):
+        """Accepts connections until stop, serving each on its own thread.
+
+        Server.serve_forever is not used, since its accepting thread cannot be stopped once it has started.
+        """
+        while True:
+            try:
+                connection = self.server.listener.accept()
+            except OSError:
+                if self.stopping.is_set():
+                    return
+                continue
+            if self.stopping.is_set():                              # the connection stop made to wake us
+                connection.close()
+                return
+            threading.Thread(target=self.server.handle_request, args=(connection,), daemon=True).start()
+
+    def stop(self):
+        """Stops accepting workers and closes the listening socket.
+
+        A worker that is still connected is answered once more, then let go.
+        """
+        if self.serving is None:
+            return
+        self.stopping.set()
+        try:                                                        # wake the accepting thread
+            socket.create_connection(self.address, timeout=5.).close()
+        except OSError:
+            pass
+        self.serving.join()
+        self.server.listener.close()
+        self.serving = None
+
+    def wait(self):
+        """Waits for every unit to come back and returns the per-parameter statistics of each learner"""
+        while not self.work.done():
+            time.sleep(self.poll_interval)
+        return self.work.scheduler.statistics
+
+    def run(self):
+        """Serves the sweep until every unit is back, then stops serving and returns the statistics"""
+        telemetry = self.work.scheduler.telemetry
+        if telemetry is not None:                                   # workers report through the work queue
+            telemetry.start(self.work.scheduler)
+        self.start()
+        try:
+            return self.wait()
+        finally:
+            self.stop()
+            if telemetry is not None:
+                telemetry.stop()
+
+
+class WorkerManager(BaseManager):
+    pass
+
+
+WorkerManager.register('work_queue')
+
+
+def run_worker(address, authkey=None, poll_interval=0.5):
+    """Runs units from the coordinator at address until the sweep is done, returning how many it ran.
+
+    authkey defaults to the BANDITS_AUTHKEY environment variable; there is no built-in key.
+    """
+    if authkey is None:
+        authkey = environment_authkey()
+    if authkey is None:
+        raise ValueError("no authkey: pass the coordinator's or set {0}".format(AUTHKEY_VARIABLE))
+    manager = WorkerManager(address=tuple(address), authkey=authkey)
+    manager.connect()
+    work = manager.work_queue()
+    local.start_worker(work.problem(), work if work.reporting() else None)
+    heartbeat_interval = work.timeout() / 4.
+    worker = worker_name()
+    finished = 0
+    try:
+        while True:
+            unit = work.lease(worker)
+            if unit is None:
+                return finished
+            if unit == WAIT:                                        # the last units are still out
+                time.sleep(poll_interval)
+                continue
+            running = threading.Event()
+
+            def beat():
+                while not running.wait(heartbeat_interval):
+                    work.heartbeat(worker)
+            beating = threading.Thread(target=beat, daemon=True)
+            beating.start()
+            try:
+                unit, statistics, profile = local.run_worker_unit(unit)
+            finally:
+                running.set()
+                beating.join()
+            work.complete(worker, unit, statistics, profile)
+            finished += 1
+    except (EOFError, ConnectionError):                             # the coordinator has finished and gone away
+        return finished
+
+
+if __name__ == "__main__":                                          # the key comes from BANDITS_AUTHKEY, not argv
+    host, port = sys.argv[1], int(sys.argv[2])
+    run_worker((host, port))
@@ -1,24 +1,192 @@
+from pysrc.precision import policy
+from pysrc.snapshot import copy_random_state
 import numpy as np
 
 __author__ = 'kongaloosh'
 
 
 class BanditExperiment(object):
+    __slots__ = ('bandit_means', 'random_state', 'walk_random_state', 'trajectory', 'optimal_cache')
 
-    def __init__(self, number_of_arms):
-        """Creates an n-armed bandit"""
-        self.bandit_means = np.zeros(number_of_arms)
+    def __init__(self, number_of_arms, random_state=None, walk_random_state=None, precision=None):
+        """Creates an n-armed bandit; random_state defaults to np.random and may be a NoiseBuffer.
+
+        walk_random_state, if given, drives the random walk separately from the reward noise. The optimal arm is
+        worked out once per set of means; code that writes into bandit_means after the first optimal_action should
+        reset optimal_cache. precision ('double' or 'single', see pysrc.precision) sets the dtype of the means.
+        """
+        self.bandit_means = np.zeros(number_of_arms, dtype=policy(precision).estimates)
+        self.random_state = random_state if random_state is not None else np.random
+        self.walk_random_state = walk_random_state if walk_random_state is not None else self.random_state
+        self.trajectory = None                                      # set by WalkTrajectory
+        self.optimal_cache = None                                   # (means, best arm, best mean)
 
     def action(self, arm_number):
         """Returns a value for a specific ban<"""
-        return np.random.normal(loc=self.bandit_means[arm_number], scale=1)
+        return self.random_state.normal(loc=self.bandit_means[arm_number], scale=1)
 
     def random_walk(self):
         """Randomly moves all of the arms"""
-        walk = np.random.normal(loc=0, scale=0.01, size=(len(self.bandit_means)))
+        if self.trajectory is not None:                             # the walk has already been generated
+            self.trajectory.advance()
+            return
+        walk = self.walk_random_state.normal(loc=0, scale=0.01, size=(len(self.bandit_means)))
         self.bandit_means += walk
+        self.optimal_cache = None
+
+    def walk_increments(self, steps, scale=0.01, random_state=None):
+        """Draws the random-walk increments of the next steps steps, as a (steps x arms) array"""
+        random_state = random_state if random_state is not None else self.walk_random_state
+        return random_state.normal(loc=0, scale=scale, size=(steps, len(self.bandit_means)))
 
     def optimal_action(self):
         """Returns the action with the best return. """
-        return np.argmax(self.bandit_means)
+        if self.trajectory is not None:
+            return self.trajectory.optimal_arm
+        return self.optimal()[1]
+
+    def optimal_mean(self):
+        """Returns the mean of the best arm"""
+        if self.trajectory is not None:
+            return self.trajectory.optimal_mean
+        return self.optimal()[2]
+
+    def optimal(self):
+        """The (means, best arm, best mean) of the current means, worked out only when the means have changed"""
+        if self.optimal_cache is None or self.optimal_cache[0] is not self.bandit_means:
+            arm = np.argmax(self.bandit_means)
+            self.optimal_cache = (self.bandit_means, arm, self.bandit_means[arm])
+        return self.optimal_cache
+
+
+class BatchedBanditExperiment(object):
+
+    def __init__(self, number_of_runs, number_of_arms, random_state=None, walk_random_state=None, precision=None):
+        """Creates one n-armed bandit per run, held as a (runs x arms) array.
+
+        Every draw is requested with the runs axis last, so random_state may also be a TrialStreams. As with
+        BanditExperiment, the optimal arms are cached until the means move, and precision sets their dtype.
+        """
+        self.bandit_means = np.zeros((number_of_runs, number_of_arms), dtype=policy(precision).estimates)
+        self.random_state = random_state if random_state is not None else np.random
+        self.walk_random_state = walk_random_state if walk_random_state is not None else self.random_state
+        self.trajectory = None                                      # set by WalkTrajectory
+        self.optimal_cache = None                                   # (means, best arms, best means)
+        self.runs = np.arange(number_of_runs)
+
+    def action(self, arms, noise=None):
+        """Returns a reward for every run, given the arm each run pulled.
+
+        arms may have extra leading axes, e.g. (params x runs) for a parameter grid; the settings on those axes all
+        face the same bandit and share one noise draw per run. noise, from draw_noise, reuses an earlier draw.
+        """
+        if noise is None:
+            noise = self.draw_noise()
+        return self.bandit_means[self.runs, arms] + noise
+
+    def draw_noise(self):
+        """Draws the reward noise of one pull in every run"""
+        return self.random_state.normal(loc=0, scale=1, size=len(self.runs))
+
+    def random_walk(self):
+        """Randomly moves all of the arms of every run"""
+        if self.trajectory is not None:
+            self.trajectory.advance()
+            return
+        self.bandit_means += self.walk_increments(1)[0]
+        self.optimal_cache = None
+
+    def walk_increments(self, steps, scale=0.01, random_state=None):
+        """Draws the random-walk increments of the next steps steps, as a (steps x runs x arms) array"""
+        random_state = random_state if random_state is not None else self.walk_random_state
+        number_of_runs, number_of_arms = self.bandit_means.shape
+        walk = random_state.normal(loc=0, scale=scale, size=(steps, number_of_arms, number_of_runs))
+        return walk.swapaxes(-1, -2)
+
+    def optimal_action(self):
+        """Returns the action with the best return for every run"""
+        if self.trajectory is not None:
+            return self.trajectory.optimal_arm
+        return self.optimal()[1]
+
+    def optimal_mean(self):
+        """Returns the mean of the best arm for every run"""
+        if self.trajectory is not None:
+            return self.trajectory.optimal_mean
+        return self.optimal()[2]
+
+    def optimal(self):
+        """The (means, best arms, best means) of the current means, worked out only when the means have changed"""
+        if self.optimal_cache is None or self.optimal_cache[0] is not self.bandit_means:
+            arms = np.argmax(self.bandit_means, axis=-1)
+            self.optimal_cache = (self.bandit_means, arms, self.bandit_means[self.runs, arms])
+        return self.optimal_cache
+
+
+class WalkTrajectory(object):
+
+    def __init__(self, problem, block_size=None, scale=0.01):
+        """Generates a problem's random walk a block of steps at a time and attaches itself to the problem.
+
+        Each block is the cumulative sum of the walk increments on top of the current means, with the optimal arm and
+        optimal mean of every step worked out alongside; problem.random_walk() then just moves to the next row. Only
+        one (block x ... x arms) block is held at a time, by default about a million values. Attach it once the
+        problem's starting means are set.
+
+        Each row is the row before it plus that step's increments, carried in double from one block to the next, so
+        the means do not depend on where the blocks begin: a run walks the same whatever the block size, and so
+        whatever batch it is in.
+
+        Pickling keeps the walk's random state and starting means from before the block was drawn instead of the
+        block, which is drawn again when the copy next moves.
+        """
+        self.problem = problem
+        self.scale = scale
+        if block_size is None:
+            block_size = max(1, 2**20 // problem.bandit_means.size)
+        self.block_size = block_size
+
+        self.means = problem.bandit_means[np.newaxis]               # the current block of means, one row per step
+        self.optimal_arms = np.argmax(self.means, axis=-1)
+        self.optimal_means = np.max(self.means, axis=-1)
+        self.step = 0                                               # the row of the block the problem is on
+        self.start = None                                           # the means the block was summed onto
+        self.end = problem.bandit_means.astype(float)               # the last row summed, in double
+        self.dtype = problem.bandit_means.dtype
+        self.walk_state = None                                      # a copy of the walk's RNG before the block
+        self.optimal_arm = self.optimal_arms[0]
+        self.optimal_mean = self.optimal_means[0]
+        problem.trajectory = self
+
+    def next_block(self):
+        """Generates the means for the next block_size steps, starting from the last row of the current block"""
+        self.start = self.end
+        self.walk_state = copy_random_state(self.problem.walk_random_state)
+        self.draw_block(self.problem.walk_increments(self.block_size, scale=self.scale))
+        self.step = 0
+
+    def draw_block(self, walk):
+        # one addition per step, from the row before, as if the walk had never been split into blocks
+        summed = np.cumsum(np.concatenate([self.start[np.newaxis], walk]), axis=0)[1:]
+        self.end = summed[-1]
+        self.means = summed.astype(self.dtype, copy=False)
+        self.optimal_arms = np.argmax(self.means, axis=-1)
+        self.optimal_means = np.max(self.means, axis=-1)
+
+    def advance(self):
+        """Moves the problem one step along the walk"""
+        self.step += 1
+        if self.means is None:                                      # restored from a snapshot: draw it again
+            random_state = copy_random_state(self.walk_state)
+            self.draw_block(self.problem.walk_increments(self.block_size, scale=self.scale, random_state=random_state))
+        if self.step == len(self.means):
+            self.next_block()
+        self.problem.bandit_means = self.means[self.step]
+        self.optimal_arm = self.optimal_arms[self.step]
+        self.optimal_mean = self.optimal_means[self.step]
 
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        if self.walk_state is not None:                             # the block can be drawn again
+            state.update(means=None, optimal_arms=None, optimal_means=None)
+        return state
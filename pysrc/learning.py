@@ -1,64 +1,237 @@
+from pysrc.precision import policy
+from pysrc.tournament import ArgmaxTree, KineticTournament
 import numpy as np
 
 __author__ = 'kongaloosh'
 
 
 class BanditSampleAverage(object):
+    __slots__ = ('number_of_steps', 'bandit_estimates', 'bandit_visits', 'epsilon', 'random_state', 'tree')
 
-    def __init__(self, number_of_arms, epsilon, optimmistic=False):
+    def __init__(self, number_of_arms, epsilon, optimmistic=False, random_state=None, indexed=False, precision=None):
+        """indexed keeps an ArgmaxTree over the estimates, so a step costs O(log arms) rather than O(arms).
+
+        precision ('double' or 'single', see pysrc.precision) sets the dtypes of the estimates and visit counts.
+        """
+        precision = policy(precision)
         self.number_of_steps = 0
         if optimmistic:
-            self.bandit_estimates = np.ones(number_of_arms)*10
+            self.bandit_estimates = np.ones(number_of_arms, dtype=precision.estimates)*10
         else:
-            self.bandit_estimates = np.zeros(number_of_arms)
+            self.bandit_estimates = np.zeros(number_of_arms, dtype=precision.estimates)
 
-        self.bandit_visits = np.zeros(number_of_arms)
+        self.bandit_visits = np.zeros(number_of_arms, dtype=precision.visits)
         self.epsilon = epsilon
+        self.random_state = random_state if random_state is not None else np.random     # e.g. a NoiseBuffer
+        self.tree = ArgmaxTree(self.bandit_estimates) if indexed else None
 
     def get_action(self):
-        if self.epsilon >= np.random.random():
-            return np.random.randint(len(self.bandit_estimates))
+        if self.epsilon >= self.random_state.random():
+            return self.random_state.randint(len(self.bandit_estimates))
+        if self.tree is not None:
+            return self.tree.argmax()
         return np.argmax(self.bandit_estimates)
 
     def update_average(self, arm, observation):
-        self.bandit_visits[arm] += 1.
+        self.bandit_visits[arm] += 1
         self.bandit_estimates[arm] += (1/self.bandit_visits[arm]) * (observation - self.bandit_estimates[arm])
+        if self.tree is not None:
+            self.tree.update(arm, self.bandit_estimates[arm])
 
 
 class SimpleBandit(object):
+    __slots__ = ('number_of_steps', 'bandit_estimates', 'epsilon', 'step_size', 'random_state', 'tree')
+
+    def __init__(self, number_of_arms, epsilon, step_size, optimistic=False, random_state=None, indexed=False,
+                 precision=None):
+        """indexed keeps an ArgmaxTree over the estimates, so a step costs O(log arms) rather than O(arms).
 
-    def __init__(self, number_of_arms, epsilon, step_size, optimistic=False):
+        precision ('double' or 'single', see pysrc.precision) sets the dtype of the estimates.
+        """
+        precision = policy(precision)
         self.number_of_steps = 0
         if optimistic:
-            self.bandit_estimates = np.ones(number_of_arms)*10
+            self.bandit_estimates = np.ones(number_of_arms, dtype=precision.estimates)*10
         else:
-            self.bandit_estimates = np.zeros(number_of_arms)
+            self.bandit_estimates = np.zeros(number_of_arms, dtype=precision.estimates)
 
         self.epsilon = epsilon
         self.step_size = step_size
+        self.random_state = random_state if random_state is not None else np.random     # e.g. a NoiseBuffer
+        self.tree = ArgmaxTree(self.bandit_estimates) if indexed else None
 
     def get_action(self):
-        if self.epsilon >= np.random.random():
-            return np.random.randint(len(self.bandit_estimates))
+        if self.epsilon >= self.random_state.random():
+            return self.random_state.randint(len(self.bandit_estimates))
+        if self.tree is not None:
+            return self.tree.argmax()
         return np.argmax(self.bandit_estimates)
 
     def update_average(self, arm, observation):
         self.number_of_steps += 1
         self.bandit_estimates[arm] += self.step_size * (observation - self.bandit_estimates[arm])
+        if self.tree is not None:
+            self.tree.update(arm, self.bandit_estimates[arm])
 
 class UCB(object):
+    __slots__ = ('bandit_estimates', 'bandit_visits', 'c', 'number_of_steps', 'step_size', 'tree')
+
+    def __init__(self, step_size, number_of_arms, c, indexed=False, precision=None):
+        """indexed keeps a KineticTournament over the arms' scores, so a step costs O(log arms) rather than O(arms).
 
-    def __init__(self, step_size, number_of_arms, c):
-        self.bandit_estimates = np.zeros(number_of_arms)
-        self.bandit_visits = np.zeros(number_of_arms)
+        precision ('double' or 'single', see pysrc.precision) sets the dtypes of the estimates and visit counts.
+        """
+        precision = policy(precision)
+        self.bandit_estimates = np.zeros(number_of_arms, dtype=precision.estimates)
+        self.bandit_visits = np.zeros(number_of_arms, dtype=precision.visits)
         self.c = c
         self.number_of_steps = 0
         self.step_size = step_size
+        self.tree = KineticTournament(number_of_arms) if indexed else None
 
     def get_action(self, t):
+        if self.tree is not None:
+            return self.tree.advance(t)
         return np.argmax(self.bandit_estimates + self.c * np.sqrt(np.log(t)/self.bandit_visits))
 
     def update_average(self, arm, observation):
         self.number_of_steps += 1
         self.bandit_estimates[arm] += self.step_size * (observation - self.bandit_estimates[arm])
-        self.bandit_visits[arm] += 1
\ No newline at end of file
+        self.bandit_visits[arm] += 1
+        if self.tree is not None:
+            self.tree.update(arm, self.bandit_estimates[arm], self.c / np.sqrt(self.bandit_visits[arm]))
+
+
+class BatchedBanditSampleAverage(object):
+    """Sample-average learners for many independent runs, held as one (runs x arms) array
+
+    number_of_runs may also be a shape such as (params, runs); epsilon then broadcasts against it, e.g. with shape
+    (params, 1), so a whole parameter sweep is one (params x runs x arms) array. indexed keeps an ArgmaxTree over
+    every run's estimates, so a step costs O(runs log arms) rather than O(runs x arms). precision ('double' or
+    'single', see pysrc.precision) sets the dtypes of the estimates and visit counts.
+    """
+
+    def __init__(self, number_of_runs, number_of_arms, epsilon, optimistic=False, random_state=None, indexed=False,
+                 precision=None):
+        precision = policy(precision)
+        self.number_of_steps = 0
+        if optimistic:
+            self.bandit_estimates = np.ones(np.append(number_of_runs, number_of_arms), dtype=precision.estimates)*10
+        else:
+            self.bandit_estimates = np.zeros(np.append(number_of_runs, number_of_arms), dtype=precision.estimates)
+
+        self.bandit_visits = np.zeros(np.append(number_of_runs, number_of_arms), dtype=precision.visits)
+        self.epsilon = epsilon
+        self.random_state = random_state if random_state is not None else np.random
+        self.runs = run_index(self.bandit_estimates.shape[:-1])
+        self.tree = ArgmaxTree(self.bandit_estimates) if indexed else None
+
+    def get_action(self, t=None):
+        """Returns one arm per run; t is ignored and only kept so all batched learners share get_action(t)"""
+        greedy = self.tree.argmax() if self.tree is not None else None
+        return epsilon_greedy(self.bandit_estimates, self.epsilon, self.random_state, greedy)
+
+    def update_average(self, arms, observations):
+        self.number_of_steps += 1
+        pulled = self.runs + (arms,)                                # each run's pulled arm
+        self.bandit_visits[pulled] += 1
+        self.bandit_estimates[pulled] += (1/self.bandit_visits[pulled]) * (observations - self.bandit_estimates[pulled])
+        if self.tree is not None:
+            self.tree.update(arms, self.bandit_estimates[pulled])
+
+
+class BatchedSimpleBandit(object):
+    """Constant step-size learners for many independent runs, held as one (runs x arms) array
+
+    As with BatchedBanditSampleAverage, number_of_runs may be a shape and epsilon and step_size broadcast against it,
+    indexed keeps an ArgmaxTree over the estimates and precision sets their dtype.
+    """
+
+    def __init__(self, number_of_runs, number_of_arms, epsilon, step_size, optimistic=False, random_state=None,
+                 indexed=False, precision=None):
+        precision = policy(precision)
+        self.number_of_steps = 0
+        if optimistic:
+            self.bandit_estimates = np.ones(np.append(number_of_runs, number_of_arms), dtype=precision.estimates)*10
+        else:
+            self.bandit_estimates = np.zeros(np.append(number_of_runs, number_of_arms), dtype=precision.estimates)
+
+        self.epsilon = epsilon
+        self.step_size = step_size
+        self.random_state = random_state if random_state is not None else np.random
+        self.runs = run_index(self.bandit_estimates.shape[:-1])
+        self.tree = ArgmaxTree(self.bandit_estimates) if indexed else None
+
+    def get_action(self, t=None):
+        """Returns one arm per run; t is ignored and only kept so all batched learners share get_action(t)"""
+        greedy = self.tree.argmax() if self.tree is not None else None
+        return epsilon_greedy(self.bandit_estimates, self.epsilon, self.random_state, greedy)
+
+    def update_average(self, arms, observations):
+        self.number_of_steps += 1
+        pulled = self.runs + (arms,)                                # each run's pulled arm
+        self.bandit_estimates[pulled] += self.step_size * (observations - self.bandit_estimates[pulled])
+        if self.tree is not None:
+            self.tree.update(arms, self.bandit_estimates[pulled])
+
+
+class BatchedUCB(object):
+    """UCB learners for many independent runs, held as one (runs x arms) array
+
+    As with BatchedBanditSampleAverage, number_of_runs may be a shape and c and step_size broadcast against it.
+    indexed keeps one KineticTournament per run, so a step costs O(runs log arms) rather than O(runs x arms), though
+    the runs are then stepped one at a time. precision sets the dtypes of the estimates and visit counts.
+    """
+
+    def __init__(self, step_size, number_of_runs, number_of_arms, c, indexed=False, precision=None):
+        precision = policy(precision)
+        self.bandit_estimates = np.zeros(np.append(number_of_runs, number_of_arms), dtype=precision.estimates)
+        self.bandit_visits = np.zeros(np.append(number_of_runs, number_of_arms), dtype=precision.visits)
+        self.c = c
+        self.number_of_steps = 0
+        self.step_size = step_size
+        self.runs = run_index(self.bandit_estimates.shape[:-1])
+        self.trees = None
+        if indexed:
+            shape = self.bandit_estimates.shape[:-1]
+            self.trees = [(run, KineticTournament(number_of_arms)) for run in np.ndindex(*shape)]
+            self.run_c = np.broadcast_to(c, shape)                  # each run's c
+
+    def get_action(self, t):
+        if self.trees is not None:
+            arms = np.empty(self.bandit_estimates.shape[:-1], dtype=int)
+            for run, tree in self.trees:
+                arms[run] = tree.advance(t)
+            return arms
+        c = np.expand_dims(self.c, -1)                              # one c per run, broadcast over the arms
+        with np.errstate(divide='ignore', invalid='ignore'):    # unvisited arms score inf (or nan at t=1) as in UCB
+            return np.argmax(self.bandit_estimates + c * np.sqrt(np.log(t)/self.bandit_visits), axis=-1)
+
+    def update_average(self, arms, observations):
+        self.number_of_steps += 1
+        pulled = self.runs + (arms,)                                # each run's pulled arm
+        self.bandit_estimates[pulled] += self.step_size * (observations - self.bandit_estimates[pulled])
+        self.bandit_visits[pulled] += 1
+        if self.trees is not None:
+            bonus = self.run_c / np.sqrt(self.bandit_visits[pulled])
+            estimates = self.bandit_estimates[pulled]
+            for run, tree in self.trees:
+                tree.update(arms[run], estimates[run], bonus[run])
+
+
+def run_index(shape):
+    """Returns open-grid indices over the leading shape, so estimates[run_index(shape) + (arms,)] picks each run's arm"""
+    return np.ix_(*[np.arange(n) for n in shape])
+
+
+def epsilon_greedy(bandit_estimates, epsilon, random_state=np.random, greedy=None):
+    """Picks an arm for every row of estimates: random with probability epsilon, greedy otherwise.
+
+    greedy, if given, is each row's argmax (e.g. from an ArgmaxTree) and saves working it out here.
+    """
+    shape = bandit_estimates.shape[:-1]
+    explore = random_state.random(shape) <= epsilon                    # same coin flip as get_action's epsilon >= u
+    random_arms = random_state.randint(bandit_estimates.shape[-1], size=shape)
+    if greedy is None:
+        greedy = np.argmax(bandit_estimates, axis=-1)
+    return np.where(explore, random_arms, greedy)
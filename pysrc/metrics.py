@@ -0,0 +1,78 @@
+from statistics import NormalDist
+import numpy as np
+
+__author__ = 'kongaloosh'
+
+
+class RunningStatistics(object):
+
+    def __init__(self, shape=()):
+        """Online mean and variance for every cell of shape, e.g. one cell per time step or per parameter.
+
+        Samples are folded in with Chan et al.'s pairwise form of Welford's update, so memory is O(cells) however many
+        runs are added, and partial results from several workers merge exactly.
+        """
+        self.count = np.zeros(shape)
+        self.mean = np.zeros(shape)
+        self.m2 = np.zeros(shape)                                   # sum of squared deviations from the mean
+
+    def add(self, samples, index=Ellipsis, axis=0):
+        """Adds a batch of samples to the cells at index; axis of samples runs over the samples"""
+        samples = np.asarray(samples, dtype=float)
+        batch_mean = np.mean(samples, axis=axis)
+        batch_m2 = np.sum((samples - np.expand_dims(batch_mean, axis)) ** 2, axis=axis)
+        self.combine(index, samples.shape[axis], batch_mean, batch_m2)
+
+    def merge(self, other):
+        """Folds in the statistics another accumulator (e.g. another worker's) has gathered"""
+        self.combine(Ellipsis, other.count, other.mean, other.m2)
+        return self
+
+    def combine(self, index, count, mean, m2):
+        """Folds summary statistics (count, mean, m2) of a batch into the cells at index"""
+        total = self.count[index] + count
+        with np.errstate(divide='ignore', invalid='ignore'):       # cells that are still empty stay at zero
+            delta = mean - self.mean[index]
+            weight = np.where(total > 0, count / total, 0.)
+            self.mean[index] = self.mean[index] + delta * weight
+            self.m2[index] = self.m2[index] + m2 + delta ** 2 * self.count[index] * weight
+        self.count[index] = total
+
+    def cell(self, index):
+        """Returns the statistics of the cells at index as an accumulator of their own"""
+        statistics = RunningStatistics()
+        statistics.count = np.copy(self.count[index])
+        statistics.mean = np.copy(self.mean[index])
+        statistics.m2 = np.copy(self.m2[index])
+        return statistics
+
+    def merge_at(self, index, other):
+        """Folds in another accumulator's statistics at index, e.g. one parameter's result into a whole sweep"""
+        self.combine(index, other.count, other.mean, other.m2)
+        return self
+
+    def extend(self, length):
+        """Adds length empty cells to the end of the first axis, e.g. the steps of a longer horizon"""
+        for name in 'count', 'mean', 'm2':
+            values = getattr(self, name)
+            setattr(self, name, np.concatenate([values, np.zeros((length,) + values.shape[1:])]))
+        return self
+
+    def variance(self):
+        """The sample variance of every cell (nan until a cell holds two samples)"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.count > 1, self.m2 / (self.count - 1), np.nan)
+
+    def standard_error(self):
+        """The standard error of every cell's mean"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.sqrt(self.variance() / self.count)
+
+    def half_width(self, level=0.95):
+        """Half the width of the normal-approximation confidence interval on every cell's mean"""
+        return NormalDist().inv_cdf(0.5 + level / 2.) * self.standard_error()
+
+    def confidence_interval(self, level=0.95):
+        """The (low, high) confidence interval on every cell's mean"""
+        half_width = self.half_width(level)
+        return self.mean - half_width, self.mean + half_width
@@ -0,0 +1,122 @@
+from pysrc.snapshot import copy_random_state
+import numpy as np
+
+__author__ = 'kongaloosh'
+
+
+class NoiseBuffer(object):
+
+    def __init__(self, block_size=65536, random_state=None):
+        """Pre-generates random numbers in blocks of block_size and hands them out by index.
+
+        Stands in for np.random (or a RandomState) wherever the bandits and learners take a random_state: it offers
+        the normal, random and randint calls they make, so a single pull costs a list lookup instead of an RNG call.
+        The list is only built for blocks that are read one draw at a time; batched reads slice the array.
+
+        Pickling keeps the random state each block was drawn from rather than the block, which is drawn again when
+        the copy is first read.
+        """
+        self.block_size = block_size
+        self.random_state = random_state if random_state is not None else np.random
+        self.normals = np.empty(0)                                  # standard normal draws
+        self.normal_list = None                                     # the same draws, listed on the first scalar read
+        self.normal_index = 0
+        self.normal_block = None                                    # (RNG copy, length) the block was drawn with
+        self.uniforms = np.empty(0)                                 # uniform draws on [0, 1)
+        self.uniform_list = None
+        self.uniform_index = 0
+        self.uniform_block = None
+
+    def refill_normals(self, count):
+        """Draws a new block of at least count normals"""
+        if self.normals is None:                                    # restored from a snapshot: draw it again
+            random_state, length = self.normal_block
+            self.normals = copy_random_state(random_state).normal(size=length)
+            self.normal_list = None
+            if self.normal_index + count <= len(self.normals):
+                return
+        self.normal_block = (copy_random_state(self.random_state), max(self.block_size, count))
+        self.normals = self.random_state.normal(size=self.normal_block[1])
+        self.normal_list = None                                     # the array path never needs the list
+        self.normal_index = 0
+
+    def refill_uniforms(self, count):
+        """Draws a new block of at least count uniforms"""
+        if self.uniforms is None:                                   # restored from a snapshot: draw it again
+            random_state, length = self.uniform_block
+            self.uniforms = copy_random_state(random_state).random_sample(size=length)
+            self.uniform_list = None
+            if self.uniform_index + count <= len(self.uniforms):
+                return
+        self.uniform_block = (copy_random_state(self.random_state), max(self.block_size, count))
+        self.uniforms = self.random_state.random_sample(size=self.uniform_block[1])
+        self.uniform_list = None                                     # the array path never needs the list
+        self.uniform_index = 0
+
+    def take_normals(self, count):
+        """Returns the next count standard normals as an array"""
+        if self.normals is None:
+            self.refill_normals(0)
+        if self.normal_index + count > len(self.normals):      # the rest of this block, then a new one
+            left = self.normals[self.normal_index:]
+            self.refill_normals(count - len(left))
+            self.normal_index = count - len(left)
+            return np.concatenate([left, self.normals[:self.normal_index]])
+        self.normal_index += count
+        return self.normals[self.normal_index - count:self.normal_index]
+
+    def take_uniforms(self, count):
+        """Returns the next count uniforms as an array"""
+        if self.uniforms is None:
+            self.refill_uniforms(0)
+        if self.uniform_index + count > len(self.uniforms):
+            left = self.uniforms[self.uniform_index:]
+            self.refill_uniforms(count - len(left))
+            self.uniform_index = count - len(left)
+            return np.concatenate([left, self.uniforms[:self.uniform_index]])
+        self.uniform_index += count
+        return self.uniforms[self.uniform_index - count:self.uniform_index]
+
+    def normal(self, loc=0., scale=1., size=None):
+        """Same as np.random.normal, drawn from the buffer"""
+        if size is None:
+            if self.normals is None or self.normal_index >= len(self.normals):
+                self.refill_normals(1)
+            if self.normal_list is None:                            # list lookups beat indexing the array
+                self.normal_list = self.normals.tolist()
+            self.normal_index += 1
+            return loc + scale * self.normal_list[self.normal_index - 1]
+        if isinstance(size, int):
+            draws = scale * self.take_normals(size)
+        else:
+            draws = scale * self.take_normals(int(np.prod(size))).reshape(size)
+        if isinstance(loc, (int, float)) and loc == 0:              # the walk increments need no shift
+            return draws
+        return loc + draws
+
+    def random(self, size=None):
+        """Same as np.random.random, drawn from the buffer"""
+        if size is None:
+            if self.uniforms is None or self.uniform_index >= len(self.uniforms):
+                self.refill_uniforms(1)
+            if self.uniform_list is None:
+                self.uniform_list = self.uniforms.tolist()
+            self.uniform_index += 1
+            return self.uniform_list[self.uniform_index - 1]
+        if isinstance(size, int):
+            return self.take_uniforms(size)
+        return self.take_uniforms(int(np.prod(size))).reshape(size)
+
+    def randint(self, high, size=None):
+        """Same as np.random.randint(high), drawn from the buffer's uniforms"""
+        if size is None:
+            return int(self.random() * high)
+        return (self.take_uniforms(int(np.prod(size))) * high).astype(int).reshape(size)
+
+    def __getstate__(self):
+        state = dict(self.__dict__, random_state=copy_random_state(self.random_state))   # np.random is a module
+        if self.normal_block is not None:
+            state.update(normals=None, normal_list=None)
+        if self.uniform_block is not None:
+            state.update(uniforms=None, uniform_list=None)
+        return state
@@ -0,0 +1,57 @@
+import os
+import matplotlib
+import numpy as np
+
+__author__ = 'kongaloosh'
+
+LABELS = {'sample_average': 'sample average', 'bandit': 'action-value', 'ucb': 'UCB', 'optimal': 'optimal'}
+
+
+def plot_sweep(spec, statistics):
+    """Mean reward after the burn-in against the parameter, with 95% confidence bands; cells not run yet are gaps"""
+    import matplotlib.pyplot as plt
+    parameters = spec['parameters']
+    figure = plt.figure(figsize=(10, 8))
+    plt.title("Average Reward of a {0}-armed bandit, {1}".format(spec['arms'], spec['problem'].replace('_', ' ')))
+    plt.ylabel("Average Reward")
+    plt.xlabel("Epsilon / C")
+    plt.xscale('log', base=2)
+    for name in spec['learners'] + ['optimal']:
+        result = statistics[name]
+        mean = np.where(result.count > 0, result.mean, np.nan)    # nan is not plotted
+        half_width = result.half_width()
+        plt.plot(parameters, mean, label=LABELS[name])
+        plt.fill_between(parameters, mean - half_width, mean + half_width, alpha=0.2)
+    plt.legend(loc='lower left')
+    return figure
+
+
+def plot_curves(spec, curves):
+    """% optimal action and reward at every step, one line per learner and parameter"""
+    import matplotlib.pyplot as plt
+    figure = plt.figure(figsize=(15, 6))
+    for position, (key, title) in enumerate([('optimal', '% optimal actions'), ('rewards', 'Average Reward')]):
+        plt.subplot(1, 2, position + 1)
+        plt.title("{0} over {1} trials".format(title, spec['trials']))
+        plt.ylabel(title)
+        plt.xlabel("Steps")
+        for name in spec['learners']:
+            for index, parameter in enumerate(curves['parameters']):
+                plt.plot(curves[key][name].mean[:, index], label='{0} ({1:g})'.format(LABELS[name], parameter))
+        plt.legend()
+    return figure
+
+
+def plot(spec, results, show=False):
+    """Plots a spec's stored results to <output>/<name>.png and .pdf, returning the paths written"""
+    if not show:
+        matplotlib.use('Agg')                                       # no display needed
+    import matplotlib.pyplot as plt
+    figure = plot_curves(spec, results) if spec['kind'] == 'curves' else plot_sweep(spec, results)
+    paths = [os.path.join(spec['output'], spec['name'] + extension) for extension in ('.png', '.pdf')]
+    for path in paths:
+        figure.savefig(path)
+    if show:
+        plt.show()
+    plt.close(figure)
+    return paths
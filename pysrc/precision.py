@@ -0,0 +1,36 @@
+import numpy as np
+
+__author__ = 'kongaloosh'
+
+
+class Precision(object):
+    __slots__ = ('name', 'estimates', 'visits')
+
+    def __init__(self, name, estimates, visits):
+        """A dtype policy for learners and problems: the dtype of estimates and arm means, and of visit counts"""
+        self.name = name
+        self.estimates = estimates
+        self.visits = visits
+
+    def __repr__(self):
+        return 'Precision({0})'.format(self.name)
+
+    def __reduce__(self):                                           # copies and unpickles to the shared policy
+        return policy, (self.name,)
+
+
+PRECISIONS = {
+    'double': Precision('double', np.float64, np.int64),            # the default; the same results as float counts
+    'single': Precision('single', np.float32, np.int32),            # half the bytes per estimate and count
+}
+
+
+def policy(precision=None):
+    """The Precision named by precision ('double' or 'single'), which may also be a Precision; double by default"""
+    if precision is None:
+        return PRECISIONS['double']
+    if isinstance(precision, Precision):
+        return precision
+    if precision not in PRECISIONS:
+        raise ValueError("unknown precision {0!r}; choose one of {1}".format(precision, sorted(PRECISIONS)))
+    return PRECISIONS[precision]
@@ -0,0 +1,71 @@
+import os
+import socket
+import time
+
+__author__ = 'kongaloosh'
+
+PHASES = ['selection', 'reward', 'update', 'bookkeeping', 'walk']
+
+
+def worker_name():
+    """host:pid, which names a worker process on any machine"""
+    return '{0}:{1}'.format(socket.gethostname(), os.getpid())
+
+
+class PhaseProfile(object):
+
+    def __init__(self, worker=None):
+        """Cumulative wall-clock time and call counts of each (learner, phase) of a BatchedRun's steps.
+
+        The run calls lap(name, phase) as each phase ends, charging it with the time since the previous lap, so the
+        phases of a run add up to its whole running time. The phases are PHASES: picking arms, sampling rewards,
+        updating estimates, keeping totals, curves and trajectories, and walking the arms. Work that belongs to no
+        learner is charged to 'optimal' (the best-arm baseline) or 'problem'. Profiles of several units or workers
+        merge.
+        """
+        self.worker = worker
+        self.seconds = {}                                           # (name, phase) -> seconds
+        self.calls = {}                                             # (name, phase) -> laps
+        self.mark = None
+
+    def start(self):
+        self.mark = time.perf_counter()
+
+    def lap(self, name, phase):
+        """Charges the time since the last lap to phase of name"""
+        now = time.perf_counter()
+        key = (name, phase)
+        self.seconds[key] = self.seconds.get(key, 0.) + now - self.mark
+        self.calls[key] = self.calls.get(key, 0) + 1
+        self.mark = now
+
+    def merge(self, other):
+        """Folds in the timings of another profile, e.g. another unit's or worker's"""
+        for key, seconds in other.seconds.items():
+            self.seconds[key] = self.seconds.get(key, 0.) + seconds
+            self.calls[key] = self.calls.get(key, 0) + other.calls[key]
+        return self
+
+    def total(self):
+        return sum(self.seconds.values())
+
+    def by(self, position):
+        """Seconds summed over phases (position 0, per learner) or over learners (position 1, per phase)"""
+        totals = {}
+        for key, seconds in self.seconds.items():
+            totals[key[position]] = totals.get(key[position], 0.) + seconds
+        return totals
+
+    def report(self):
+        """A table of every (learner, phase) by time spent, with its share of the total and time per call"""
+        total = self.total()
+        lines = ['{0:<16} {1:<12} {2:>10} {3:>7} {4:>10} {5:>10}'.format('learner', 'phase', 'seconds', 'share',
+                                                                         'calls', 'us/call')]
+        for key in sorted(self.seconds, key=lambda key: -self.seconds[key]):
+            seconds, calls = self.seconds[key], self.calls[key]
+            lines.append('{0:<16} {1:<12} {2:>10.3f} {3:>6.1f}% {4:>10d} {5:>10.2f}'.format(
+                key[0], key[1], seconds, 100. * seconds / total if total else 0., calls, 1e6 * seconds / calls))
+        return '\n'.join(lines)
+
+    def __repr__(self):
+        return 'PhaseProfile({0}, {1:.3f}s)'.format(self.worker, self.total())
@@ -0,0 +1,281 @@
+from collections import OrderedDict
+from pysrc.experiment import BatchedBanditExperiment, WalkTrajectory
+from pysrc.learning import BatchedBanditSampleAverage, BatchedSimpleBandit, BatchedUCB
+from pysrc.metrics import RunningStatistics
+import numpy as np
+
+__author__ = 'kongaloosh'
+
+GRID_LEARNERS = ['sample_average', 'bandit', 'ucb']                 # what run_grid steps, in this order
+
+
+class BatchedRun(object):
+
+    def __init__(self, learners, problem, burn_in=0, expected_rewards=False, common_noise=False,
+                 checkpoint_interval=None, recorder=None, profile=None, progress=None):
+        """Steps batched learners against a batched problem, every run advancing at once.
+
+        learners is an ordered dict of name -> batched learner; each takes its step in that order, as the
+        *_update methods of bandit_example do. Rewards are only counted for episodes after burn_in.
+
+        expected_rewards also scores every pull by the true mean of the chosen arm, and the baseline by the exact
+        best mean; common_noise gives every learner (and the baseline) the same reward noise in a step. Learning
+        always uses the sampled rewards.
+
+        A run can be snapshotted (pysrc.snapshot) and later run on for more steps. The reward sums are kept from the
+        first step and checkpointed at the burn-in and every checkpoint_interval steps, so change_burn_in can move
+        the burn-in to any checkpoint afterwards.
+
+        recorder, a pysrc.trajectories.TrajectoryRecorder, keeps every run's arm, reward, optimal flag and regret at
+        every step.
+
+        profile, a pysrc.profiling.PhaseProfile, times each learner's phases of every step; without one the steps
+        are not timed. progress, a pysrc.telemetry.ProgressReporter, is told how far the run has got.
+        """
+        self.learners = learners
+        self.problem = problem
+        self.burn_in = burn_in
+        self.expected_rewards = expected_rewards
+        self.common_noise = common_noise
+        self.checkpoint_interval = checkpoint_interval
+        self.recorder = recorder
+        self.profile = profile
+        self.progress = progress
+        self.timestep = 0                                           # the steps run so far
+        number_of_runs = problem.bandit_means.shape[0]
+
+        self.totals = {}                                            # (kind, name) -> per-run sums from step one
+        for name, learner in learners.items():
+            self.totals[('reward', name)] = np.zeros(learner.bandit_estimates.shape[:-1])
+            self.totals[('expected', name)] = np.zeros(learner.bandit_estimates.shape[:-1])   # sums of means
+        self.totals[('reward', 'optimal')] = np.zeros(number_of_runs)                        # the best arm
+        self.totals[('expected', 'optimal')] = np.zeros(number_of_runs)
+        self.checkpoints = {0: self.copy_totals()}                  # step -> the totals after that step
+        self.rewards = None                                         # per-step statistics
+        self.optimal = None                                         # per-step % optimal
+
+    def copy_totals(self):
+        return dict((key, np.copy(total)) for key, total in self.totals.items())
+
+    def counted(self, kind, name):
+        """The per-run sum of kind ('reward' or 'expected') for name over the episodes after the burn-in"""
+        if self.timestep <= self.burn_in:
+            return np.zeros(self.totals[(kind, name)].shape)
+        return self.totals[(kind, name)] - self.checkpoints[self.burn_in][(kind, name)]
+
+    @property
+    def reward_count(self):
+        return dict((name, self.counted('reward', name)) for name in self.learners)
+
+    @property
+    def optimal_reward_count(self):
+        return self.counted('reward', 'optimal')
+
+    @property
+    def expected_reward_count(self):
+        return dict((name, self.counted('expected', name)) for name in self.learners)
+
+    @property
+    def expected_optimal_count(self):
+        return self.counted('expected', 'optimal')
+
+    def change_burn_in(self, burn_in):
+        """Counts rewards from after a different burn-in, which must be a checkpoint or lie beyond the steps run"""
+        if burn_in < self.timestep and burn_in not in self.checkpoints:
+            raise ValueError("no checkpoint at step {0}; checkpoints are {1}".format(burn_in, sorted(self.checkpoints)))
+        self.burn_in = burn_in
+
+    def learner_update(self, name, episode_number, noise=None):
+        """Takes one step with a learner in every run, returning the arms it pulled and the rewards"""
+        learner = self.learners[name]
+        profile = self.profile
+        arms = learner.get_action(episode_number)                   # pick an action in every run
+        if profile is not None:
+            profile.lap(name, 'selection')
+        reward = self.problem.action(arms, noise)                   # observe a reward in every run
+        if profile is not None:
+            profile.lap(name, 'reward')
+        self.totals[('reward', name)] += reward
+        if self.expected_rewards:                                   # what the pull is worth on average
+            self.totals[('expected', name)] += self.problem.bandit_means[self.problem.runs, arms]
+        if profile is not None:
+            profile.lap(name, 'bookkeeping')
+        learner.update_average(arms, reward)                        # update every run's estimates
+        if profile is not None:
+            profile.lap(name, 'update')
+        return arms, reward
+
+    def true_action(self, episode_number, noise=None):
+        """Records reward from choosing the best arm in every run"""
+        profile = self.profile
+        arms = self.problem.optimal_action()
+        if profile is not None:
+            profile.lap('optimal', 'selection')
+        reward = self.problem.action(arms, noise)
+        if profile is not None:
+            profile.lap('optimal', 'reward')
+        self.totals[('reward', 'optimal')] += reward
+        if self.expected_rewards:
+            self.totals[('expected', 'optimal')] += self.problem.optimal_mean()
+        if profile is not None:
+            profile.lap('optimal', 'bookkeeping')
+
+    def run_experiment(self, timesteps, walk=False, record_curves=False, optimal_baseline=True):
+        """Runs every learner for timesteps more steps, carrying on from wherever the run stopped.
+
+        record_curves keeps RunningStatistics over the runs of each step's reward and % optimal action, one curve
+        per setting on any parameter axes.
+        """
+        if record_curves:
+            horizon = self.timestep + timesteps
+            if self.rewards is None:
+                self.rewards = dict((name, RunningStatistics((horizon,) + learner.bandit_estimates.shape[:-2]))
+                                    for name, learner in self.learners.items())
+                self.optimal = dict((name, RunningStatistics((horizon,) + learner.bandit_estimates.shape[:-2]))
+                                    for name, learner in self.learners.items())
+            for curves in self.rewards, self.optimal:
+                for statistics in curves.values():
+                    statistics.extend(horizon - len(statistics.count))
+        if walk and self.problem.trajectory is None:                # generate the walk a block of steps at a time
+            WalkTrajectory(self.problem)
+
+        recording = record_curves or self.recorder is not None
+        profile, progress = self.profile, self.progress
+        if progress is not None:
+            progress.report(self.timestep, force=True)
+        if profile is not None:
+            profile.start()
+        for step in range(self.timestep, self.timestep + timesteps):
+            episode_number = step + 1                               # episodes are one-based, as in bandit_example
+            optimal_mean = self.problem.optimal_mean() if recording else None
+            if profile is not None and recording:
+                profile.lap('problem', 'bookkeeping')
+            noise = self.problem.draw_noise() if self.common_noise else None
+            if profile is not None and self.common_noise:
+                profile.lap('problem', 'reward')
+            for name in self.learners:
+                arms, reward = self.learner_update(name, episode_number, noise)
+                if recording:
+                    # the chosen action was optimal, or has the same value as the optimal action
+                    chosen_mean = self.problem.bandit_means[self.problem.runs, arms]
+                if record_curves:
+                    self.rewards[name].add(reward, index=step, axis=-1)
+                    self.optimal[name].add(chosen_mean == optimal_mean, index=step, axis=-1)
+                if self.recorder is not None:
+                    self.recorder.record(name, step, arms, reward, chosen_mean == optimal_mean,
+                                         optimal_mean - chosen_mean)
+                if profile is not None and recording:
+                    profile.lap(name, 'bookkeeping')
+            if optimal_baseline:
+                self.true_action(episode_number, noise)
+            if walk:                                                # non-stationary: move every run's arms
+                self.problem.random_walk()
+                if profile is not None:
+                    profile.lap('problem', 'walk')
+            self.timestep = episode_number
+            if episode_number == self.burn_in or (self.checkpoint_interval and
+                                                  episode_number % self.checkpoint_interval == 0):
+                self.checkpoints[episode_number] = self.copy_totals()
+                if profile is not None:
+                    profile.lap('problem', 'bookkeeping')
+            if progress is not None and episode_number % progress.every == 0:
+                progress.report(episode_number)
+        if self.recorder is not None:
+            self.recorder.flush()
+            if profile is not None:
+                profile.lap('problem', 'bookkeeping')
+
+    def reward_statistics(self, timesteps=None):
+        """The average per-step reward after the burn-in, as RunningStatistics over the runs of every setting.
+
+        Includes an 'optimal' entry for the best-arm baseline. Statistics from several batches of runs merge. With
+        expected_rewards the entries score pulls by their true means, and the sampled rewards are reported under
+        '<name>_sampled' so variance_reduction can compare the two. timesteps defaults to the steps run so far.
+        """
+        counted_steps = (timesteps if timesteps is not None else self.timestep) - self.burn_in
+        counts = dict(self.reward_count, optimal=self.optimal_reward_count)
+        if self.expected_rewards:
+            counts = dict(((name + '_sampled', count) for name, count in counts.items()),
+                          optimal=self.expected_optimal_count, **self.expected_reward_count)
+        statistics = {}
+        for name, count in counts.items():
+            statistics[name] = RunningStatistics(count.shape[:-1])
+            statistics[name].add(count / counted_steps, axis=-1)
+        return statistics
+
+
+def run_grid(parameters, number_of_runs, timesteps, initial_means=None, walk=False, burn_in=0, step_size=0.01,
+             number_of_arms=10, random_state=None, walk_random_state=None, exploration_random_state=None,
+             expected_rewards=False, common_noise=False, checkpoint_interval=None, indexed=False, recorder=None,
+             profile=None, precision=None, learners=None):
+    """Runs the figure 2.6 learners for every parameter setting at once, as one (params x runs x arms) tensor.
+
+    parameters is epsilon for the sample average and action-value learners and c for UCB; step_size is a single value
+    or one per parameter. Every setting faces the same runs, so they share reward noise and random-walk draws.
+    random_state (np.random by default, or e.g. a NoiseBuffer) supplies every draw; walk_random_state and
+    exploration_random_state can split off the walk and the epsilon coin flips, as pysrc.streams.trial_streams does.
+    indexed gives the learners tournament trees, for bandits with thousands of arms, and precision ('double' or
+    'single', see pysrc.precision) sets the dtypes of the estimates, visit counts and arm means. learners runs only
+    some of GRID_LEARNERS.
+    expected_rewards, common_noise, checkpoint_interval, recorder and profile are passed on to BatchedRun. Returns the
+    BatchedRun, whose reward_count arrays are (params x runs) and optimal_reward_count is (runs,).
+    """
+    experiment = build_grid(parameters, number_of_runs, initial_means=initial_means, burn_in=burn_in,
+                            step_size=step_size, number_of_arms=number_of_arms, random_state=random_state,
+                            walk_random_state=walk_random_state, exploration_random_state=exploration_random_state,
+                            expected_rewards=expected_rewards, common_noise=common_noise,
+                            checkpoint_interval=checkpoint_interval, indexed=indexed, recorder=recorder,
+                            profile=profile, precision=precision, learners=learners)
+    experiment.run_experiment(timesteps, walk=walk)
+    return experiment
+
+
+def build_grid(parameters, number_of_runs, initial_means=None, burn_in=0, step_size=0.01, number_of_arms=10,
+               random_state=None, walk_random_state=None, exploration_random_state=None, expected_rewards=False,
+               common_noise=False, checkpoint_interval=None, indexed=False, recorder=None, profile=None,
+               precision=None, learners=None):
+    """Sets up run_grid's BatchedRun without running it; learners picks some of GRID_LEARNERS, all by default"""
+    parameters = np.asarray(parameters, dtype=float)
+    shape = (len(parameters), number_of_runs)
+    epsilon = parameters[:, None]                                   # broadcasts over the runs axis
+    step_size = np.broadcast_to(np.asarray(step_size, dtype=float), parameters.shape)[:, None]
+
+    problem = BatchedBanditExperiment(number_of_runs=number_of_runs, number_of_arms=number_of_arms,
+                                      random_state=random_state, walk_random_state=walk_random_state,
+                                      precision=precision)
+    if exploration_random_state is None:
+        exploration_random_state = random_state
+    if initial_means is not None:                                   # every run starts from the same bandit
+        problem.bandit_means[:] = initial_means
+    build = {
+        'sample_average': lambda: BatchedBanditSampleAverage(shape, number_of_arms, epsilon=epsilon,
+                                                             random_state=exploration_random_state, indexed=indexed,
+                                                             precision=precision),
+        'bandit': lambda: BatchedSimpleBandit(shape, number_of_arms, epsilon=epsilon, step_size=step_size,
+                                              random_state=exploration_random_state, indexed=indexed,
+                                              precision=precision),
+        'ucb': lambda: BatchedUCB(step_size=step_size, number_of_runs=shape, number_of_arms=number_of_arms, c=epsilon,
+                                  indexed=indexed, precision=precision),
+    }
+    if learners is None:
+        learners = GRID_LEARNERS
+    unknown = set(learners) - set(GRID_LEARNERS)
+    if unknown:
+        raise ValueError("unknown learners {0}; choose from {1}".format(sorted(unknown), GRID_LEARNERS))
+    learners = OrderedDict((name, build[name]()) for name in GRID_LEARNERS if name in learners)   # in step order
+    return BatchedRun(learners, problem, burn_in=burn_in, expected_rewards=expected_rewards,
+                      common_noise=common_noise, checkpoint_interval=checkpoint_interval, recorder=recorder,
+                      profile=profile)
+
+
+def variance_reduction(statistics):
+    """The ratio of the sampled-reward variance to the expected-reward variance of every entry that has both.
+
+    It is the factor by which the number of trials can be cut for the same confidence-interval width.
+    """
+    reduction = {}
+    for name in statistics:
+        if name + '_sampled' in statistics:
+            with np.errstate(divide='ignore', invalid='ignore'):    # an exact baseline has no variance at all
+                reduction[name] = statistics[name + '_sampled'].variance() / statistics[name].variance()
+    return reduction
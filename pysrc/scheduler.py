@@ -0,0 +1,378 @@
+from multiprocessing import Manager, Pool, cpu_count
+import queue
+from pysrc.learning import BatchedBanditSampleAverage, BatchedSimpleBandit, BatchedUCB
+from pysrc.metrics import RunningStatistics
+from pysrc.noise import NoiseBuffer
+from pysrc.profiling import PhaseProfile, worker_name
+from pysrc.runner import GRID_LEARNERS, build_grid
+from pysrc import snapshot
+from pysrc.store import ResultStore
+from pysrc.telemetry import ProgressReporter
+from pysrc.streams import parameter_key, trial_streams
+from pysrc.trajectories import TrajectoryRecorder, TrajectoryStore
+import numpy as np
+
+__author__ = 'kongaloosh'
+
+
+class SweepProblem(object):
+
+    def __init__(self, parameters, initial_means=None, timesteps=200000, walk=False, burn_in=100000,
+                 step_size=0.01, number_of_arms=10, seed=None, expected_rewards=False, common_noise=False,
+                 snapshot_directory=None, checkpoint_interval=10000, trajectory_directory=None, profile=False,
+                 precision='double', learners=None, shared_draws=False):
+        """Everything a worker needs to run part of a sweep; it is sent to each worker once, when the pool starts.
+
+        With a seed, every trial draws from its own stream spawned from (seed, parameter, trial index), so results
+        are the same however the sweep is split into batches, processes or machines. expected_rewards and
+        common_noise select run_grid's variance-reduction mode, precision its dtypes ('double' or 'single') and
+        learners which of its learners run (all of them by default).
+
+        Each unit holds one parameter, so by default the parameters do not face the same runs as they do in
+        run_grid: a trial's streams are spawned from (seed, parameter, trial index). shared_draws spawns them from
+        (seed, trial index) alone, so trial t of every parameter draws the same reward noise, random walk and
+        exploration coin flips, and differences between parameters are not blurred by sampling noise. It needs a
+        seed.
+
+        With a snapshot_directory every unit saves the state of its runs when it finishes, and a unit carries on
+        from the latest snapshot of its runs at or before its horizon rather than starting over. Reward sums are
+        checkpointed every checkpoint_interval steps, so a longer sweep may use any of those as its burn-in.
+
+        With a trajectory_directory every trial's steps are recorded in a (params x trials x steps) TrajectoryStore,
+        which SweepScheduler allocates; each unit writes its own rows.
+
+        With profile, every unit times the phases of its steps (pysrc.profiling.PhaseProfile) and SweepScheduler
+        merges the timings of each worker.
+        """
+        self.parameters = list(parameters)
+        self.initial_means = None if initial_means is None else np.copy(initial_means)
+        self.timesteps = timesteps
+        self.walk = walk
+        self.burn_in = burn_in
+        self.step_size = step_size
+        self.number_of_arms = number_of_arms
+        self.seed = seed
+        self.expected_rewards = expected_rewards
+        self.common_noise = common_noise
+        self.snapshot_directory = snapshot_directory
+        self.checkpoint_interval = checkpoint_interval
+        self.trajectory_directory = trajectory_directory
+        self.profile = profile
+        self.precision = precision
+        self.learners = list(learners) if learners is not None else list(GRID_LEARNERS)
+        if shared_draws and seed is None:
+            raise ValueError("shared_draws needs a seed to spawn every parameter's streams from")
+        self.shared_draws = shared_draws
+
+    def unit_configuration(self, unit):
+        """Everything that determines a unit's result, for ResultCache; a unit does not depend on other parameters"""
+        parameter = self.parameters[unit[0]]
+        learners = {
+            'sample_average': [BatchedBanditSampleAverage, {'epsilon': parameter}],
+            'bandit': [BatchedSimpleBandit, {'epsilon': parameter, 'step_size': self.step_size}],
+            'ucb': [BatchedUCB, {'c': parameter, 'step_size': self.step_size}],
+        }
+        configuration = {
+            'learners': dict((name, learners[name]) for name in self.learners),
+            'number_of_arms': self.number_of_arms,
+            'timesteps': self.timesteps,
+            'burn_in': self.burn_in,
+            'walk': self.walk,
+            'initial_means': self.initial_means,
+            'seed': self.seed,
+            'expected_rewards': self.expected_rewards,
+            'common_noise': self.common_noise,
+            'first_trial': unit[2],
+            'number_of_runs': unit[3],
+        }
+        if self.precision != 'double':                              # left out by default, keeping earlier keys
+            configuration['precision'] = self.precision
+        if self.shared_draws:
+            configuration['shared_draws'] = True
+        return configuration
+
+    def __setstate__(self, state):
+        # a problem pickled (e.g. by a ResultStore) before these settings existed had their defaults
+        self.__dict__.update(dict(precision='double', learners=list(GRID_LEARNERS), shared_draws=False), **state)
+
+    def horizon(self):
+        """The (timesteps, burn_in) a unit's result is counted over, which ResultStore keeps units apart by"""
+        return self.timesteps, self.burn_in
+
+    def snapshot_configuration(self, unit):
+        """What determines a unit's runs, whatever the horizon and burn-in: the key its snapshot is saved under"""
+        configuration = self.unit_configuration(unit)
+        del configuration['timesteps'], configuration['burn_in']
+        configuration['checkpoint_interval'] = self.checkpoint_interval
+        return configuration
+
+    def start_unit(self, unit):
+        """Sets up the runs of one (parameter, trial-batch) unit, as a BatchedRun that has taken no steps"""
+        parameter_index, batch_index, first_trial, number_of_runs = unit
+        parameter = self.parameters[parameter_index]
+        if self.seed is None:
+            streams = {'random_state': NoiseBuffer(block_size=2**20)}
+        else:
+            key = () if self.shared_draws else (parameter_key(parameter),)
+            streams = trial_streams(self.seed, range(first_trial, first_trial + number_of_runs), key=key)
+        return build_grid([parameter], number_of_runs, initial_means=self.initial_means, burn_in=self.burn_in,
+                          step_size=self.step_size, number_of_arms=self.number_of_arms,
+                          expected_rewards=self.expected_rewards, common_noise=self.common_noise,
+                          checkpoint_interval=self.checkpoint_interval, precision=self.precision,
+                          learners=self.learners, **streams)
+
+    def run_unit(self, unit, profile=None, progress=None):
+        """Runs one (parameter, trial-batch) unit and returns the single-cell reward statistics of each learner.
+
+        profile (a PhaseProfile) times the unit's steps, and progress (a ProgressReporter) reports how far it has got.
+        """
+        snapshots = ResultStore(self.snapshot_directory) if self.snapshot_directory is not None else None
+        saved = None
+        if snapshots is not None:
+            saved = snapshots.load_snapshot(self.snapshot_configuration(unit), self.timesteps)
+        if saved is None:
+            experiment = self.start_unit(unit)
+        else:
+            experiment = snapshot.loads(saved)
+            experiment.change_burn_in(self.burn_in)
+        if self.trajectory_directory is not None:
+            parameter_index, _, first_trial, number_of_runs = unit
+            rows = (slice(parameter_index, parameter_index + 1), slice(first_trial, first_trial + number_of_runs))
+            experiment.recorder = TrajectoryRecorder(TrajectoryStore(self.trajectory_directory), rows)
+        experiment.profile = profile
+        experiment.progress = progress
+        experiment.run_experiment(self.timesteps - experiment.timestep, walk=self.walk)
+        experiment.progress = None                                  # it reports to this sweep only
+        if snapshots is not None:
+            snapshots.save_snapshot(self.snapshot_configuration(unit), snapshot.dumps(experiment), experiment.timestep)
+        statistics = experiment.reward_statistics(self.timesteps)
+        return dict((name, result.cell(0) if result.mean.ndim else result.cell(Ellipsis))   # the baseline has
+                    for name, result in statistics.items())                                 # no parameter axis
+
+
+def work_units(number_of_parameters, number_of_trials, batch_size):
+    """Splits a sweep into (parameter index, batch index, first trial, runs) units of at most batch_size trials"""
+    units = []
+    for batch_index, start in enumerate(range(0, number_of_trials, batch_size)):
+        for parameter_index in range(number_of_parameters):
+            units.append((parameter_index, batch_index, start, min(batch_size, number_of_trials - start)))
+    return units
+
+
+worker_problem = None                                               # the SweepProblem of this worker process
+worker_progress = None                                              # where it reports progress, if anywhere
+
+
+def start_worker(problem, progress=None):
+    """Pool initializer: keeps the problem (and the queue to report progress to) and gives the worker its own
+    random state"""
+    global worker_problem, worker_progress
+    worker_problem = problem
+    worker_progress = progress
+    np.random.seed()                                                # unseeded forked workers would share draws
+
+
+def run_profiled_unit(problem, unit, progress=None):
+    """Runs a unit, returning it with its statistics and, if the problem is profiled, the timings of its steps.
+
+    With a progress queue the unit reports how far it has got, for Telemetry.
+    """
+    profile = PhaseProfile(worker_name()) if problem.profile else None
+    reporter = ProgressReporter(progress, worker_name(), unit) if progress is not None else None
+    return unit, problem.run_unit(unit, profile, reporter), profile
+
+
+def run_worker_unit(unit):
+    """Runs a unit on the worker's problem"""
+    return run_profiled_unit(worker_problem, unit, worker_progress)
+
+
+class SweepScheduler(object):
+
+    def __init__(self, problem, number_of_trials=2000, batch_size=100, processes=None, store=None, cache=None,
+                 target_half_width=None, minimum_trials=None, level=0.95, telemetry=None):
+        """Runs a sweep as (parameter, trial-batch) units handed out one at a time to a pool sized to the cores.
+
+        Workers take a new unit as soon as they finish one, so no core idles while long units are still running,
+        and each finished unit is merged into per-parameter RunningStatistics as it arrives. With a ResultStore,
+        every finished unit is committed to disk and units already in the store are not run again; with a
+        ResultCache, units whose configuration has been run before (in any sweep) are taken from the cache.
+
+        With a target_half_width the sweep is sequential: number_of_trials becomes a cap, a parameter stops getting
+        units once every learner's confidence interval (at level) is within the target and it has at least
+        minimum_trials (two batches by default), and each free worker goes to the parameter that is furthest from
+        its target.
+
+        If the problem is profiled, profiles holds the merged step timings of each worker. With a
+        pysrc.telemetry.Telemetry, workers report their progress while the sweep runs, and the telemetry publishes
+        it with the results so far.
+        """
+        self.problem = problem
+        self.target_half_width = target_half_width
+        self.minimum_trials = minimum_trials if minimum_trials is not None else 2 * batch_size
+        self.level = level
+        self.units = work_units(len(problem.parameters), number_of_trials, batch_size)
+        self.processes = processes if processes is not None else cpu_count()
+        self.statistics = dict((name, RunningStatistics(len(problem.parameters)))
+                               for name in problem.learners + ['optimal'])
+        self.profiles = {}                                          # worker -> PhaseProfile
+        self.telemetry = telemetry
+        if problem.trajectory_directory is not None:               # created, or lengthened for a longer horizon
+            TrajectoryStore.prepare(problem.trajectory_directory, problem.learners, (len(problem.parameters),
+                                    number_of_trials), problem.timesteps, problem.number_of_arms)
+        self.store = store
+        if store is not None:                                       # resume: merge what is done, run the rest
+            store.save_problem(problem)
+            store.save_plan(self.units, problem.horizon())
+            completed = set()
+            for unit, statistics in store.units(problem.horizon()):
+                if unit in self.units:                              # ignore units of a different batch size
+                    self.reduce(unit, statistics)
+                    completed.add(unit)
+            self.units = [unit for unit in self.units if unit not in completed]
+        self.cache = cache
+        if cache is not None:
+            remaining = []
+            for unit in self.units:
+                statistics = cache.get(problem.unit_configuration(unit))
+                if statistics is None:
+                    remaining.append(unit)
+                    continue
+                if store is not None:
+                    store.save(unit, statistics, problem.horizon())
+                self.reduce(unit, statistics)
+            self.units = remaining
+
+    def finish(self, unit, statistics, profile=None):
+        """Commits a unit that has just been run and merges it (and its timings) into the sweep's statistics"""
+        if profile is not None:
+            self.profiles.setdefault(profile.worker, PhaseProfile(profile.worker)).merge(profile)
+        if self.store is not None:
+            self.store.save(unit, statistics, self.problem.horizon())
+        if self.cache is not None:
+            self.cache.put(self.problem.unit_configuration(unit), statistics)
+        self.reduce(unit, statistics)
+        if self.telemetry is not None:
+            self.telemetry.finish(self, unit)
+
+    def reduce(self, unit, statistics):
+        """Merges the statistics of one finished unit into the sweep's"""
+        for name, result in statistics.items():
+            if name not in self.statistics:                         # e.g. the sampled rewards of expected_rewards
+                self.statistics[name] = RunningStatistics(len(self.problem.parameters))
+            self.statistics[name].merge_at(unit[0], result)
+
+    def projected_half_width(self, in_flight):
+        """Each parameter's widest half-width over its learners, shrunk for the trials already running"""
+        widest = np.max([self.statistics[name].half_width(self.level) for name in self.statistics
+                         if not name.endswith('_sampled')], axis=0)
+        count = self.statistics['optimal'].count
+        with np.errstate(divide='ignore', invalid='ignore'):
+            projected = widest * np.sqrt(count / (count + in_flight))
+        projected[np.isnan(projected)] = np.inf                     # too few trials to have an interval yet
+        projected[(count + in_flight) < self.minimum_trials] = np.inf
+        return projected
+
+    def next_unit(self, in_flight):
+        """Takes the next unit of the parameter furthest from its target, or None once every parameter is done"""
+        projected = self.projected_half_width(in_flight)
+        for parameter_index in np.argsort(-projected, kind='stable'):
+            if projected[parameter_index] <= self.target_half_width:
+                return None                                         # the rest are at least as close to done
+            for unit in self.units:
+                if unit[0] == parameter_index:
+                    self.units.remove(unit)
+                    return unit
+        return None
+
+    def run(self):
+        """Runs every unit and returns the per-parameter statistics of each learner"""
+        if self.telemetry is None:
+            return self.run_units()
+        manager = Manager() if self.processes > 1 else None         # its queues outlive terminated workers
+        progress = manager.Queue() if manager is not None else queue.Queue()
+        self.telemetry.start(self, progress)
+        try:
+            return self.run_units(progress)
+        finally:
+            self.telemetry.stop()
+            if manager is not None:
+                manager.shutdown()
+
+    def run_units(self, progress=None):
+        """Runs the units, in order or sequentially, with workers reporting to progress if it is a queue"""
+        if self.target_half_width is not None:
+            return self.run_sequential(progress)
+        if self.processes == 1:                                     # no pool needed, e.g. when debugging
+            for unit in self.units:
+                self.finish(*run_profiled_unit(self.problem, unit, progress))
+            return self.statistics
+
+        pool = Pool(self.processes, initializer=start_worker, initargs=(self.problem, progress))
+        try:
+            for unit, statistics, profile in pool.imap_unordered(run_worker_unit, self.units, chunksize=1):
+                self.finish(unit, statistics, profile)
+        finally:
+            pool.close()
+            pool.join()
+        return self.statistics
+
+    def run_sequential(self, progress=None):
+        """Runs units until every parameter reaches its target half-width or runs out of trials"""
+        in_flight = np.zeros(len(self.problem.parameters))          # trials running for each parameter
+        if self.processes == 1:
+            unit = self.next_unit(in_flight)
+            while unit is not None:
+                self.finish(*run_profiled_unit(self.problem, unit, progress))
+                unit = self.next_unit(in_flight)
+            return self.statistics
+
+        results = queue.Queue()
+        pool = Pool(self.processes, initializer=start_worker, initargs=(self.problem, progress))
+        outstanding = 0                                             # units handed to the pool and not back yet
+        try:
+            while True:
+                while outstanding < self.processes:                 # keep every worker busy
+                    unit = self.next_unit(in_flight)
+                    if unit is None:
+                        break
+                    in_flight[unit[0]] += unit[3]
+                    outstanding += 1
+                    pool.apply_async(run_worker_unit, (unit,), callback=results.put, error_callback=results.put)
+                if outstanding == 0:
+                    break
+                result = results.get()
+                if isinstance(result, BaseException):
+                    raise result
+                unit, statistics, profile = result
+                in_flight[unit[0]] -= unit[3]
+                outstanding -= 1
+                self.finish(unit, statistics, profile)
+        finally:
+            pool.terminate()
+            pool.join()
+        return self.statistics
+
+    def profile(self):
+        """The step timings of every worker merged, or None if the problem is not profiled"""
+        if not self.profiles:
+            return None
+        merged = PhaseProfile('all')
+        for profile in self.profiles.values():
+            merged.merge(profile)
+        return merged
+
+    def profile_report(self):
+        """The merged timings by learner and phase, followed by each worker's share of the time"""
+        merged = self.profile()
+        if merged is None:
+            return 'not profiled'
+        lines = [merged.report(), '']
+        for worker, profile in sorted(self.profiles.items()):
+            lines.append('{0:<29} {1:>10.3f}'.format(worker, profile.total()))
+        return '\n'.join(lines)
+
+    def summary(self):
+        """The mean, confidence half-width and number of trials of every learner at every parameter"""
+        return dict((name, (statistics.mean, statistics.half_width(self.level), statistics.count))
+                    for name, statistics in self.statistics.items())
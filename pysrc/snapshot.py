@@ -0,0 +1,62 @@
+import copy
+import io
+import pickle as pkl
+import zlib
+import numpy as np
+
+__author__ = 'kongaloosh'
+
+
+class SnapshotPickler(pkl.Pickler):
+    """Pickles np.random, the default random_state, as the global state it is in"""
+
+    def persistent_id(self, obj):
+        if obj is np.random:
+            return 'np.random', np.random.get_state()
+        return None
+
+
+class SnapshotUnpickler(pkl.Unpickler):
+    """Restores np.random as a RandomState of its own, in the state np.random was pickled in.
+
+    Everything in one snapshot that drew from np.random shares that RandomState, so it carries on with the same
+    draws; the global state of np.random is left alone.
+    """
+
+    def __init__(self, *args, **kwargs):
+        pkl.Unpickler.__init__(self, *args, **kwargs)
+        self.random_state = None
+
+    def persistent_load(self, pid):
+        name, state = pid
+        if name != 'np.random':
+            raise pkl.UnpicklingError("unknown persistent id {0}".format(name))
+        if self.random_state is None:
+            self.random_state = np.random.RandomState()
+            self.random_state.set_state(state)
+        return self.random_state
+
+
+def dumps(value):
+    """Snapshots a problem, a learner, a BatchedRun or any collection of them (RNG states included) to bytes.
+
+    The arrays are pickled in binary and compressed; TrialStreams and WalkTrajectory keep the generator states their
+    blocks came from rather than the blocks, so a snapshot is about the size of the estimates and counters.
+    """
+    buffer = io.BytesIO()
+    SnapshotPickler(buffer, protocol=pkl.HIGHEST_PROTOCOL).dump(value)
+    return zlib.compress(buffer.getvalue())
+
+
+def loads(data):
+    """Restores a snapshot taken with dumps; whatever used np.random gets a RandomState in np.random's old state"""
+    return SnapshotUnpickler(io.BytesIO(zlib.decompress(data))).load()
+
+
+def copy_random_state(random_state):
+    """An independent copy of random_state that will make the same draws, e.g. to draw a block again later"""
+    if random_state is np.random:
+        copied = np.random.RandomState()
+        copied.set_state(np.random.get_state())
+        return copied
+    return copy.deepcopy(random_state)
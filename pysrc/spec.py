@@ -0,0 +1,91 @@
+import json
+import os
+from pysrc.runner import GRID_LEARNERS
+from pysrc.streams import trial_random_state
+
+__author__ = 'kongaloosh'
+
+KINDS = ['sweep', 'curves']
+PROBLEMS = ['stationary', 'random_walk']
+REQUIRED = ['name', 'parameters', 'timesteps', 'trials']
+DEFAULTS = {
+    'kind': 'sweep',                                                # a parameter sweep, or per-step curves
+    'problem': 'stationary',                                        # or 'random_walk'
+    'learners': GRID_LEARNERS,                                      # epsilon (or c, for ucb) is the parameter
+    'arms': 10,
+    'initial_means': 'seed',                                        # drawn from the seed, 'zeros', or a list
+    'step_size': 0.01,
+    'burn_in': 0,
+    'seed': None,                                                   # None draws from np.random
+    'batch_size': 100,
+    'processes': None,                                              # every core
+    'expected_rewards': False,
+    'precision': 'double',
+    'shared_draws': False,                                          # every parameter of a sweep faces the same runs
+    'target_half_width': None,                                      # sequential sweeps stop at this CI width
+    'minimum_trials': None,
+    'output': None,                                                 # results/<name> by default
+    'cache': None,                                                  # a ResultCache directory shared by sweeps
+    'status_address': None,                                         # [host, port] to serve the sweep's status
+    'coordinator_address': None,                                    # [host, port] to serve units to workers
+}
+
+
+def parameter_grid(parameters):
+    """The parameter values of a spec: a list, or {"base": b, "from": i, "to": j} for b**i, ..., b**j.
+
+    Values are kept as written (2**2 stays the integer 4), since a unit's cache key depends on them.
+    """
+    if isinstance(parameters, dict):
+        if set(parameters) != {'base', 'from', 'to'}:
+            raise ValueError("a parameter grid needs exactly base, from and to, not {0}".format(sorted(parameters)))
+        return [parameters['base'] ** exponent for exponent in range(parameters['from'], parameters['to'] + 1)]
+    return list(parameters)
+
+
+def parse_spec(values):
+    """Checks a spec's settings and fills in the defaults, returning the spec as a dict.
+
+    Every spec names its parameter grid, horizon (timesteps) and number of trials; see DEFAULTS for the rest.
+    Unknown keys are refused rather than ignored, so a misspelt setting cannot silently fall back to its default.
+    """
+    unknown = set(values) - set(REQUIRED) - set(DEFAULTS)
+    if unknown:
+        raise ValueError("unknown settings {0}".format(sorted(unknown)))
+    missing = set(REQUIRED) - set(values)
+    if missing:
+        raise ValueError("missing settings {0}".format(sorted(missing)))
+    spec = dict(DEFAULTS, **values)
+    if spec['kind'] not in KINDS:
+        raise ValueError("kind must be one of {0}, not {1!r}".format(KINDS, spec['kind']))
+    if spec['problem'] not in PROBLEMS:
+        raise ValueError("problem must be one of {0}, not {1!r}".format(PROBLEMS, spec['problem']))
+    if not set(spec['learners']) <= set(GRID_LEARNERS):
+        raise ValueError("learners must be among {0}, not {1}".format(GRID_LEARNERS, spec['learners']))
+    if spec['burn_in'] >= spec['timesteps']:
+        raise ValueError("the burn-in ({0}) leaves no steps of {1} to count".format(spec['burn_in'],
+                                                                                  spec['timesteps']))
+    spec['learners'] = list(spec['learners'])
+    spec['parameters'] = parameter_grid(spec['parameters'])
+    if spec['output'] is None:
+        spec['output'] = os.path.join('results', spec['name'])
+    return spec
+
+
+def load_spec(path):
+    """Reads and checks a JSON spec file"""
+    with open(path) as f:
+        return parse_spec(json.load(f))
+
+
+def initial_means(spec):
+    """The arm means every run starts from: drawn from the spec's seed (as the experiments do), zeros, or as given"""
+    if spec['initial_means'] == 'seed':
+        if spec['seed'] is None:
+            return None
+        return trial_random_state(spec['seed']).normal(loc=0, scale=1, size=spec['arms'])
+    if spec['initial_means'] == 'zeros':
+        return None
+    if len(spec['initial_means']) != spec['arms']:
+        raise ValueError("{0} initial means for {1} arms".format(len(spec['initial_means']), spec['arms']))
+    return [float(mean) for mean in spec['initial_means']]
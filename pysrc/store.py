@@ -0,0 +1,132 @@
+import os
+import pickle as pkl
+import tempfile
+from pysrc.cache import configuration_key
+from pysrc.metrics import RunningStatistics
+
+__author__ = 'kongaloosh'
+
+NOT_COMPARED = ['timesteps', 'burn_in', 'checkpoint_interval', 'snapshot_directory', 'trajectory_directory',
+                'profile']                                          # a store may hold several horizons of a sweep
+
+
+def sweep_fields(problem):
+    """The settings of a SweepProblem that decide its units' results, leaving out the horizon and where things go"""
+    return sorted((name, value) for name, value in problem.__dict__.items() if name not in NOT_COMPARED)
+
+
+class ResultStore(object):
+
+    def __init__(self, directory):
+        """Keeps each finished (parameter, trial-batch) unit of a sweep as its own file in directory.
+
+        Every file is written to a temporary name and renamed into place, so a crash leaves either the whole unit or
+        nothing; a re-run skips the units that are already there. Units are kept per horizon, a (timesteps, burn_in)
+        pair, so the same sweep can be run to a longer horizon in the same store and the shorter one is still there.
+        """
+        self.directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def write(self, name, value):
+        """Atomically pickles value to name inside the store"""
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(handle, 'wb') as f:
+            pkl.dump(value, f, protocol=pkl.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, os.path.join(self.directory, name))
+
+    def read(self, name):
+        with open(os.path.join(self.directory, name), 'rb') as f:
+            return pkl.load(f)
+
+    def unit_name(self, unit, horizon):
+        return 'unit_{0}_{1}_{2}_{3}_{4}_{5}.pkl'.format(*(tuple(unit) + tuple(horizon)))   # none of them collide
+
+    def save(self, unit, statistics, horizon):
+        """Commits the statistics of one unit finished at horizon, (timesteps, burn_in)"""
+        self.write(self.unit_name(unit, horizon), (unit, statistics, tuple(horizon)))
+
+    def save_problem(self, problem):
+        """Records the sweep the units belong to, refusing to mix units from a different sweep.
+
+        Sweeps that differ only in their horizon, checkpoints, directories or profiling are the same sweep.
+        """
+        if os.path.exists(os.path.join(self.directory, 'problem.pkl')):
+            if pkl.dumps(sweep_fields(self.read('problem.pkl'))) != pkl.dumps(sweep_fields(problem)):
+                raise ValueError("{0} holds units of a different sweep".format(self.directory))
+        else:
+            self.write('problem.pkl', problem)
+
+    def load_problem(self):
+        return self.read('problem.pkl')
+
+    def save_plan(self, units, horizon):
+        """Records the units and horizon of the latest sweep; statistics merges only those units"""
+        self.write('plan.pkl', (sorted(units), tuple(horizon)))
+
+    def load_plan(self):
+        """The units and horizon of the latest sweep, or None for a store written before plans were kept"""
+        try:
+            units, horizon = self.read('plan.pkl')
+        except (IOError, OSError):
+            return None
+        return set(units), horizon
+
+    def units(self, horizon=None):
+        """Returns every committed (unit, statistics) pair, or only those of horizon"""
+        names = sorted(name for name in os.listdir(self.directory) if name.startswith('unit_') and name.endswith('.pkl'))
+        stored = None
+        units = []
+        for name in names:
+            entry = self.read(name)
+            if len(entry) == 2:                                     # from before units kept their horizon
+                if stored is None:
+                    problem = self.load_problem()
+                    stored = (problem.timesteps, problem.burn_in)
+                entry = entry + (stored,)
+            if horizon is None or tuple(entry[2]) == tuple(horizon):
+                units.append(entry[:2])
+        return units
+
+    def completed(self, horizon=None):
+        """Returns the (parameter index, batch index) of every committed unit, or of those of horizon"""
+        return set((unit[0], unit[1]) for unit, _ in self.units(horizon))
+
+    def statistics(self, learners):
+        """Merges the committed units of the latest sweep's plan into per-parameter RunningStatistics.
+
+        Units of a sweep with another batch size cover the same trials, so they are left out rather than counted
+        twice. The statistics may still be partial.
+        """
+        problem = self.load_problem()
+        plan = self.load_plan()
+        planned, horizon = plan if plan is not None else (None, (problem.timesteps, problem.burn_in))
+        statistics = dict((name, RunningStatistics(len(problem.parameters))) for name in learners)
+        for unit, result in self.units(horizon):
+            if planned is not None and tuple(unit) not in planned:
+                continue
+            for name in learners:
+                statistics[name].merge_at(unit[0], result[name])
+        return statistics
+
+    def save_snapshot(self, configuration, snapshot, timestep):
+        """Keeps the snapshot (bytes from pysrc.snapshot.dumps) of the runs configuration describes, at timestep.
+
+        Snapshots at other steps are kept too, so a sweep can go back to a shorter horizon after a longer one.
+        """
+        self.write('snapshot_{0}_{1}.pkl'.format(configuration_key(configuration), timestep), snapshot)
+
+    def load_snapshot(self, configuration, horizon=None):
+        """Returns the latest snapshot saved for configuration at or before horizon, or None if there is none"""
+        prefix = 'snapshot_{0}_'.format(configuration_key(configuration))
+        timesteps = [int(name[len(prefix):-len('.pkl')]) for name in os.listdir(self.directory)
+                     if name.startswith(prefix) and name.endswith('.pkl')]
+        timesteps = [timestep for timestep in timesteps if horizon is None or timestep <= horizon]
+        if not timesteps:
+            return None
+        try:
+            return self.read('{0}{1}.pkl'.format(prefix, max(timesteps)))
+        except (IOError, OSError):                                  # removed since it was listed
+            return None
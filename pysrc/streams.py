@@ -0,0 +1,135 @@
+import numpy as np
+
+__author__ = 'kongaloosh'
+
+REWARD, WALK, EXPLORATION = 0, 1, 2                                 # what a stream is spent on
+NORMAL, UNIFORM = 0, 1                                              # the kind of draw
+
+
+def spawn_generator(root_seed, coordinates):
+    """A Generator on its own PCG64 stream, derived from root_seed at the given integer coordinates"""
+    return np.random.Generator(np.random.PCG64(np.random.SeedSequence(root_seed, spawn_key=tuple(coordinates))))
+
+
+def trial_random_state(root_seed, *coordinates):
+    """A RandomState for a single trial, e.g. trial_random_state(seed, parameter_key(epsilon), trial_index).
+
+    It drops in as the random_state of BanditExperiment and the per-run learners.
+    """
+    return np.random.RandomState(np.random.PCG64(np.random.SeedSequence(root_seed, spawn_key=tuple(coordinates))))
+
+
+def restore_generator(state):
+    """A Generator on a PCG64 stream put back in the given bit_generator.state"""
+    bit_generator = np.random.PCG64()
+    bit_generator.state = state
+    return np.random.Generator(bit_generator)
+
+
+def parameter_key(parameter):
+    """An integer coordinate for a parameter value, so a trial's stream does not depend on the sweep's ordering"""
+    return int(np.float64(parameter).view(np.uint64))
+
+
+class TrialStreams(object):
+
+    def __init__(self, root_seed, trials, key=(), block_size=4096):
+        """Gives each trial of a batch its own stream, for the batched problem and learners.
+
+        Draws must be requested with the trials axis last; each trial's share is read from its own generator, so
+        what a trial sees depends only on root_seed, key and its trial index, not on which batch or machine runs it.
+
+        Pickling keeps the generator states each block was drawn from rather than the blocks themselves, so a
+        snapshot costs a few hundred bytes per trial; the block is drawn again when the copy is first read.
+        """
+        self.block_size = block_size
+        self.generators = {
+            NORMAL: [spawn_generator(root_seed, tuple(key) + (trial, NORMAL)) for trial in trials],
+            UNIFORM: [spawn_generator(root_seed, tuple(key) + (trial, UNIFORM)) for trial in trials],
+        }
+        self.blocks = dict((kind, np.empty((len(trials), 0))) for kind in self.generators)   # (trials x block)
+        self.positions = dict((kind, 0) for kind in self.generators)                        # next unread column
+        self.block_states = dict((kind, None) for kind in self.generators)                  # what drew each block
+        self.block_lengths = dict((kind, 0) for kind in self.generators)
+
+    @staticmethod
+    def draw(kind, generators, length):
+        if kind == NORMAL:
+            return np.array([generator.standard_normal(length) for generator in generators])
+        return np.array([generator.random(length) for generator in generators])
+
+    def refill(self, kind, length):
+        """Draws the next block of length draws from every trial's stream"""
+        generators = self.generators[kind]
+        self.block_states[kind] = [generator.bit_generator.state for generator in generators]
+        self.blocks[kind] = self.draw(kind, generators, length).reshape(len(generators), length)
+        self.block_lengths[kind] = length
+        self.positions[kind] = 0
+
+    def take(self, kind, size):
+        """Reads prod(size[:-1]) draws from every trial's stream and lays them out with the trials axis last"""
+        size = (size,) if isinstance(size, int) else tuple(size)
+        number_of_trials = len(self.generators[kind])
+        if size[-1] != number_of_trials:
+            raise ValueError("the last axis of size must be the {0} trials".format(number_of_trials))
+        count = 1
+        for length in size[:-1]:                                    # np.prod costs more than the draws
+            count *= int(length)
+        block, position = self.blocks[kind], self.positions[kind]
+        if block is not None and position + count <= block.shape[1]:   # the usual case: all in this block
+            self.positions[kind] = position + count
+            return block[:, position:position + count].T.reshape(size)
+        if block is None:                               # restored from a snapshot: draw it again
+            generators = [restore_generator(state) for state in self.block_states[kind]]
+            self.blocks[kind] = self.draw(kind, generators, self.block_lengths[kind]).reshape(number_of_trials, -1)
+        pieces = []
+        while count > 0:
+            if self.positions[kind] == self.blocks[kind].shape[1]:
+                self.refill(kind, max(self.block_size, count))
+            piece = self.blocks[kind][:, self.positions[kind]:self.positions[kind] + count]
+            self.positions[kind] += piece.shape[1]
+            count -= piece.shape[1]
+            pieces.append(piece)
+        draws = pieces[0] if len(pieces) == 1 else np.concatenate(pieces, axis=1)
+        return draws.T.reshape(size)
+
+    def normal(self, loc=0., scale=1., size=None):
+        """Same as np.random.normal, with the trials axis last"""
+        return loc + scale * self.take(NORMAL, size)
+
+    def random(self, size=None):
+        """Same as np.random.random, with the trials axis last"""
+        return self.take(UNIFORM, size)
+
+    def randint(self, high, size=None):
+        """Same as np.random.randint(high), with the trials axis last"""
+        return (self.random(size) * high).astype(int)
+
+    def __getstate__(self):
+        return {
+            'block_size': self.block_size,
+            'states': dict((kind, [generator.bit_generator.state for generator in generators])
+                           for kind, generators in self.generators.items()),
+            'block_states': self.block_states,
+            'block_lengths': self.block_lengths,
+            'positions': self.positions,
+        }
+
+    def __setstate__(self, state):
+        self.block_size = state['block_size']
+        self.generators = dict((kind, [restore_generator(generator_state) for generator_state in states])
+                               for kind, states in state['states'].items())
+        self.block_states = state['block_states']
+        self.block_lengths = state['block_lengths']
+        self.positions = state['positions']
+        self.blocks = dict((kind, np.empty((len(generators), 0)) if self.block_states[kind] is None else None)
+                           for kind, generators in self.generators.items())
+
+
+def trial_streams(root_seed, trials, key=(), block_size=4096):
+    """Independent reward, walk and exploration TrialStreams for a batch of trials, as keyword arguments of run_grid"""
+    return {
+        'random_state': TrialStreams(root_seed, trials, tuple(key) + (REWARD,), block_size),
+        'walk_random_state': TrialStreams(root_seed, trials, tuple(key) + (WALK,), block_size),
+        'exploration_random_state': TrialStreams(root_seed, trials, tuple(key) + (EXPLORATION,), block_size),
+    }
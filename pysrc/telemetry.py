@@ -0,0 +1,218 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import queue
+import threading
+import time
+import numpy as np
+
+__author__ = 'kongaloosh'
+
+
+class ProgressReporter(object):
+
+    def __init__(self, progress, worker, unit, interval=1., every=100):
+        """A worker's side of the telemetry: puts (worker, unit, step) on progress at most every interval seconds.
+
+        BatchedRun calls report every `every` steps, so the clock is only read that often. progress is anything
+        with a put method: a multiprocessing queue in a pool, or the coordinator's work queue on a cluster.
+        """
+        self.progress = progress
+        self.worker = worker
+        self.unit = unit
+        self.interval = interval
+        self.every = every
+        self.sent = -np.inf
+
+    def report(self, timestep, force=False):
+        now = time.time()
+        if force or now - self.sent >= self.interval:
+            self.progress.put((self.worker, self.unit, timestep))
+            self.sent = now
+
+
+def listed(values):
+    """values as a JSON-ready list, with None for cells that have no value yet"""
+    return [None if not np.isfinite(value) else float(value) for value in np.ravel(values)]
+
+
+class Telemetry(object):
+
+    def __init__(self, status_path=None, address=None, interval=5., stall_timeout=60.):
+        """Aggregates workers' progress reports with a SweepScheduler's results into a live status of the sweep.
+
+        The status (see status) is rewritten to status_path every interval seconds and, given a (host, port)
+        address, served as JSON to HTTP GET requests there. A worker that has not reported for stall_timeout
+        seconds while it holds a unit is marked as stalled.
+        """
+        self.status_path = status_path
+        self.address = address
+        self.interval = interval
+        self.stall_timeout = stall_timeout
+        self.problem = None
+        self.started = None
+        self.steps_run = 0.                                         # run-steps taken since the start
+        self.planned = None                                         # trials per parameter, done or not
+        self.cells = {}                                             # learner -> (mean, half-width, trials)
+        self.running = {}                                           # unit -> [worker, last step reported]
+        self.finished = set()
+        self.unreported = set()                                     # finished before their first report came in
+        self.workers = {}                                           # worker -> [unit, reported at]
+        self.lock = threading.Lock()                                # reports, results and requests come in
+        self.stopping = threading.Event()                           # on threads of their own
+        self.threads = []
+        self.server = None
+        self.progress = None
+
+    def start(self, scheduler, progress=None):
+        """Starts aggregating for scheduler, draining progress (a queue) if workers put their reports on one"""
+        self.problem = scheduler.problem
+        self.started = time.time()
+        self.planned = np.copy(scheduler.statistics['optimal'].count)
+        for unit in scheduler.units:
+            self.planned[unit[0]] += unit[3]
+        self.summarize(scheduler)
+        self.progress = progress
+        self.stopping.clear()
+        self.threads = [threading.Thread(target=self.listen, args=(progress,), daemon=True)]
+        if self.address is not None:
+            self.server = ThreadingHTTPServer(tuple(self.address), status_handler(self))
+            self.address = self.server.server_address               # the port actually bound
+            self.threads.append(threading.Thread(target=self.server.serve_forever, daemon=True))
+        for thread in self.threads:
+            thread.start()
+
+    def listen(self, progress):
+        """Takes reports off progress and rewrites the status file every interval seconds, until stopped"""
+        written = time.time()
+        while not self.stopping.is_set():
+            if progress is None:
+                self.stopping.wait(min(self.interval, 0.5))
+            else:
+                try:
+                    self.put(progress.get(timeout=min(self.interval, 0.5)))
+                except queue.Empty:
+                    pass
+            if time.time() - written >= self.interval:
+                self.write()
+                written = time.time()
+
+    def stop(self):
+        """Writes the final status and stops listening and serving"""
+        self.stopping.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+        while self.progress is not None:                            # reports still queued when the sweep ended
+            try:
+                self.put(self.progress.get_nowait())
+            except queue.Empty:
+                break
+        self.write()
+
+    def put(self, report):
+        """Takes one (worker, unit, step) progress report"""
+        worker, unit, timestep = report
+        unit = tuple(unit)
+        with self.lock:
+            if unit in self.finished:                               # overtaken by the unit's result
+                if unit in self.unreported:                         # its first report: the step it started from
+                    self.unreported.remove(unit)
+                    self.steps_run += unit[3] * (self.problem.timesteps - timestep)
+                return
+            self.workers[worker] = [unit, time.time()]
+            if unit in self.running:
+                self.steps_run += unit[3] * (timestep - self.running[unit][1])
+            self.running[unit] = [worker, timestep]                 # the first report is the step it starts from
+
+    def finish(self, scheduler, unit):
+        """Counts the rest of a finished unit's steps and takes the scheduler's updated statistics.
+
+        A unit that has not reported yet may have started from a snapshot, so its steps are counted when its first
+        report, which carries the step it started from, comes in.
+        """
+        unit = tuple(unit)
+        with self.lock:
+            worker, last = self.running.pop(unit, [None, None])
+            if last is None:
+                self.unreported.add(unit)
+            else:
+                self.steps_run += unit[3] * (self.problem.timesteps - last)
+            self.finished.add(unit)
+            if worker is not None and self.workers[worker][0] == unit:
+                self.workers[worker][0] = None
+        self.summarize(scheduler)
+
+    def summarize(self, scheduler):
+        cells = dict((name, (np.copy(statistics.mean), statistics.half_width(scheduler.level),
+                             np.copy(statistics.count))) for name, statistics in scheduler.statistics.items())
+        with self.lock:
+            self.cells = cells
+
+    def status(self):
+        """The sweep so far, as a dict that serializes to JSON.
+
+        trials: completed and planned trials per parameter (for a sequential sweep planned is the cap);
+        steps_per_second: run-steps (one step of one run of every learner) per second since the start, and eta the
+        seconds left at that rate (an upper bound for a sequential sweep); cells: every learner's running mean,
+        confidence half-width and trials per parameter; workers: each worker's unit, step, seconds since it last
+        reported and whether it has stalled.
+        """
+        now = time.time()
+        with self.lock:
+            elapsed = now - self.started
+            rate = self.steps_run / elapsed if elapsed > 0 else 0.
+            completed = self.cells['optimal'][2]
+            in_progress = sum(unit[3] * step for unit, (_, step) in self.running.items())
+            remaining = max(0., np.sum(self.planned - completed) * self.problem.timesteps - in_progress)
+            workers = {}
+            for worker, (unit, reported) in self.workers.items():
+                workers[worker] = {
+                    'unit': None if unit is None else list(unit),
+                    'step': self.running[unit][1] if unit in self.running else None,
+                    'seconds_since_report': now - reported,
+                    'stalled': unit is not None and now - reported > self.stall_timeout,
+                }
+            return {
+                'time': now,
+                'elapsed': elapsed,
+                'parameters': list(self.problem.parameters),
+                'timesteps': self.problem.timesteps,
+                'trials': {'completed': listed(completed), 'planned': listed(self.planned)},
+                'steps_per_second': rate,
+                'eta': remaining / rate if rate > 0 else None,
+                'cells': dict((name, {'mean': listed(mean), 'half_width': listed(half_width),
+                                      'trials': listed(count)}) for name, (mean, half_width, count) in
+                              self.cells.items()),
+                'workers': workers,
+            }
+
+    def write(self):
+        """Replaces the status file in one step, so readers never see half of it"""
+        if self.status_path is None or self.problem is None:
+            return
+        partial = self.status_path + '.partial'
+        with open(partial, 'w') as f:
+            json.dump(self.status(), f, indent=1)
+        os.replace(partial, self.status_path)
+
+
+def status_handler(telemetry):
+    """An HTTP handler that answers every GET with the telemetry's status"""
+    class StatusHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            body = json.dumps(telemetry.status()).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):                               # one line per request would drown the output
+            pass
+    return StatusHandler
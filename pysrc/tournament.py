@@ -0,0 +1,121 @@
+import math
+import numpy as np
+
+__author__ = 'kongaloosh'
+
+
+class ArgmaxTree(object):
+
+    def __init__(self, values):
+        """A tournament tree over the last axis of values: each row's argmax in O(1), one entry per row changed in
+        O(log arms).
+
+        Every internal node holds the index of the best leaf below it, node 1 being the root and node n having
+        children 2n and 2n + 1. Ties go to the lowest index, as with np.argmax. The tree keeps its own copy of values.
+        """
+        values = np.asarray(values, dtype=float)
+        self.shape = values.shape[:-1]
+        number_of_arms = values.shape[-1]
+        self.size = 1 << max(0, (number_of_arms - 1).bit_length())    # leaves, padded to a power of two
+        self.values = np.full(self.shape + (self.size,), -np.inf)
+        self.values[..., :number_of_arms] = values
+        self.winners = np.zeros(self.shape + (2 * self.size,), dtype=int)
+        self.winners[..., self.size:] = np.arange(self.size)
+        level = self.size // 2
+        while level:                                                # build the nodes level by level, bottom up
+            left = self.winners[..., 2 * level:4 * level:2]
+            right = self.winners[..., 2 * level + 1:4 * level:2]
+            left_wins = (np.take_along_axis(self.values, left, axis=-1) >=
+                         np.take_along_axis(self.values, right, axis=-1))
+            self.winners[..., level:2 * level] = np.where(left_wins, left, right)
+            level //= 2
+        self.runs = tuple(np.ix_(*[np.arange(n) for n in self.shape]))
+
+    def argmax(self):
+        """The index of the largest value of every row"""
+        return self.winners[..., 1]
+
+    def update(self, arms, values):
+        """Sets the value of one arm in every row and replays that arm's matches up to the root"""
+        if not self.shape:                                          # a single row: plain integer indexing
+            self.values[arms] = values
+            node = (int(arms) + self.size) >> 1
+            while node:
+                left, right = self.winners[2 * node], self.winners[2 * node + 1]
+                self.winners[node] = left if self.values[left] >= self.values[right] else right
+                node >>= 1
+            return
+        self.values[self.runs + (arms,)] = values
+        node = (np.asarray(arms) + self.size) >> 1
+        for _ in range(self.size.bit_length() - 1):                 # every row is at the same depth
+            left = self.winners[self.runs + (2 * node,)]
+            right = self.winners[self.runs + (2 * node + 1,)]
+            left_wins = self.values[self.runs + (left,)] >= self.values[self.runs + (right,)]
+            self.winners[self.runs + (node,)] = np.where(left_wins, left, right)
+            node = node >> 1
+
+
+class KineticTournament(object):
+
+    def __init__(self, number_of_arms):
+        """Tracks the UCB argmax of one run as its time term grows, touching O(log arms) nodes per step (amortised).
+
+        Once visited, an arm's score est + c * sqrt(log(t) / n) is a line a + b * s in s = sqrt(log t), with
+        a = est and b = c / sqrt(n). Each node keeps the winner of its match at the current s and the s at which
+        its loser would overtake it (a certificate); nodes are only replayed when an arm is updated or a
+        certificate below them has expired. Unvisited arms beat every visited arm and each other by index, as
+        np.argmax does with their infinite (or, at t=1, nan) scores.
+        """
+        self.size = 1 << max(0, (number_of_arms - 1).bit_length())
+        self.intercepts = [0.] * number_of_arms + [-math.inf] * (self.size - number_of_arms)   # padding never wins
+        self.slopes = [0.] * self.size
+        self.visited = [False] * number_of_arms + [True] * (self.size - number_of_arms)
+        self.winners = [0] * self.size + list(range(self.size))
+        self.expiry = [math.inf] * (2 * self.size)                  # earliest certificate in each subtree
+        self.s = 0.
+        for node in range(self.size - 1, 0, -1):
+            self.replay(node)
+
+    def match(self, i, j):
+        """The winner of arms i < j at the current s, and the s at which the loser would take over"""
+        if not self.visited[i]:
+            return i, math.inf
+        if not self.visited[j]:
+            return j, math.inf
+        score_i = self.intercepts[i] + self.slopes[i] * self.s
+        score_j = self.intercepts[j] + self.slopes[j] * self.s
+        winner, loser = (i, j) if score_i >= score_j else (j, i)
+        if self.slopes[loser] <= self.slopes[winner]:               # the loser never catches up
+            return winner, math.inf
+        return winner, (self.intercepts[winner] - self.intercepts[loser]) / (self.slopes[loser] - self.slopes[winner])
+
+    def replay(self, node):
+        left, right = self.winners[2 * node], self.winners[2 * node + 1]
+        self.winners[node], certificate = self.match(left, right)    # the left subtree holds the lower indices
+        self.expiry[node] = min(certificate, self.expiry[2 * node], self.expiry[2 * node + 1])
+
+    def advance(self, t):
+        """Moves to step t, replaying every match whose certificate has expired, and returns the best arm"""
+        self.s = math.sqrt(math.log(t))
+        if self.expiry[1] < self.s:
+            stack = [1]                                             # depth first, children before their parent
+            visit = []
+            while stack:
+                node = stack.pop()
+                if node < self.size and self.expiry[node] < self.s:
+                    visit.append(node)
+                    stack.extend((2 * node, 2 * node + 1))
+            for node in reversed(visit):
+                self.replay(node)
+        return self.winners[1]
+
+    def update(self, arm, estimate, bonus):
+        """Sets an arm's estimate and bonus coefficient c / sqrt(visits), replaying its matches up to the root"""
+        arm = int(arm)
+        self.intercepts[arm] = float(estimate)
+        self.slopes[arm] = float(bonus)
+        self.visited[arm] = True
+        node = (arm + self.size) >> 1
+        while node:
+            self.replay(node)
+            node >>= 1
@@ -0,0 +1,209 @@
+import json
+import os
+import warnings
+import numpy as np
+
+__author__ = 'kongaloosh'
+
+FIELDS = ['actions', 'rewards', 'optimal', 'regret']
+
+
+class TrajectoryStore(object):
+
+    def __init__(self, directory):
+        """Every run's per-step chosen arm, reward, optimal flag and regret, as memory-mapped .npy columns.
+
+        Each learner has one file per field, laid out as (... x runs x steps) so that a run's steps are contiguous:
+        actions are int16 (int32 past 32767 arms), rewards and regret (best mean minus the chosen arm's mean)
+        float32, and the optimal flags are bit-packed along the steps. Create a store with TrajectoryStore.create;
+        columns open with np.load(mmap_mode=...), so reading one never copies the file into memory.
+
+        written.npy holds how many steps of every run have been written, so runs that were never written (e.g. units
+        of a sweep taken from a cache, or stopped early) are left out of summary rather than counted as zeros. It is a
+        memory map rather than part of trajectories.json so that workers can mark their own rows at the same time.
+        """
+        self.directory = directory
+        with open(os.path.join(directory, 'trajectories.json')) as f:
+            layout = json.load(f)
+        self.learners = layout['learners']
+        self.shape = tuple(layout['shape'])
+        self.timesteps = layout['timesteps']
+        self.number_of_arms = layout.get('number_of_arms')           # not kept by older stores
+
+    @classmethod
+    def create(cls, directory, learners, shape, timesteps, number_of_arms):
+        """Allocates the columns of a store for runs of the given leading shape, e.g. (params, trials)"""
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        shape = tuple(int(n) for n in np.atleast_1d(shape))
+        dtypes = {
+            'actions': np.int16 if number_of_arms <= np.iinfo(np.int16).max else np.int32,
+            'rewards': np.float32,
+            'optimal': np.uint8,
+            'regret': np.float32,
+        }
+        for name in learners:
+            for field in FIELDS:
+                length = (timesteps + 7) // 8 if field == 'optimal' else timesteps
+                column = np.lib.format.open_memmap(os.path.join(directory, '{0}_{1}.npy'.format(name, field)),
+                                                   mode='w+', dtype=dtypes[field], shape=shape + (length,))
+                del column                                          # flushes the zeroed file
+        written = np.lib.format.open_memmap(os.path.join(directory, 'written.npy'), mode='w+', dtype=np.int64,
+                                            shape=shape)
+        del written
+        with open(os.path.join(directory, 'trajectories.json'), 'w') as f:
+            json.dump({'learners': list(learners), 'shape': list(shape), 'timesteps': timesteps,
+                       'number_of_arms': number_of_arms}, f)
+        return cls(directory)
+
+    @classmethod
+    def prepare(cls, directory, learners, shape, timesteps, number_of_arms):
+        """Opens the store in directory for runs of this layout, creating it, or lengthening its columns to timesteps.
+
+        A store laid out for other learners, runs or arms is refused rather than written past its columns.
+        """
+        if not os.path.exists(os.path.join(directory, 'trajectories.json')):
+            return cls.create(directory, learners, shape, timesteps, number_of_arms)
+        store = cls(directory)
+        shape = tuple(int(n) for n in np.atleast_1d(shape))
+        layout = (store.learners, store.shape, store.number_of_arms)
+        if layout != (list(learners), shape, number_of_arms) and layout != (list(learners), shape, None):
+            raise ValueError("{0} holds {1} runs of {2} with {3} arms, not {4} runs of {5} with {6} arms".format(
+                directory, store.shape, store.learners, store.number_of_arms, shape, list(learners), number_of_arms))
+        if store.timesteps < timesteps:
+            store.grow(timesteps)
+        return store
+
+    def grow(self, timesteps):
+        """Lengthens every column to timesteps steps, keeping the steps already written"""
+        for name in self.learners:
+            for field in FIELDS:
+                path = os.path.join(self.directory, '{0}_{1}.npy'.format(name, field))
+                old = self.column(name, field)
+                length = (timesteps + 7) // 8 if field == 'optimal' else timesteps
+                new = np.lib.format.open_memmap(path + '.tmp', mode='w+', dtype=old.dtype,
+                                                shape=old.shape[:-1] + (length,))
+                for row in range(old.shape[0]):                     # a row at a time, to bound the memory used
+                    new[row, ..., :old.shape[-1]] = old[row]
+                new.flush()
+                del new, old
+                os.replace(path + '.tmp', path)
+        self.timesteps = timesteps
+        with open(os.path.join(self.directory, 'trajectories.json'), 'w') as f:
+            json.dump({'learners': self.learners, 'shape': list(self.shape), 'timesteps': timesteps,
+                       'number_of_arms': self.number_of_arms}, f)
+
+    def column(self, name, field, mode='r'):
+        """One field of one learner as a memory map; 'r+' to write into it"""
+        return np.load(os.path.join(self.directory, '{0}_{1}.npy'.format(name, field)), mmap_mode=mode)
+
+    def written(self, mode='r'):
+        """How many steps of every run have been written, as a memory map, or None if the store does not keep it"""
+        path = os.path.join(self.directory, 'written.npy')
+        if not os.path.exists(path):                                # older stores: every run counts as written
+            return None
+        return np.load(path, mmap_mode=mode)
+
+    def steps(self, name, field, start, stop, index=Ellipsis):
+        """The values of steps start to stop of the runs at index, with the optimal flags unpacked"""
+        column = self.column(name, field)
+        if field != 'optimal':
+            return column[index][..., start:stop]
+        flags = np.unpackbits(column[index][..., start // 8:(stop + 7) // 8], axis=-1)
+        return flags[..., start - 8 * (start // 8):stop - 8 * (start // 8)]
+
+    def summary(self, name, field, quantiles=(0.05, 0.5, 0.95), chunk_size=4096, index=Ellipsis, cumulative=False):
+        """The per-step mean and quantiles over the runs at index, reading chunk_size steps at a time.
+
+        The runs are the last axis before the steps; cumulative sums each run over its steps first, e.g. for regret
+        curves. Only the steps runs have written count, and a step no run has reached is nan. Returns (mean,
+        quantiles), shaped (... x steps) and (quantiles x ... x steps).
+        """
+        written = self.written()
+        written = np.asarray(written[index]) if written is not None else None
+        means, bands = [], []
+        carried = 0.
+        for start in range(0, self.timesteps, chunk_size):
+            stop = min(start + chunk_size, self.timesteps)
+            values = self.steps(name, field, start, stop, index)
+            values = values.astype(float)
+            if written is not None:                                 # steps not written yet are not zeros
+                values[written[..., None] <= np.arange(start, stop)] = np.nan
+            if cumulative:
+                values = carried + np.cumsum(values, axis=-1)
+                carried = values[..., -1:]
+            with warnings.catch_warnings():                         # steps no run has reached stay nan
+                warnings.simplefilter('ignore', RuntimeWarning)
+                means.append(np.nanmean(values, axis=-2))
+                bands.append(np.nanquantile(values, quantiles, axis=-2))
+        return np.concatenate(means, axis=-1), np.concatenate(bands, axis=-1)
+
+
+class TrajectoryRecorder(object):
+
+    def __init__(self, store, index=Ellipsis, chunk_size=1024):
+        """Streams a BatchedRun's steps into the rows of a TrajectoryStore at index.
+
+        index picks this worker's runs, e.g. (slice(p, p + 1), slice(first, first + runs)) for one unit of a sweep,
+        so workers write disjoint slices of the same files. Steps are buffered chunk_size at a time and written as
+        one contiguous segment per run.
+        """
+        self.store = store
+        self.index = index if isinstance(index, tuple) else (index,)
+        self.chunk_size = chunk_size
+        self.buffers = None                                         # name -> field -> (... x chunk) values
+        self.start = None                                           # the step the buffers begin at
+        self.filled = 0
+        self.columns = {}
+        self.written = None
+
+    def record(self, name, step, arms, rewards, optimal, regret):
+        """Adds one step of one learner: the arms pulled in every run, their rewards, flags and regret"""
+        if self.buffers is not None and step - self.start == self.chunk_size:   # the chunk is full
+            self.flush()
+        if self.buffers is None:
+            self.start, self.filled = step, 0
+            self.buffers = {}
+        if name not in self.buffers:
+            shape = np.shape(arms) + (self.chunk_size,)
+            self.buffers[name] = dict((field, np.zeros(shape)) for field in FIELDS)
+        position = step - self.start
+        buffers = self.buffers[name]
+        buffers['actions'][..., position] = arms
+        buffers['rewards'][..., position] = rewards
+        buffers['optimal'][..., position] = optimal
+        buffers['regret'][..., position] = regret
+        self.filled = position + 1
+
+    def column(self, name, field):
+        if (name, field) not in self.columns:
+            self.columns[(name, field)] = self.store.column(name, field, mode='r+')
+        return self.columns[(name, field)]
+
+    def flush(self):
+        """Writes the buffered steps to the store"""
+        if self.buffers is None:
+            return
+        start, stop = self.start, self.start + self.filled
+        for name, buffers in self.buffers.items():
+            for field in 'actions', 'rewards', 'regret':
+                rows = self.column(name, field)[self.index]
+                rows[..., start:stop] = buffers[field][..., :self.filled]
+            # pack the flags whole bytes at a time, keeping the bits of neighbouring steps already written
+            rows = self.column(name, 'optimal')[self.index]
+            first, last = start // 8, (stop + 7) // 8
+            flags = np.unpackbits(rows[..., first:last], axis=-1)
+            flags[..., start - 8 * first:stop - 8 * first] = buffers['optimal'][..., :self.filled]
+            rows[..., first:last] = np.packbits(flags, axis=-1)
+        for column in self.columns.values():
+            column.flush()
+        if self.written is None:
+            self.written = self.store.written(mode='r+')
+        if self.written is not None:                                # runs whose steps up to start are there
+            counts = self.written[self.index]
+            counts[...] = np.where(counts >= start, np.maximum(counts, stop), counts)
+            self.written.flush()
+        self.buffers = None
+
+    def __getstate__(self):
+        return dict(self.__dict__, columns={}, written=None)        # memory maps are reopened after a snapshot
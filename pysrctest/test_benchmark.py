@@ -0,0 +1,52 @@
+import os
+import shutil
+import tempfile
+import unittest
+from pysrc.benchmark import compare, load, main, run_suite, save
+
+__author__ = 'kongaloosh'
+
+
+def suite(*rates):
+    return {'environment': {}, 'results': [{'benchmark': 'learner/ucb', 'arms': arms, 'horizon': None,
+                                            'workers': None, 'unit': 'steps/s', 'rate': rate}
+                                           for arms, rate in zip([10, 100, 1000], rates)]}
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_runs_every_case(self):
+        results = run_suite(arm_counts=(5,), horizons=(20,), worker_counts=(1, 2), steps=50, number_of_runs=4,
+                            number_of_trials=4, repeat=1)
+        save(results, os.path.join(self.directory, 'results.json'))
+        results = load(os.path.join(self.directory, 'results.json'))['results']
+        self.assertEqual(sorted(set(result['benchmark'] for result in results)),
+                         ['experiment_1', 'experiment_2', 'learner/bandit', 'learner/sample_average', 'learner/ucb',
+                          'problem/action', 'problem/random_walk'])
+        self.assertEqual(sorted(result['workers'] for result in results if result['benchmark'] == 'experiment_2'),
+                         [1, 2])
+        self.assertTrue(all(result['rate'] > 0 for result in results))
+
+    def test_flags_regressions(self):
+        regressions = compare(suite(100., 100., 100.), suite(95., 80., 150.), tolerance=0.1)
+        self.assertEqual([(result['arms'], round(change, 2)) for result, _, change in regressions], [(100, -0.2)])
+        regressions = compare(suite(100.), suite(50., 50.))      # only the baseline's benchmarks are compared
+        self.assertEqual([result['arms'] for result, _, _ in regressions], [10])
+
+    def test_compare_command(self):
+        baseline, current = os.path.join(self.directory, 'baseline.json'), os.path.join(self.directory, 'current.json')
+        save(suite(100., 100.), baseline)
+        save(suite(99., 100.), current)
+        self.assertEqual(main(['compare', baseline, current]), 0)
+        save(suite(50., 100.), current)
+        self.assertEqual(main(['compare', baseline, current, '--tolerance', '0.2']), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
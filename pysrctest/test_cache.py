@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from pysrc.cache import ResultCache, configuration_key
+from pysrc.learning import BatchedUCB
+from pysrc.scheduler import SweepProblem, SweepScheduler
+import numpy as np
+from numpy.testing import assert_allclose
+
+__author__ = 'kongaloosh'
+
+
+class TestConfigurationKey(unittest.TestCase):
+
+    def test_stable_and_order_free(self):
+        first = {'learner': BatchedUCB, 'means': np.array([0., 1.]), 'walk': True}
+        second = {'walk': True, 'means': [0., 1.], 'learner': BatchedUCB}
+        self.assertEqual(configuration_key(first), configuration_key(second))
+
+    def test_any_change_moves_the_key(self):
+        base = {'timesteps': 200000, 'burn_in': 100000, 'means': [0.1, 0.2]}
+        for changed in [{'timesteps': 200001}, {'burn_in': 99999}, {'means': [0.1, 0.2000001]}]:
+            configuration = dict(base)
+            configuration.update(changed)
+            self.assertNotEqual(configuration_key(base), configuration_key(configuration))
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_memoize(self):
+        cache = ResultCache(self.directory)
+        calls = []
+        compute = lambda: calls.append(1) or 'result'
+        self.assertEqual(cache.memoize({'a': 1}, compute), 'result')
+        self.assertEqual(cache.memoize({'a': 1}, compute), 'result')
+        self.assertEqual(len(calls), 1)
+        self.assertIsNone(cache.get({'a': 2}))
+
+    def test_evicts_least_recently_used(self):
+        cache = ResultCache(self.directory, max_bytes=2500)
+        cache.put({'a': 1}, b'x' * 1000)
+        os.utime(cache.path(configuration_key({'a': 1})), (time.time() - 10, time.time() - 10))
+        cache.put({'a': 2}, b'x' * 1000)
+        cache.put({'a': 3}, b'x' * 1000)
+        self.assertIsNone(cache.get({'a': 1}))
+        self.assertIsNotNone(cache.get({'a': 3}))
+
+    def test_sweep_reuses_unchanged_cells(self):
+        cache = ResultCache(self.directory)
+        problem = SweepProblem([1/8., 1/2.], initial_means=[0., 1., 0.5], timesteps=30, burn_in=10, number_of_arms=3)
+        first = SweepScheduler(problem, number_of_trials=4, batch_size=2, processes=1, cache=cache).run()
+
+        changed = SweepProblem([1/8., 1.], initial_means=[0., 1., 0.5], timesteps=30, burn_in=10, number_of_arms=3)
+        scheduler = SweepScheduler(changed, number_of_trials=4, batch_size=2, processes=1, cache=cache)
+        self.assertEqual(scheduler.units, [(1, 0, 0, 2), (1, 1, 2, 2)])  # only the changed parameter is left to run
+        second = scheduler.run()
+        assert_allclose(second['bandit'].mean[0], first['bandit'].mean[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from pysrc.cli import load_results, main
+from pysrc.runner import build_grid
+from pysrc.scheduler import SweepProblem, SweepScheduler
+from pysrc.spec import initial_means, load_spec
+from pysrc.streams import trial_streams
+from numpy.testing import assert_allclose
+
+__author__ = 'kongaloosh'
+
+
+class TestCommandLine(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_spec(self, **settings):
+        path = os.path.join(self.directory, settings['name'] + '.json')
+        with open(path, 'w') as f:
+            json.dump(dict(settings, output=os.path.join(self.directory, settings['name'])), f)
+        return path
+
+    def test_sweep_then_plot(self):
+        path = self.write_spec(name='sweep', problem='random_walk', parameters=[0.125, 0.5], timesteps=40,
+                               burn_in=20, trials=6, batch_size=3, arms=3, seed=4, processes=1,
+                               learners=['bandit', 'ucb'])
+        self.assertEqual(main(['run', path]), 0)
+        statistics = load_results(load_spec(path))
+        problem = SweepProblem([0.125, 0.5], initial_means=initial_means(load_spec(path)),
+                               timesteps=40, walk=True, burn_in=20, number_of_arms=3, seed=4,
+                               learners=['bandit', 'ucb'])
+        local = SweepScheduler(problem, number_of_trials=6, batch_size=3, processes=1).run()
+        self.assertEqual(sorted(statistics), ['bandit', 'optimal', 'ucb'])
+        for name in statistics:
+            assert_allclose(statistics[name].mean, local[name].mean)
+        self.assertTrue(os.path.exists(os.path.join(self.directory, 'sweep', 'status.json')))
+        self.assertEqual(main(['plot', path]), 0)
+        self.assertTrue(os.path.exists(os.path.join(self.directory, 'sweep', 'sweep.png')))
+
+    def test_curves_then_plot(self):
+        path = self.write_spec(name='curves', kind='curves', parameters=[0.1], step_size=0.1, timesteps=30,
+                               trials=5, seed=2, learners=['sample_average', 'bandit'])
+        self.assertEqual(main(['run', path]), 0)
+        curves = load_results(load_spec(path))
+        experiment = build_grid([0.1], 5, initial_means=initial_means(load_spec(path)),
+                                step_size=0.1, learners=['sample_average', 'bandit'], **trial_streams(2, range(5)))
+        experiment.run_experiment(30, record_curves=True)
+        self.assertEqual(sorted(curves['rewards']), ['bandit', 'sample_average'])
+        assert_allclose(curves['rewards']['bandit'].mean, experiment.rewards['bandit'].mean)
+        self.assertEqual(main(['plot', path]), 0)
+        self.assertTrue(os.path.exists(os.path.join(self.directory, 'curves', 'curves.pdf')))
+
+    def test_workers_do_not_import_matplotlib(self):
+        imported = subprocess.check_output([sys.executable, '-c', 'import sys, pysrc.cli, pysrc.cluster; '
+                                            'print("matplotlib" in sys.modules)'])
+        self.assertEqual(imported.strip(), b'False')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import multiprocessing
+import os
+import socket
+import unittest
+from pysrc.cluster import AUTHKEY_VARIABLE, Coordinator, WorkerManager, run_worker
+from pysrc.scheduler import SweepProblem, SweepScheduler
+from pysrc.telemetry import Telemetry
+from numpy.testing import assert_allclose
+
+__author__ = 'kongaloosh'
+
+
+def small_problem():
+    return SweepProblem([1/8., 1/2.], initial_means=[0., 1., 0.5], timesteps=40, walk=True, burn_in=20,
+                        number_of_arms=3, seed=4)
+
+
+def start_workers(coordinator, number_of_workers):
+    # spawned, not forked: the coordinator's server threads are running in this process
+    context = multiprocessing.get_context('spawn')
+    workers = [context.Process(target=run_worker, args=(coordinator.address, coordinator.authkey, 0.05))
+               for _ in range(number_of_workers)]
+    for worker in workers:
+        worker.start()
+    return workers
+
+
+class TestCoordinator(unittest.TestCase):
+
+    def test_matches_a_local_sweep(self):
+        coordinator = Coordinator(SweepScheduler(small_problem(), number_of_trials=12, batch_size=3),
+                                  address=('127.0.0.1', 0))
+        coordinator.start()
+        self.addCleanup(coordinator.stop)
+        workers = start_workers(coordinator, 3)
+        statistics = coordinator.wait()
+        for worker in workers:
+            worker.join()
+        local = SweepScheduler(small_problem(), number_of_trials=12, batch_size=3, processes=1).run()
+        for name in local:
+            assert_allclose(statistics[name].mean, local[name].mean)
+            assert_allclose(statistics[name].count, [12, 12])
+
+    def test_requeues_the_units_of_a_lost_worker(self):
+        coordinator = Coordinator(SweepScheduler(small_problem(), number_of_trials=6, batch_size=3),
+                                  address=('127.0.0.1', 0), lease_timeout=0.5, poll_interval=0.05)
+        coordinator.start()
+        self.addCleanup(coordinator.stop)
+        manager = WorkerManager(address=coordinator.address, authkey=coordinator.authkey)
+        manager.connect()
+        lost = manager.work_queue().lease('lost-worker')            # taken, and never run or renewed
+        workers = start_workers(coordinator, 2)
+        statistics = coordinator.wait()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(coordinator.work.lost, 1)
+        self.assertIn(lost, coordinator.work.finished)
+        assert_allclose(statistics['ucb'].count, [6, 6])
+
+    def test_sequential_sweep(self):
+        scheduler = SweepScheduler(small_problem(), number_of_trials=30, batch_size=3, target_half_width=1e-9,
+                                   minimum_trials=6)
+        coordinator = Coordinator(scheduler, address=('127.0.0.1', 0))
+        coordinator.start()
+        self.addCleanup(coordinator.stop)
+        workers = start_workers(coordinator, 2)
+        statistics = coordinator.wait()
+        for worker in workers:
+            worker.join()
+        assert_allclose(statistics['optimal'].count, [30, 30])      # an unreachable target runs to the cap
+
+    def test_workers_report_progress(self):
+        telemetry = Telemetry()
+        scheduler = SweepScheduler(small_problem(), number_of_trials=6, batch_size=3, telemetry=telemetry)
+        coordinator = Coordinator(scheduler, address=('127.0.0.1', 0))
+        telemetry.start(scheduler)                                  # as Coordinator.run does
+        coordinator.start()
+        self.addCleanup(coordinator.stop)
+        workers = start_workers(coordinator, 2)
+        coordinator.wait()
+        telemetry.stop()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(telemetry.steps_run, 2 * 6 * 40)
+        self.assertTrue(1 <= len(telemetry.workers) <= 2)           # reported through the work queue
+
+    def test_stop_closes_the_server(self):
+        coordinator = Coordinator(SweepScheduler(small_problem(), number_of_trials=3, batch_size=3),
+                                  address=('127.0.0.1', 0))
+        coordinator.start()
+        serving = coordinator.serving
+        coordinator.stop()
+        self.assertFalse(serving.is_alive())
+        with self.assertRaises(ConnectionRefusedError):
+            socket.create_connection(coordinator.address, timeout=5.)
+        coordinator.stop()                                          # stopping twice is harmless
+
+    def test_authkey(self):
+        previous = os.environ.pop(AUTHKEY_VARIABLE, None)
+        if previous is not None:
+            self.addCleanup(os.environ.__setitem__, AUTHKEY_VARIABLE, previous)
+        first = Coordinator(SweepScheduler(small_problem(), number_of_trials=3, batch_size=3))
+        second = Coordinator(SweepScheduler(small_problem(), number_of_trials=3, batch_size=3))
+        self.assertEqual(first.address, ('127.0.0.1', 50000))       # local unless asked otherwise
+        self.assertNotEqual(first.authkey, second.authkey)          # no key is built in
+        os.environ[AUTHKEY_VARIABLE] = 'shared secret'
+        try:
+            self.assertEqual(Coordinator(SweepScheduler(small_problem(), number_of_trials=3)).authkey,
+                             b'shared secret')
+        finally:
+            del os.environ[AUTHKEY_VARIABLE]
+        self.assertRaises(ValueError, run_worker, ('127.0.0.1', 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
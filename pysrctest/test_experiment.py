@@ -1,5 +1,6 @@
 import unittest
-from pysrc.experiment import BanditExperiment
+from pysrc.experiment import BanditExperiment, BatchedBanditExperiment, WalkTrajectory
+import numpy as np
 from numpy.testing import assert_allclose
 
 __author__ = 'kongaloosh'
@@ -12,5 +13,60 @@ class TestBandit(unittest.TestCase):
         assert_allclose(bandit.bandit_means, [0, 0])
 
 
+class TestBatchedBandit(unittest.TestCase):
+
+    def test_init(self):
+        bandit = BatchedBanditExperiment(3, 2)
+        self.assertEqual(bandit.bandit_means.shape, (3, 2))
+
+    def test_action_uses_each_runs_arm(self):
+        bandit = BatchedBanditExperiment(2, 2)
+        bandit.bandit_means[:] = [[100., -100.], [-100., 100.]]
+        rewards = bandit.action(np.array([0, 1]))
+        self.assertTrue(np.all(rewards > 90))
+
+    def test_optimal(self):
+        bandit = BatchedBanditExperiment(2, 3)
+        bandit.bandit_means[:] = [[0., 2., 1.], [3., 2., 1.]]
+        assert_allclose(bandit.optimal_action(), [1, 0])
+        assert_allclose(bandit.optimal_mean(), [2, 3])
+
+    def test_random_walk_moves_every_run(self):
+        bandit = BatchedBanditExperiment(2, 3)
+        bandit.random_walk()
+        self.assertTrue(np.all(bandit.bandit_means != 0))
+
+
+class TestWalkTrajectory(unittest.TestCase):
+
+    def test_matches_per_step_walk(self):
+        stepped = BanditExperiment(3, random_state=np.random.RandomState(0))
+        walked = BanditExperiment(3, random_state=np.random.RandomState(0))
+        WalkTrajectory(walked, block_size=4)
+        for _ in range(10):
+            stepped.random_walk()
+            walked.random_walk()
+            assert_allclose(walked.bandit_means, stepped.bandit_means)
+            self.assertEqual(walked.optimal_action(), stepped.optimal_action())
+
+    def test_blocks_continue_from_last_means(self):
+        bandit = BatchedBanditExperiment(2, 3)
+        bandit.bandit_means[:] = [[0., 5., 0.], [9., 0., 0.]]
+        WalkTrajectory(bandit, block_size=3)
+        self.assertEqual(list(bandit.optimal_action()), [1, 0])
+        for _ in range(7):
+            previous = np.copy(bandit.bandit_means)
+            bandit.random_walk()
+            self.assertTrue(np.all(np.abs(bandit.bandit_means - previous) < 0.1))
+        self.assertEqual(bandit.trajectory.means.shape, (3, 2, 3))
+        assert_allclose(bandit.optimal_mean(), np.max(bandit.bandit_means, axis=-1))
+
+    def test_default_block_bounds_memory(self):
+        bandit = BatchedBanditExperiment(2000, 10)
+        WalkTrajectory(bandit)
+        bandit.random_walk()
+        self.assertLessEqual(bandit.trajectory.means.size, 2**20)
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -1,5 +1,7 @@
 import unittest
-from pysrc.learning import BanditSampleAverage, SimpleBandit
+from pysrc.learning import BanditSampleAverage, SimpleBandit, UCB, \
+    BatchedBanditSampleAverage, BatchedSimpleBandit, BatchedUCB
+import numpy as np
 from numpy.testing import assert_allclose
 
 __author__ = 'kongaloosh'
@@ -52,5 +54,66 @@ class Test_Simple_Bandit(unittest.TestCase):
         test_average.update_average(0, 0)
         self.assertEqual(test_average.bandit_estimates[0], 0.09)
 
+
+class TestBatchedSampleAverage(unittest.TestCase):
+
+    def test_init(self):
+        test_average = BatchedBanditSampleAverage(3, 2, 0)
+        self.assertEqual(test_average.bandit_estimates.shape, (3, 2))
+        self.assertEqual(test_average.bandit_visits.shape, (3, 2))
+
+    def test_get_action(self):
+        test_average = BatchedBanditSampleAverage(2, 2, 0)
+        test_average.update_average(np.array([0, 1]), np.array([1., 1.]))
+        assert_allclose(test_average.get_action(), [0, 1])
+
+    def test_update_matches_scalar(self):
+        test_average = BatchedBanditSampleAverage(2, 2, 0)
+        test_average.update_average(np.array([0, 0]), np.array([1., 2.]))
+        test_average.update_average(np.array([0, 1]), np.array([0., 1.]))
+        assert_allclose(test_average.bandit_visits, [[2, 0], [1, 1]])
+        assert_allclose(test_average.bandit_estimates, [[0.5, 0], [2, 1]])
+
+    def test_explores_at_rate_epsilon(self):
+        np.random.seed(0)
+        test_average = BatchedBanditSampleAverage(20000, 2, 0.5)
+        test_average.update_average(np.zeros(20000, dtype=int), np.ones(20000))
+        self.assertAlmostEqual(np.mean(test_average.get_action() == 1), 0.25, delta=0.02)
+
+    def test_parameter_axis(self):
+        test_average = BatchedBanditSampleAverage((2, 3), 4, np.array([[0.], [1.]]))
+        self.assertEqual(test_average.bandit_estimates.shape, (2, 3, 4))
+        test_average.update_average(np.ones((2, 3), dtype=int), np.ones((2, 3)))
+        assert_allclose(test_average.bandit_visits[..., 1], np.ones((2, 3)))
+        assert_allclose(test_average.get_action()[0], [1, 1, 1])
+
+
+class TestBatchedSimpleBandit(unittest.TestCase):
+
+    def test_update_matches_scalar(self):
+        scalar = SimpleBandit(2, 0, 0.1)
+        test_average = BatchedSimpleBandit(1, 2, 0, 0.1)
+        for arm, observation in [(0, 1), (0, 0), (1, 3)]:
+            scalar.update_average(arm, observation)
+            test_average.update_average(np.array([arm]), np.array([observation]))
+        assert_allclose(test_average.bandit_estimates[0], scalar.bandit_estimates)
+        self.assertEqual(test_average.get_action()[0], scalar.get_action())
+
+
+class TestBatchedUCB(unittest.TestCase):
+
+    def test_actions_match_scalar(self):
+        np.random.seed(1)
+        scalar = UCB(0.1, 4, 2)
+        test_ucb = BatchedUCB(0.1, 1, 4, 2)
+        for t in range(1, 50):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                arm = scalar.get_action(t)
+            self.assertEqual(test_ucb.get_action(t)[0], arm)
+            observation = np.random.normal()
+            scalar.update_average(arm, observation)
+            test_ucb.update_average(np.array([arm]), np.array([observation]))
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
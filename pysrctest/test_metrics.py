@@ -0,0 +1,53 @@
+import unittest
+from pysrc.metrics import RunningStatistics
+import numpy as np
+from numpy.testing import assert_allclose
+
+__author__ = 'kongaloosh'
+
+
+class TestRunningStatistics(unittest.TestCase):
+
+    def test_matches_numpy(self):
+        samples = np.random.RandomState(0).normal(loc=3, size=(50, 4))
+        statistics = RunningStatistics(4)
+        for batch in np.split(samples, [1, 7, 30]):
+            statistics.add(batch)
+        assert_allclose(statistics.count, [50] * 4)
+        assert_allclose(statistics.mean, np.mean(samples, axis=0))
+        assert_allclose(statistics.variance(), np.var(samples, axis=0, ddof=1))
+
+    def test_add_at_index_along_axis(self):
+        statistics = RunningStatistics((3, 2))
+        statistics.add(np.array([[1., 2., 3.], [4., 5., 6.]]), index=1, axis=-1)
+        assert_allclose(statistics.mean, [[0, 0], [2, 5], [0, 0]])
+        assert_allclose(statistics.count[1], [3, 3])
+
+    def test_merge(self):
+        samples = np.random.RandomState(1).normal(size=(40, 3))
+        left, right = RunningStatistics(3), RunningStatistics(3)
+        left.add(samples[:10])
+        right.add(samples[10:])
+        left.merge(right)
+        assert_allclose(left.mean, np.mean(samples, axis=0))
+        assert_allclose(left.variance(), np.var(samples, axis=0, ddof=1))
+
+    def test_merge_into_empty(self):
+        statistics = RunningStatistics(2)
+        other = RunningStatistics(2)
+        other.add([[1., 2.], [3., 4.]])
+        statistics.merge(other)
+        assert_allclose(statistics.mean, [2, 3])
+
+    def test_confidence_interval(self):
+        statistics = RunningStatistics()
+        statistics.add(np.random.RandomState(2).normal(size=10000))
+        low, high = statistics.confidence_interval()
+        self.assertLess(low, 0)
+        self.assertGreater(high, 0)
+        self.assertAlmostEqual(statistics.half_width(), 1.96 / 100, delta=0.002)
+        self.assertTrue(np.isnan(RunningStatistics().variance()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+from pysrc.experiment import BanditExperiment
+from pysrc.learning import SimpleBandit
+from pysrc.noise import NoiseBuffer
+import numpy as np
+from numpy.testing import assert_allclose
+
+__author__ = 'kongaloosh'
+
+
+class TestNoiseBuffer(unittest.TestCase):
+
+    def test_draws_in_order_across_refills(self):
+        expected = np.random.RandomState(0).normal(size=10)
+        noise = NoiseBuffer(block_size=4, random_state=np.random.RandomState(0))
+        draws = [noise.normal() for _ in range(3)] + list(noise.normal(size=5)) + [noise.normal() for _ in range(2)]
+        assert_allclose(draws, expected)
+
+    def test_request_larger_than_block(self):
+        noise = NoiseBuffer(block_size=2)
+        self.assertEqual(noise.normal(size=(3, 4)).shape, (3, 4))
+
+    def test_loc_and_scale(self):
+        noise = NoiseBuffer(block_size=1000, random_state=np.random.RandomState(1))
+        draws = noise.normal(loc=5, scale=0.01, size=1000)
+        self.assertAlmostEqual(np.mean(draws), 5, delta=0.01)
+
+    def test_randint_range(self):
+        noise = NoiseBuffer(block_size=100)
+        arms = noise.randint(3, size=1000)
+        self.assertTrue(set(arms) == {0, 1, 2})
+        self.assertTrue(0 <= noise.randint(3) < 3)
+
+    def test_array_reads_do_not_list_the_block(self):
+        noise = NoiseBuffer(block_size=8, random_state=np.random.RandomState(2))
+        noise.normal(size=(2, 3))
+        noise.random(size=5)
+        self.assertIsNone(noise.normal_list)
+        self.assertIsNone(noise.uniform_list)
+        self.assertEqual(noise.normal(), noise.normals[6])             # the first scalar read lists the block
+        self.assertEqual(len(noise.normal_list), 8)
+
+    def test_drop_in_for_bandit_and_learner(self):
+        noise = NoiseBuffer(block_size=16)
+        problem = BanditExperiment(3, random_state=noise)
+        learner = SimpleBandit(3, 0.5, 0.1, random_state=noise)
+        for _ in range(50):
+            arm = learner.get_action()
+            learner.update_average(arm, problem.action(arm))
+            problem.random_walk()
+        self.assertTrue(np.all(problem.bandit_means != 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
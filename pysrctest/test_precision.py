@@ -0,0 +1,58 @@
+import pickle as pkl
+import unittest
+from pysrc import snapshot
+from pysrc.experiment import BanditExperiment
+from pysrc.learning import UCB, BanditSampleAverage
+from pysrc.precision import PRECISIONS, policy
+from pysrc.runner import run_grid
+from pysrc.scheduler import SweepProblem
+from pysrc.streams import trial_streams
+import numpy as np
+from numpy.testing import assert_allclose
+
+__author__ = 'kongaloosh'
+
+
+class TestPrecision(unittest.TestCase):
+
+    def test_policy(self):
+        self.assertIs(policy(), PRECISIONS['double'])
+        self.assertIs(policy('single'), PRECISIONS['single'])
+        self.assertIs(pkl.loads(pkl.dumps(policy('single'))), PRECISIONS['single'])
+        self.assertRaises(ValueError, policy, 'half')
+
+    def test_single_keeps_its_dtypes(self):
+        experiment = run_grid([0.1, 1.], 5, 200, walk=True, number_of_arms=4, precision='single',
+                              **trial_streams(0, range(5)))
+        self.assertEqual(experiment.problem.bandit_means.dtype, np.float32)
+        for learner in experiment.learners.values():
+            self.assertEqual(learner.bandit_estimates.dtype, np.float32)
+        self.assertEqual(experiment.learners['ucb'].bandit_visits.dtype, np.int32)
+        self.assertEqual(experiment.learners['ucb'].bandit_visits.sum(), 2 * 5 * 200)
+
+    def test_single_matches_double(self):
+        double = run_grid([0.1, 1.], 20, 2000, walk=True, burn_in=1000, **trial_streams(1, range(20)))
+        single = run_grid([0.1, 1.], 20, 2000, walk=True, burn_in=1000, precision='single',
+                          **trial_streams(1, range(20)))
+        for name in 'sample_average', 'bandit', 'ucb':
+            assert_allclose(single.reward_count[name] / 1000, double.reward_count[name] / 1000, atol=1e-3)
+
+    def test_double_keeps_earlier_cache_keys(self):
+        self.assertNotIn('precision', SweepProblem([0.1]).unit_configuration((0, 0, 0, 10)))
+        self.assertEqual(SweepProblem([0.1], precision='single').unit_configuration((0, 0, 0, 10))['precision'],
+                         'single')
+
+    def test_scalar_classes_have_slots(self):
+        learner = BanditSampleAverage(3, 0.1, random_state=np.random.RandomState(0), precision='single')
+        self.assertFalse(hasattr(learner, '__dict__'))
+        learner.update_average(1, 2.)
+        copy = snapshot.loads(snapshot.dumps(learner))
+        assert_allclose(copy.bandit_estimates, [0., 2., 0.])
+        self.assertEqual(copy.bandit_visits.dtype, np.int32)
+        self.assertEqual(copy.get_action(), learner.get_action())
+        self.assertFalse(hasattr(UCB(0.1, 3, 2.), '__dict__'))
+        self.assertFalse(hasattr(BanditExperiment(3), '__dict__'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+from pysrc.profiling import PHASES, PhaseProfile
+from pysrc.runner import run_grid
+from pysrc.scheduler import SweepProblem, SweepScheduler
+from pysrc.streams import trial_streams
+from numpy.testing import assert_array_equal
+
+__author__ = 'kongaloosh'
+
+
+class TestPhaseProfile(unittest.TestCase):
+
+    def test_times_every_phase_without_changing_the_run(self):
+        profile = PhaseProfile()
+        plain = run_grid([0.1, 1.], 4, 50, walk=True, number_of_arms=5, **trial_streams(0, range(4)))
+        profiled = run_grid([0.1, 1.], 4, 50, walk=True, number_of_arms=5, profile=profile,
+                            **trial_streams(0, range(4)))
+        for name in 'sample_average', 'bandit', 'ucb':
+            assert_array_equal(profiled.reward_count[name], plain.reward_count[name])
+            for phase in 'selection', 'reward', 'update', 'bookkeeping':
+                self.assertEqual(profile.calls[(name, phase)], 50)
+        self.assertEqual(profile.calls[('problem', 'walk')], 50)
+        self.assertEqual(set(profile.by(1)), set(PHASES))
+        self.assertAlmostEqual(sum(profile.by(0).values()), profile.total())
+        self.assertIn('ucb', profile.report())
+
+    def test_merge(self):
+        first, second = PhaseProfile(), PhaseProfile()
+        first.seconds, first.calls = {('ucb', 'update'): 1.}, {('ucb', 'update'): 2}
+        second.seconds = {('ucb', 'update'): 0.5, ('bandit', 'walk'): 0.25}
+        second.calls = {('ucb', 'update'): 1, ('bandit', 'walk'): 1}
+        first.merge(second)
+        self.assertEqual(first.seconds, {('ucb', 'update'): 1.5, ('bandit', 'walk'): 0.25})
+        self.assertEqual(first.calls, {('ucb', 'update'): 3, ('bandit', 'walk'): 1})
+
+    def test_sweep_merges_the_workers(self):
+        problem = SweepProblem([1/8., 1/2.], initial_means=[0., 1., 0.5], timesteps=30, burn_in=10,
+                               number_of_arms=3, seed=2, profile=True)
+        scheduler = SweepScheduler(problem, number_of_trials=8, batch_size=4, processes=2)
+        scheduler.run()
+        self.assertTrue(1 <= len(scheduler.profiles) <= 2)
+        self.assertEqual(scheduler.profile().calls[('ucb', 'selection')], 4 * 30)   # four units of 30 steps
+        problem.profile = False
+        unprofiled = SweepScheduler(problem, number_of_trials=4, batch_size=4, processes=1)
+        unprofiled.run()
+        self.assertIsNone(unprofiled.profile())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+from collections import OrderedDict
+from pysrc.experiment import BanditExperiment, BatchedBanditExperiment
+from pysrc.learning import SimpleBandit, BatchedSimpleBandit, BatchedUCB
+from pysrc.runner import BatchedRun, run_grid, variance_reduction
+import numpy as np
+from numpy.testing import assert_allclose
+
+__author__ = 'kongaloosh'
+
+
+def make_run(number_of_runs, burn_in=0):
+    problem = BatchedBanditExperiment(number_of_runs, 3)
+    problem.bandit_means[:] = [0., 1., 0.5]
+    learners = OrderedDict([
+        ('bandit', BatchedSimpleBandit(number_of_runs, 3, epsilon=0.1, step_size=0.1)),
+        ('ucb', BatchedUCB(step_size=0.1, number_of_runs=number_of_runs, number_of_arms=3, c=1)),
+    ])
+    return BatchedRun(learners, problem, burn_in=burn_in)
+
+
+class TestBatchedRun(unittest.TestCase):
+
+    def test_curves(self):
+        experiment = make_run(5)
+        experiment.run_experiment(20, record_curves=True)
+        self.assertEqual(len(experiment.rewards['bandit'].mean), 20)
+        assert_allclose(experiment.rewards['bandit'].count, 5)
+        self.assertTrue(np.all(experiment.optimal['ucb'].mean <= 1))
+
+    def test_reward_statistics(self):
+        experiment = make_run(6, burn_in=5)
+        experiment.run_experiment(10)
+        statistics = experiment.reward_statistics(10)
+        assert_allclose(statistics['bandit'].mean, np.mean(experiment.reward_count['bandit']) / 5)
+        assert_allclose(statistics['optimal'].count, 6)
+
+    def test_burn_in(self):
+        experiment = make_run(5, burn_in=10)
+        experiment.run_experiment(10, walk=True)
+        self.assertTrue(np.all(experiment.reward_count['bandit'] == 0))
+        self.assertTrue(np.all(experiment.optimal_reward_count == 0))
+
+    def test_matches_per_run_classes_in_distribution(self):
+        np.random.seed(3)
+        number_of_runs, timesteps = 400, 50
+        scalar_rewards = []
+        for _ in range(number_of_runs):
+            problem = BanditExperiment(3)
+            problem.bandit_means[:] = [0., 1., 0.5]
+            learner = SimpleBandit(3, epsilon=0.1, step_size=0.1)
+            total = 0.
+            for _ in range(timesteps):
+                arm = learner.get_action()
+                reward = problem.action(arm)
+                learner.update_average(arm, reward)
+                total += reward
+            scalar_rewards.append(total / timesteps)
+
+        experiment = make_run(number_of_runs)
+        experiment.run_experiment(timesteps)
+        batched_rewards = experiment.reward_count['bandit'] / timesteps
+        standard_error = np.sqrt(np.var(scalar_rewards) / number_of_runs + np.var(batched_rewards) / number_of_runs)
+        self.assertLess(abs(np.mean(scalar_rewards) - np.mean(batched_rewards)), 4 * standard_error)
+
+
+class TestRunGrid(unittest.TestCase):
+
+    def test_shapes(self):
+        experiment = run_grid([0.1, 0.5, 1.], 4, 10, initial_means=np.zeros(3), number_of_arms=3)
+        self.assertEqual(experiment.reward_count['ucb'].shape, (3, 4))
+        self.assertEqual(experiment.optimal_reward_count.shape, (4,))
+
+    def test_per_parameter_step_size(self):
+        experiment = run_grid([0.1, 0.5], 2, 5, step_size=[0.1, 0.2], number_of_arms=3)
+        assert_allclose(experiment.learners['bandit'].step_size[:, 0], [0.1, 0.2])
+
+    def test_settings_share_reward_noise(self):
+        experiment = run_grid([0., 0.], 3, 5, initial_means=np.zeros(3), number_of_arms=3)
+        assert_allclose(experiment.reward_count['bandit'][0], experiment.reward_count['bandit'][1])
+
+    def test_greedy_grid_finds_best_arm(self):
+        np.random.seed(0)
+        experiment = run_grid([1/64., 1/8.], 50, 300, initial_means=[0., 2., 0.], burn_in=200, number_of_arms=3)
+        self.assertTrue(np.all(np.mean(experiment.reward_count['sample_average'], axis=-1) / 100 > 1.5))
+
+
+class TestVarianceReduction(unittest.TestCase):
+
+    def run_mode(self, **mode):
+        np.random.seed(4)
+        experiment = run_grid([0.1, 1.], 200, 60, initial_means=[0., 1., 0.5], burn_in=20, number_of_arms=3, **mode)
+        return experiment, experiment.reward_statistics(60)
+
+    def test_expected_rewards_score_true_means(self):
+        experiment, statistics = self.run_mode(expected_rewards=True, common_noise=True)
+        self.assertIn('bandit_sampled', statistics)
+        self.assertTrue(np.all(experiment.expected_reward_count['bandit'] <= 40 * 1.))
+        assert_allclose(statistics['optimal'].mean, 1.)              # the exact best mean of a stationary bandit
+        assert_allclose(statistics['optimal'].variance(), 0., atol=1e-20)
+
+    def test_common_noise_is_shared_by_learners_and_baseline(self):
+        experiment, _ = self.run_mode(expected_rewards=True, common_noise=True)
+        noise = experiment.reward_count['bandit'] - experiment.expected_reward_count['bandit']
+        assert_allclose(noise[0], experiment.optimal_reward_count - experiment.expected_optimal_count)
+
+    def test_reduces_variance(self):
+        _, statistics = self.run_mode(expected_rewards=True, common_noise=True)
+        reduction = variance_reduction(statistics)
+        self.assertTrue(np.all(reduction['sample_average'] > 1))
+        self.assertTrue(np.isinf(reduction['optimal']))
+
+
+if __name__ == "__main__":
+    unittest.main()
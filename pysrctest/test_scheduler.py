@@ -0,0 +1,90 @@
+import unittest
+from pysrc.scheduler import SweepProblem, SweepScheduler, work_units
+import numpy as np
+from numpy.testing import assert_allclose
+
+__author__ = 'kongaloosh'
+
+
+def small_problem():
+    return SweepProblem([1/8., 1/2.], initial_means=[0., 1., 0.5], timesteps=40, walk=True, burn_in=20,
+                        number_of_arms=3)
+
+
+class TestWorkUnits(unittest.TestCase):
+
+    def test_covers_every_trial(self):
+        units = work_units(3, 10, 4)
+        self.assertEqual(len(units), 9)
+        for parameter_index in range(3):
+            self.assertEqual(sum(runs for p, _, _, runs in units if p == parameter_index), 10)
+
+
+class TestSweepScheduler(unittest.TestCase):
+
+    def test_serial(self):
+        statistics = SweepScheduler(small_problem(), number_of_trials=12, batch_size=5, processes=1).run()
+        assert_allclose(statistics['ucb'].count, [12, 12])
+        assert_allclose(statistics['optimal'].count, [12, 12])
+
+    def test_pool(self):
+        statistics = SweepScheduler(small_problem(), number_of_trials=12, batch_size=4, processes=2).run()
+        assert_allclose(statistics['bandit'].count, [12, 12])
+        self.assertTrue(np.all(statistics['bandit'].variance() > 0))   # workers did not repeat each other's draws
+
+    def test_expected_rewards_mode(self):
+        problem = SweepProblem([1/8.], initial_means=[0., 1., 0.5], timesteps=40, burn_in=20, number_of_arms=3,
+                               expected_rewards=True, common_noise=True)
+        statistics = SweepScheduler(problem, number_of_trials=6, batch_size=3, processes=1).run()
+        assert_allclose(statistics['ucb_sampled'].count, [6])
+        assert_allclose(statistics['optimal'].mean, [1.])
+
+    def test_shared_draws(self):
+        def sweep(shared_draws):
+            problem = SweepProblem([1/8., 1/2.], initial_means=[0., 1., 0.5], timesteps=40, walk=True, burn_in=20,
+                                   number_of_arms=3, seed=5, shared_draws=shared_draws)
+            return SweepScheduler(problem, number_of_trials=6, batch_size=3, processes=1).run()
+        optimal = sweep(True)['optimal'].mean                     # the same walk and noise for both parameters
+        self.assertEqual(optimal[0], optimal[1])
+        self.assertNotEqual(sweep(False)['optimal'].mean[0], sweep(False)['optimal'].mean[1])
+        self.assertRaises(ValueError, SweepProblem, [1/8.], shared_draws=True)
+
+
+class TestSequentialSweep(unittest.TestCase):
+
+    def noisy_problem(self):
+        # greedy runs lock onto different arms, so epsilon = 0 needs many more trials than epsilon = 1
+        return SweepProblem([0., 1.], initial_means=[0., 1., 0.5], timesteps=30, burn_in=10, number_of_arms=3,
+                            seed=2, expected_rewards=True)
+
+    def test_stops_converged_cells_and_feeds_noisy_ones(self):
+        scheduler = SweepScheduler(self.noisy_problem(), number_of_trials=400, batch_size=20, processes=1,
+                                   target_half_width=0.06)
+        statistics = scheduler.run()
+        counts = statistics['ucb'].count
+        self.assertTrue(np.all(counts >= 40))
+        self.assertLess(np.sum(counts), 800)
+        summary = scheduler.summary()
+        for parameter_index in range(2):
+            width = max(summary[name][1][parameter_index] for name in ['sample_average', 'bandit', 'ucb', 'optimal'])
+            self.assertTrue(width <= 0.06 or counts[parameter_index] == 400)
+
+    def test_pool_matches_target(self):
+        scheduler = SweepScheduler(self.noisy_problem(), number_of_trials=200, batch_size=20, processes=2,
+                                   target_half_width=0.1)
+        statistics = scheduler.run()
+        counts = statistics['bandit'].count
+        self.assertTrue(np.all(counts >= 40))
+        self.assertTrue(np.all(counts < 200))                       # every cell stopped before the cap
+        for name, (_, half_width, _) in scheduler.summary().items():
+            if not name.endswith('_sampled'):                       # the target is on the scored rewards
+                self.assertTrue(np.all(half_width <= 0.1), name)
+
+    def test_cap_stops_an_unreachable_target(self):
+        scheduler = SweepScheduler(self.noisy_problem(), number_of_trials=60, batch_size=20, processes=1,
+                                   target_half_width=1e-9)
+        assert_allclose(scheduler.run()['bandit'].count, [60, 60])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import shutil
+import tempfile
+import unittest
+from pysrc import snapshot
+from pysrc.experiment import BanditExperiment
+from pysrc.learning import SimpleBandit
+from pysrc.noise import NoiseBuffer
+from pysrc.runner import build_grid
+from pysrc.scheduler import SweepProblem, SweepScheduler
+from pysrc.streams import TrialStreams, trial_random_state, trial_streams
+import numpy as np
+from numpy.testing import assert_allclose, assert_array_equal
+
+__author__ = 'kongaloosh'
+
+
+def steps(problem, learner, number_of_steps):
+    rewards = []
+    for _ in range(number_of_steps):
+        arm = learner.get_action()
+        reward = problem.action(arm)
+        learner.update_average(arm, reward)
+        problem.random_walk()
+        rewards.append(reward)
+    return rewards
+
+
+def small_grid(burn_in=0, checkpoint_interval=None):
+    return build_grid([1/8., 1/2.], 10, initial_means=[0., 1., 0.5], burn_in=burn_in, number_of_arms=3,
+                      checkpoint_interval=checkpoint_interval, **trial_streams(3, range(10)))
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def test_per_run_classes_carry_on_identically(self):
+        problem = BanditExperiment(5, random_state=trial_random_state(4, 0))
+        learner = SimpleBandit(5, epsilon=0.1, step_size=0.1, random_state=trial_random_state(4, 1))
+        steps(problem, learner, 50)
+        problem_copy, learner_copy = snapshot.loads(snapshot.dumps((problem, learner)))
+        self.assertEqual(steps(problem, learner, 50), steps(problem_copy, learner_copy, 50))
+
+    def test_restores_np_random(self):
+        problem = BanditExperiment(5)
+        data = snapshot.dumps(problem)
+        first = [problem.action(0) for _ in range(5)]
+        state = np.random.get_state()
+        copy = snapshot.loads(data)
+        assert_array_equal(np.random.get_state()[1], state[1])       # the global state is left alone
+        self.assertEqual(np.random.get_state()[2], state[2])
+        self.assertEqual([copy.action(0) for _ in range(5)], first)
+
+    def test_streams_snapshot_without_their_blocks(self):
+        streams = TrialStreams(7, range(10), block_size=4096)
+        streams.normal(size=(3, 10))
+        data = snapshot.dumps(streams)
+        self.assertLess(len(data), 20000)                           # a block alone is 10 x 4096 doubles
+        copy = snapshot.loads(data)
+        assert_array_equal(copy.normal(size=(5000, 10)), streams.normal(size=(5000, 10)))
+
+    def test_noise_buffer_carries_on_identically(self):
+        buffer = NoiseBuffer(block_size=1000, random_state=trial_random_state(2))
+        buffer.normal(size=30)
+        buffer.random(size=1500)
+        copy = snapshot.loads(snapshot.dumps(buffer))
+        assert_array_equal(copy.normal(size=2000), buffer.normal(size=2000))
+        self.assertEqual([copy.random() for _ in range(10)], [buffer.random() for _ in range(10)])
+
+
+class TestHorizonExtension(unittest.TestCase):
+
+    def test_extended_run_matches_a_single_run(self):
+        whole = small_grid()
+        whole.run_experiment(300, walk=True)
+        part = small_grid()
+        part.run_experiment(120, walk=True)
+        part = snapshot.loads(snapshot.dumps(part))
+        part.run_experiment(180, walk=True)
+        self.assertEqual(part.timestep, 300)
+        assert_array_equal(part.reward_count['ucb'], whole.reward_count['ucb'])
+        assert_array_equal(part.optimal_reward_count, whole.optimal_reward_count)
+
+    def test_change_burn_in(self):
+        moved = small_grid(checkpoint_interval=50)
+        moved.run_experiment(200)
+        moved.change_burn_in(100)
+        direct = small_grid(burn_in=100)
+        direct.run_experiment(200)
+        assert_allclose(moved.reward_count['bandit'], direct.reward_count['bandit'])
+        with self.assertRaises(ValueError):
+            moved.change_burn_in(75)
+
+    def test_sweep_resumes_from_snapshots(self):
+        directory = tempfile.mkdtemp()
+        try:
+            def problem(timesteps, snapshot_directory=None):
+                return SweepProblem([1/8., 1/2.], initial_means=[0., 1., 0.5], timesteps=timesteps, walk=True,
+                                    burn_in=40, number_of_arms=3, seed=5, snapshot_directory=snapshot_directory,
+                                    checkpoint_interval=20)
+            SweepScheduler(problem(60, directory), number_of_trials=8, batch_size=4, processes=1).run()
+            extended = SweepScheduler(problem(100, directory), number_of_trials=8, batch_size=4, processes=1).run()
+            direct = SweepScheduler(problem(100), number_of_trials=8, batch_size=4, processes=1).run()
+            for name in direct:
+                assert_allclose(extended[name].mean, direct[name].mean)
+            shorter = SweepScheduler(problem(60, directory), number_of_trials=8, batch_size=4, processes=1).run()
+            direct = SweepScheduler(problem(60), number_of_trials=8, batch_size=4, processes=1).run()
+            for name in direct:                                     # back from the snapshots at step 60
+                assert_allclose(shorter[name].mean, direct[name].mean)
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
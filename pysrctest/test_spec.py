@@ -0,0 +1,31 @@
+import unittest
+from pysrc.spec import initial_means, parse_spec
+
+__author__ = 'kongaloosh'
+
+
+def minimal(**settings):
+    return dict({'name': 'small', 'parameters': [0.1], 'timesteps': 10, 'trials': 2}, **settings)
+
+
+class TestSpec(unittest.TestCase):
+
+    def test_defaults_and_grid(self):
+        spec = parse_spec(minimal(parameters={'base': 2, 'from': -2, 'to': 1}))
+        self.assertEqual(spec['parameters'], [0.25, 0.5, 1, 2])
+        self.assertEqual(spec['learners'], ['sample_average', 'bandit', 'ucb'])
+        self.assertEqual(spec['kind'], 'sweep')
+        self.assertTrue(spec['output'].endswith('small'))
+        self.assertIsNone(initial_means(spec))                      # unseeded runs start from zeros
+        self.assertEqual(len(initial_means(parse_spec(minimal(seed=3)))), 10)
+
+    def test_refuses_bad_settings(self):
+        for settings in ({'timestep': 10}, {'kind': 'grid'}, {'problem': 'walk'}, {'learners': ['greedy']},
+                         {'burn_in': 10}, {'parameters': {'base': 2, 'to': 1}}):
+            self.assertRaises(ValueError, parse_spec, minimal(**settings))
+        self.assertRaises(ValueError, parse_spec, {'name': 'small', 'parameters': [0.1]})
+        self.assertRaises(ValueError, initial_means, parse_spec(minimal(initial_means=[0., 1.])))
+
+
+if __name__ == '__main__':
+    unittest.main()
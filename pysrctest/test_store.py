@@ -0,0 +1,86 @@
+import os
+import shutil
+import tempfile
+import unittest
+from pysrc.scheduler import SweepProblem, SweepScheduler
+from pysrc.store import ResultStore
+from numpy.testing import assert_allclose
+
+__author__ = 'kongaloosh'
+
+
+def small_problem(timesteps=30, parameters=(1/8., 1/2.)):
+    return SweepProblem(parameters, initial_means=[0., 1., 0.5], timesteps=timesteps, burn_in=10,
+                        number_of_arms=3)
+
+
+class TestResultStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_commits_every_unit(self):
+        store = ResultStore(self.directory)
+        SweepScheduler(small_problem(), number_of_trials=6, batch_size=3, processes=1, store=store).run()
+        self.assertEqual(store.completed(), {(0, 0), (1, 0), (0, 1), (1, 1)})
+        self.assertFalse([name for name in os.listdir(self.directory) if name.endswith('.tmp')])
+
+    def test_resume_runs_only_missing_units(self):
+        store = ResultStore(self.directory)
+        finished = SweepScheduler(small_problem(), number_of_trials=6, batch_size=3, processes=1, store=store).run()
+        os.remove(os.path.join(self.directory, store.unit_name((1, 1, 3, 3), (30, 10))))
+
+        resumed = SweepScheduler(small_problem(), number_of_trials=6, batch_size=3, processes=1, store=store)
+        self.assertEqual(resumed.units, [(1, 1, 3, 3)])
+        statistics = resumed.run()
+        assert_allclose(statistics['ucb'].count, [6, 6])
+        assert_allclose(statistics['ucb'].mean[0], finished['ucb'].mean[0])
+
+    def test_partial_statistics(self):
+        store = ResultStore(self.directory)
+        scheduler = SweepScheduler(small_problem(), number_of_trials=6, batch_size=3, processes=1, store=store)
+        scheduler.units = scheduler.units[:1]                       # as if the sweep had been killed
+        scheduler.run()
+        statistics = ResultStore(self.directory).statistics(['bandit'])
+        assert_allclose(statistics['bandit'].count, [3, 0])
+
+    def test_statistics_follow_the_latest_batch_size(self):
+        store = ResultStore(self.directory)
+        SweepScheduler(small_problem(), number_of_trials=6, batch_size=3, processes=1, store=store).run()
+        SweepScheduler(small_problem(), number_of_trials=6, batch_size=2, processes=1, store=store).run()
+        self.assertEqual(len(store.units()), 4 + 6)                # neither sweep overwrote the other's units
+        assert_allclose(store.statistics(['bandit'])['bandit'].count, [6, 6])
+
+    def test_refuses_a_different_sweep(self):
+        store = ResultStore(self.directory)
+        SweepScheduler(small_problem(), number_of_trials=3, batch_size=3, processes=1, store=store)
+        with self.assertRaises(ValueError):
+            SweepScheduler(small_problem(parameters=(1/4., 1/2.)), number_of_trials=3, batch_size=3, processes=1,
+                           store=store)
+
+    def test_accepts_a_store_from_before_precision(self):
+        store = ResultStore(self.directory)
+        problem = small_problem()
+        del problem.precision, problem.learners, problem.shared_draws   # as pickled before they existed
+        store.write('problem.pkl', problem)
+        SweepScheduler(small_problem(), number_of_trials=3, batch_size=3, processes=1, store=store)
+        self.assertEqual(store.load_problem().precision, 'double')
+
+    def test_keeps_every_horizon(self):
+        store = ResultStore(self.directory)
+        short = SweepScheduler(small_problem(), number_of_trials=3, batch_size=3, processes=1, store=store).run()
+        longer = SweepScheduler(small_problem(timesteps=40), number_of_trials=3, batch_size=3, processes=1,
+                                store=store)
+        self.assertEqual(len(longer.units), 2)                      # the short sweep's units do not count
+        longer.run()
+        again = SweepScheduler(small_problem(), number_of_trials=3, batch_size=3, processes=1, store=store)
+        self.assertEqual(again.units, [])
+        assert_allclose(again.run()['ucb'].mean, short['ucb'].mean)
+        assert_allclose(store.statistics(['ucb'])['ucb'].mean, short['ucb'].mean)   # the latest plan's horizon
+
+
+if __name__ == "__main__":
+    unittest.main()
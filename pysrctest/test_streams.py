@@ -0,0 +1,75 @@
+import unittest
+from pysrc.experiment import BanditExperiment
+from pysrc.learning import SimpleBandit
+from pysrc.runner import run_grid
+from pysrc.scheduler import SweepProblem, SweepScheduler
+from pysrc.streams import TrialStreams, parameter_key, trial_random_state, trial_streams
+import numpy as np
+from numpy.testing import assert_allclose, assert_array_equal
+
+__author__ = 'kongaloosh'
+
+
+class TestTrialStreams(unittest.TestCase):
+
+    def test_trial_draws_do_not_depend_on_batch(self):
+        together = TrialStreams(7, range(4), block_size=3)
+        alone = TrialStreams(7, [2], block_size=5)
+        draws = np.array([together.normal(size=(2, 4)) for _ in range(5)])
+        assert_array_equal(draws[..., 2], np.array([alone.normal(size=(2, 1)) for _ in range(5)])[..., 0])
+
+    def test_trials_and_keys_are_independent(self):
+        streams = TrialStreams(7, range(2))
+        first, second = streams.random(size=(100, 2)).T
+        self.assertFalse(np.allclose(first, second))
+        self.assertFalse(np.allclose(TrialStreams(7, [0], key=(1,)).random(size=(100, 1)), first[:, None]))
+
+    def test_requires_trials_axis_last(self):
+        with self.assertRaises(ValueError):
+            TrialStreams(7, range(3)).normal(size=(3, 2))
+
+    def test_randint(self):
+        arms = TrialStreams(7, range(3)).randint(4, size=(1000, 3))
+        self.assertEqual(set(arms.ravel()), {0, 1, 2, 3})
+
+    def test_parameter_key(self):
+        self.assertEqual(parameter_key(1/128.), parameter_key(0.0078125))
+        self.assertNotEqual(parameter_key(0.5), parameter_key(0.25))
+
+
+class TestReproducibleRuns(unittest.TestCase):
+
+    def test_per_run_classes(self):
+        def run():
+            random_state = trial_random_state(1994, parameter_key(0.1), 3)
+            problem = BanditExperiment(3, random_state=random_state)
+            learner = SimpleBandit(3, 0.1, 0.1, random_state=random_state)
+            for _ in range(20):
+                arm = learner.get_action()
+                learner.update_average(arm, problem.action(arm))
+            return learner.bandit_estimates
+        assert_array_equal(run(), run())
+
+    def test_grid_trials_match_across_batchings(self):
+        # walk blocks are 2**20 // (runs x arms) steps: 174 for six runs and 524 for two, so both cross boundaries
+        def run(trials):
+            experiment = run_grid([0.1, 1.], len(trials), 600, walk=True, number_of_arms=1000,
+                                  **trial_streams(5, trials))
+            return experiment.reward_count, experiment.problem.bandit_means
+        (whole, whole_means), (part, part_means) = run(range(6)), run(range(4, 6))
+        for name in whole:
+            assert_array_equal(whole[name][:, 4:], part[name])
+        assert_array_equal(whole_means[4:], part_means)
+
+    def test_sweep_is_the_same_for_any_split(self):
+        problem = SweepProblem([1/8., 1/2.], initial_means=[0., 1., 0.5], timesteps=40, walk=True, burn_in=20,
+                               number_of_arms=3, seed=11)
+        serial = SweepScheduler(problem, number_of_trials=8, batch_size=8, processes=1).run()
+        split = SweepScheduler(problem, number_of_trials=8, batch_size=3, processes=2).run()
+        for name in serial:
+            assert_allclose(split[name].mean, serial[name].mean, rtol=1e-12)
+            assert_allclose(split[name].variance(), serial[name].variance(), rtol=1e-9)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from urllib.request import urlopen
+from pysrc.scheduler import SweepProblem, SweepScheduler
+from pysrc.telemetry import Telemetry
+from numpy.testing import assert_allclose
+
+__author__ = 'kongaloosh'
+
+
+def small_problem(timesteps=300):
+    return SweepProblem([1/8., 1/2.], initial_means=[0., 1., 0.5], timesteps=timesteps, walk=True, burn_in=100,
+                        number_of_arms=3, seed=5)
+
+
+class TestTelemetry(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_status_file_of_a_pool_sweep(self):
+        path = os.path.join(self.directory, 'status.json')
+        telemetry = Telemetry(status_path=path, interval=0.05)
+        scheduler = SweepScheduler(small_problem(), number_of_trials=8, batch_size=4, processes=2,
+                                   telemetry=telemetry)
+        statistics = scheduler.run()
+        with open(path) as f:
+            status = json.load(f)
+        self.assertEqual(status['trials']['completed'], [8, 8])
+        self.assertEqual(status['trials']['planned'], [8, 8])
+        self.assertEqual(status['eta'], 0.)
+        self.assertEqual(telemetry.steps_run, 2 * 8 * 300)          # every run-step counted once
+        self.assertGreater(status['steps_per_second'], 0)
+        assert_allclose(status['cells']['ucb']['mean'], statistics['ucb'].mean)
+        self.assertTrue(all(worker['unit'] is None for worker in status['workers'].values()))
+
+    def test_serves_progress_over_http(self):
+        scheduler = SweepScheduler(small_problem(), number_of_trials=8, batch_size=4, processes=1)
+        telemetry = Telemetry(address=('127.0.0.1', 0), stall_timeout=0.)
+        telemetry.start(scheduler)
+        try:
+            telemetry.put(('worker-a', (0, 0, 0, 4), 0))
+            telemetry.put(('worker-a', (0, 0, 0, 4), 150))          # half of one unit done
+            with urlopen('http://{0}:{1}/'.format(*telemetry.address)) as response:
+                status = json.loads(response.read().decode())
+        finally:
+            telemetry.stop()
+        self.assertEqual(status['workers']['worker-a']['unit'], [0, 0, 0, 4])
+        self.assertEqual(status['workers']['worker-a']['step'], 150)
+        self.assertTrue(status['workers']['worker-a']['stalled'])
+        self.assertEqual(status['trials']['completed'], [0, 0])
+        self.assertIsNone(status['cells']['ucb']['half_width'][0])  # no trials yet
+        self.assertEqual(telemetry.steps_run, 4 * 150)
+        remaining = 16 * 300 - 4 * 150
+        self.assertAlmostEqual(status['eta'], remaining / status['steps_per_second'], delta=0.01 * status['eta'])
+
+    def test_resumed_unit_finishing_before_its_first_report(self):
+        scheduler = SweepScheduler(small_problem(), number_of_trials=8, batch_size=4, processes=1)
+        telemetry = Telemetry()
+        telemetry.start(scheduler)
+        try:
+            telemetry.finish(scheduler, (0, 0, 0, 4))
+            self.assertEqual(telemetry.steps_run, 0)                # where it started from is not known yet
+            telemetry.put(('worker-a', (0, 0, 0, 4), 200))          # resumed from a snapshot at step 200
+            telemetry.put(('worker-a', (0, 0, 0, 4), 250))
+        finally:
+            telemetry.stop()
+        self.assertEqual(telemetry.steps_run, 4 * 100)
+        self.assertNotIn('worker-a', telemetry.workers)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+from pysrc.experiment import BanditExperiment, BatchedBanditExperiment
+from pysrc.learning import UCB, SimpleBandit
+from pysrc.runner import run_grid
+from pysrc.streams import trial_random_state, trial_streams
+from pysrc.tournament import ArgmaxTree, KineticTournament
+import numpy as np
+from numpy.testing import assert_array_equal
+
+__author__ = 'kongaloosh'
+
+
+class TestArgmaxTree(unittest.TestCase):
+
+    def test_tracks_argmax_of_every_row(self):
+        random_state = np.random.RandomState(0)
+        values = random_state.normal(size=(3, 4, 13))
+        tree = ArgmaxTree(values)
+        runs = np.ix_(np.arange(3), np.arange(4))
+        for _ in range(200):
+            arms = random_state.randint(13, size=(3, 4))
+            values[runs + (arms,)] = random_state.normal(size=(3, 4))
+            tree.update(arms, values[runs + (arms,)])
+            assert_array_equal(tree.argmax(), np.argmax(values, axis=-1))
+
+    def test_single_row_and_ties(self):
+        values = np.zeros(6)
+        tree = ArgmaxTree(values)
+        self.assertEqual(tree.argmax(), 0)                          # ties go to the lowest index
+        tree.update(4, 1.)
+        tree.update(2, 1.)
+        self.assertEqual(tree.argmax(), 2)
+        tree.update(2, -1.)
+        self.assertEqual(tree.argmax(), 4)
+
+
+class TestKineticTournament(unittest.TestCase):
+
+    def test_matches_dense_ucb(self):
+        random_state = np.random.RandomState(1)
+        dense, indexed = UCB(0.1, 20, 2.), UCB(0.1, 20, 2., indexed=True)
+        means = random_state.normal(size=20)
+        for t in range(1, 2000):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                arm = dense.get_action(t)
+            self.assertEqual(indexed.get_action(t), arm)
+            reward = means[arm] + random_state.normal()
+            dense.update_average(arm, reward)
+            indexed.update_average(arm, reward)
+
+    def test_unvisited_arms_first_by_index(self):
+        tree = KineticTournament(5)
+        tree.update(0, 10., 1.)
+        tree.update(3, 20., 1.)
+        self.assertEqual(tree.advance(2), 1)
+
+
+class TestIndexedLearners(unittest.TestCase):
+
+    def test_simple_bandit_matches_dense(self):
+        dense = SimpleBandit(50, 0.1, 0.1, random_state=trial_random_state(2, 0))
+        indexed = SimpleBandit(50, 0.1, 0.1, random_state=trial_random_state(2, 0), indexed=True)
+        problem = BanditExperiment(50, random_state=trial_random_state(2, 1))
+        problem.bandit_means[:] = trial_random_state(2, 2).normal(size=50)
+        for _ in range(500):
+            arm = dense.get_action()
+            self.assertEqual(indexed.get_action(), arm)
+            reward = problem.action(arm)
+            dense.update_average(arm, reward)
+            indexed.update_average(arm, reward)
+
+    def test_grid_matches_dense(self):
+        means = trial_random_state(3).normal(size=40)
+        dense = run_grid([0.1, 1.], 6, 300, initial_means=means, number_of_arms=40, **trial_streams(3, range(6)))
+        indexed = run_grid([0.1, 1.], 6, 300, initial_means=means, number_of_arms=40, indexed=True,
+                           **trial_streams(3, range(6)))
+        for name in 'sample_average', 'bandit', 'ucb':
+            assert_array_equal(indexed.reward_count[name], dense.reward_count[name])
+
+
+class TestOptimalCache(unittest.TestCase):
+
+    def test_follows_the_walk(self):
+        problem = BatchedBanditExperiment(4, 3, random_state=np.random.RandomState(0))
+        problem.bandit_means[:] = [0., 1., 0.5]
+        assert_array_equal(problem.optimal_action(), [1, 1, 1, 1])
+        for _ in range(200):
+            problem.random_walk()
+            assert_array_equal(problem.optimal_action(), np.argmax(problem.bandit_means, axis=-1))
+            assert_array_equal(problem.optimal_mean(), np.max(problem.bandit_means, axis=-1))
+
+
+if __name__ == '__main__':
+    unittest.main()
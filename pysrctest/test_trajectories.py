@@ -0,0 +1,104 @@
+import shutil
+import tempfile
+import unittest
+from pysrc.runner import build_grid
+from pysrc.scheduler import SweepProblem, SweepScheduler
+from pysrc.streams import trial_streams
+from pysrc.trajectories import TrajectoryRecorder, TrajectoryStore
+import numpy as np
+from numpy.testing import assert_allclose, assert_array_equal
+
+__author__ = 'kongaloosh'
+
+
+class TestTrajectoryStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_records_every_step(self):
+        store = TrajectoryStore.create(self.directory, ['sample_average', 'bandit', 'ucb'], (2, 6), 23, 3)
+        experiment = build_grid([1/8., 1/2.], 6, initial_means=[0., 1., 0.5], number_of_arms=3,
+                                recorder=TrajectoryRecorder(store, chunk_size=5), **trial_streams(1, range(6)))
+        experiment.run_experiment(13, walk=True, record_curves=True)
+        experiment.run_experiment(10, walk=True, record_curves=True)   # carries on mid-byte and mid-chunk
+        self.assertEqual(store.column('ucb', 'actions').dtype, np.int16)
+        self.assertEqual(store.column('ucb', 'optimal').shape, (2, 6, 3))
+        for name in 'sample_average', 'bandit', 'ucb':
+            rewards = store.column(name, 'rewards')
+            assert_allclose(rewards.sum(axis=-1), experiment.reward_count[name], rtol=1e-5)
+            assert_allclose(rewards.mean(axis=-2).T, experiment.rewards[name].mean, rtol=1e-5)
+            optimal, _ = store.summary(name, 'optimal', chunk_size=7)
+            assert_allclose(optimal.T, experiment.optimal[name].mean)
+            self.assertTrue(np.all(store.column(name, 'regret')[store.steps(name, 'optimal', 0, 23) == 1] == 0))
+
+    def test_summary(self):
+        store = TrajectoryStore.create(self.directory, ['bandit'], (20,), 10, 3)
+        values = np.random.RandomState(0).normal(size=(20, 10)).astype(np.float32)
+        store.column('bandit', 'regret', mode='r+')[:] = values
+        store.written(mode='r+')[:] = 10                            # written by hand rather than by a recorder
+        mean, (low, high) = store.summary('bandit', 'regret', quantiles=(0.1, 0.9), chunk_size=3, cumulative=True)
+        assert_allclose(mean, np.cumsum(values, axis=-1).mean(axis=0), rtol=1e-5)
+        assert_allclose(high, np.quantile(np.cumsum(values, axis=-1), 0.9, axis=0), rtol=1e-5)
+
+    def test_summary_skips_unwritten_runs(self):
+        store = TrajectoryStore.create(self.directory, ['bandit'], (2, 4), 10, 3)
+        recorder = TrajectoryRecorder(store, (slice(0, 1), slice(0, 2)))
+        for step in range(6):
+            recorder.record('bandit', step, np.zeros((1, 2)), np.ones((1, 2)), np.ones((1, 2)), np.ones((1, 2)))
+        recorder.flush()
+        assert_array_equal(store.written(), [[6, 6, 0, 0], [0, 0, 0, 0]])
+        mean, (median,) = store.summary('bandit', 'rewards', quantiles=(0.5,), chunk_size=4)
+        assert_allclose(mean[0, :6], 1.)                            # not diluted by the two unwritten runs
+        assert_allclose(median[0, :6], 1.)
+        self.assertTrue(np.all(np.isnan(mean[0, 6:])) and np.all(np.isnan(mean[1])))
+
+    def test_sequential_sweep_counts_only_the_runs_it_ran(self):
+        problem = SweepProblem([0., 1.], initial_means=[0., 1., 0.5], timesteps=20, burn_in=0, number_of_arms=3,
+                               seed=2, trajectory_directory=self.directory)
+        scheduler = SweepScheduler(problem, number_of_trials=40, batch_size=10, processes=1, target_half_width=10.,
+                                   minimum_trials=10)
+        statistics = scheduler.run()
+        store = TrajectoryStore(self.directory)
+        assert_array_equal(statistics['ucb'].count, [10, 10])      # three quarters of the rows are never written
+        mean, _ = store.summary('ucb', 'rewards')
+        assert_allclose(mean.mean(axis=-1), statistics['ucb'].mean, rtol=1e-5)
+
+    def test_longer_horizon_grows_the_columns(self):
+        def problem(timesteps):
+            return SweepProblem([1/8.], initial_means=[0., 1., 0.5], timesteps=timesteps, burn_in=0, walk=True,
+                                number_of_arms=3, seed=2, trajectory_directory=self.directory,
+                                snapshot_directory=self.directory + '_snapshots')
+        try:
+            SweepScheduler(problem(20), number_of_trials=4, batch_size=4, processes=1).run()
+            first = np.copy(TrajectoryStore(self.directory).column('ucb', 'rewards'))
+            statistics = SweepScheduler(problem(41), number_of_trials=4, batch_size=4, processes=1).run()
+        finally:
+            shutil.rmtree(self.directory + '_snapshots')
+        store = TrajectoryStore(self.directory)
+        self.assertEqual(store.column('ucb', 'optimal').shape, (1, 4, 6))
+        assert_array_equal(store.written(), [[41] * 4])
+        assert_array_equal(store.column('ucb', 'rewards')[..., :20], first)
+        assert_allclose(store.column('ucb', 'rewards').sum(axis=-1).mean() / 41, statistics['ucb'].mean, rtol=1e-5)
+        with self.assertRaises(ValueError):
+            SweepScheduler(SweepProblem([1/8., 1/2.], timesteps=20, burn_in=0, number_of_arms=3, seed=2,
+                                        trajectory_directory=self.directory), number_of_trials=4, batch_size=4)
+
+    def test_sweep_units_write_their_own_rows(self):
+        problem = SweepProblem([1/8., 1/2.], initial_means=[0., 1., 0.5], timesteps=30, burn_in=0,
+                               number_of_arms=3, seed=2, trajectory_directory=self.directory)
+        statistics = SweepScheduler(problem, number_of_trials=8, batch_size=3, processes=2).run()
+        store = TrajectoryStore(self.directory)
+        self.assertEqual(store.shape, (2, 8))
+        for name in 'sample_average', 'bandit', 'ucb':
+            per_trial = store.column(name, 'rewards').sum(axis=-1) / 30
+            assert_allclose(per_trial.mean(axis=-1), statistics[name].mean, rtol=1e-5)
+            self.assertTrue(np.all(per_trial != 0))
+        assert_array_equal(store.steps('bandit', 'optimal', 0, 30, index=(0,)).shape, (8, 30))
+
+
+if __name__ == '__main__':
+    unittest.main()